@@ -0,0 +1,117 @@
+'''
+登記PDFダウンロードの間隔調整（scripts/download_pacing.py）のベンチマーク。
+
+ブラウザもサイトも使わず、サイトの応答（1件あたりの所要時間と失敗）を時刻つきで模擬し、
+時計も模擬時刻で進めて、次の2つを同じ住所リスト・同じサイトの状態で比べる。
+  - 旧実装: 住所の間を固定で10秒空け、失敗した住所はそのまま飛ばす
+  - 新実装: 応答時間・エラー率で間隔を調整し、失敗した住所は再試行キューへ回し、
+            失敗が続けばサーキットブレーカーで止める
+模擬するサイトは、普段（平常）→ 混雑して遅くエラーが増える時間帯 → 一時的な停止 → 復旧 の順に変化する。
+
+使い方:
+  python -m benchmarks.bench_download_pacing [--addresses 200] [--outage 600] [--seed 0]
+'''
+
+import argparse
+import random
+from scripts.download_pacing import CircuitBreaker, PacingController
+
+LEGACY_INTERVAL = 10.0
+MAX_ATTEMPTS = 3
+
+
+class SimulatedSite:
+    """
+    時刻 t に依頼したときの (所要秒数, 成功したか) を返す
+    """
+
+    def __init__(self, busy_start: float, busy_seconds: float, outage_start: float, outage_seconds: float,
+                 seed: int = 0):
+        self.busy = (busy_start, busy_start + busy_seconds)
+        self.outage = (outage_start, outage_start + outage_seconds)
+        self.random = random.Random(seed)
+
+    def request(self, t: float) -> tuple[float, bool]:
+        if self.outage[0] <= t < self.outage[1]:
+            # 停止中は画面が出ずに待機の上限（STEP_TIMEOUT_MS 相当）で失敗する
+            return 30.0, False
+        if self.busy[0] <= t < self.busy[1]:
+            return self.random.uniform(15, 25), self.random.random() >= 0.15
+        return self.random.uniform(5, 9), self.random.random() >= 0.02
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.now += seconds
+
+
+def run_legacy(addresses: int, site: SimulatedSite) -> dict:
+    t, done, requests = 0.0, 0, 0
+    for i in range(addresses):
+        seconds, ok = site.request(t)
+        t += seconds
+        requests += 1
+        done += ok
+        if i + 1 < addresses:
+            t += LEGACY_INTERVAL
+    return {"seconds": t, "done": done, "lost": addresses - done, "requests": requests,
+            "outage_requests": None}
+
+
+def run_adaptive(addresses: int, site: SimulatedSite) -> dict:
+    clock = Clock()
+    pacing = PacingController(LEGACY_INTERVAL, 2.0, 120.0)
+    breaker = CircuitBreaker(5, 300.0, clock=clock, sleep=clock.sleep)
+    jobs = [(i, 1) for i in range(addresses)]
+    done, lost, requests, outage_requests = 0, 0, 0, 0
+    while jobs:
+        idx, attempt = jobs.pop(0)
+        breaker.wait()
+        seconds, ok = site.request(clock.now)
+        if site.outage[0] <= clock.now < site.outage[1]:
+            outage_requests += 1
+        clock.sleep(seconds)
+        requests += 1
+        if ok:
+            done += 1
+        elif attempt < MAX_ATTEMPTS:
+            jobs.append((idx, attempt + 1))
+        else:
+            lost += 1
+        pacing.record(seconds, ok)
+        breaker.record(ok)
+        if jobs:
+            clock.sleep(pacing.next_delay())
+    return {"seconds": clock.now, "done": done, "lost": lost, "requests": requests,
+            "outage_requests": outage_requests, "trips": breaker.trips}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='登記PDFダウンロードの間隔調整・再試行のベンチマーク（模擬）')
+    parser.add_argument('--addresses', type=int,   default=200, help='ダウンロードする住所の件数')
+    parser.add_argument('--outage',    type=float, default=600, help='サイトが止まっている秒数')
+    parser.add_argument('--seed',      type=int,   default=0)
+    args = parser.parse_args()
+
+    def make_site():
+        return SimulatedSite(busy_start=600, busy_seconds=900, outage_start=1800,
+                             outage_seconds=args.outage, seed=args.seed)
+
+    legacy = run_legacy(args.addresses, make_site())
+    adaptive = run_adaptive(args.addresses, make_site())
+    print(" 実装 | 所要(分) | 取得 | 取得できず | 依頼数 | 停止中の依頼数")
+    print("------+----------+------+------------+--------+---------------")
+    for name, r in (("旧", legacy), ("新", adaptive)):
+        outage = "-" if r["outage_requests"] is None else r["outage_requests"]
+        print(f"  {name}  | {r['seconds'] / 60:8.1f} | {r['done']:4d} | {r['lost']:10d} | {r['requests']:6d} | {outage:>13}")
+    print(f"サーキットブレーカーが開いた回数: {adaptive['trips']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+'''
+ルールベースの受付帳パーサー（scripts/ledger_parser.py）と LLM（extract_addresses）の
+抽出結果がどれだけ一致するか、所要時間はどれだけ違うかを比べるベンチマーク。
+
+受付帳PDFを渡すと OCR（キャッシュがあればキャッシュ）したテキストで比較する。
+OCR済みテキストファイルを --text で渡すこともできる。
+
+使い方:
+  python -m benchmarks.bench_ledger_parser uploads/mvp_ledger.pdf [--text ocr.txt ...]
+'''
+
+import argparse
+import re
+import time
+import unicodedata
+from collections import Counter
+from scripts.ledger_parser import parse_ledger
+
+
+def normalize(address: str) -> str:
+    return re.sub(r"\s", "", unicodedata.normalize("NFKC", address))
+
+
+def compare(label: str, text: str) -> None:
+    from scripts.extract_info_from_pdf import extract_addresses, extract_addresses_with_rules
+
+    start = time.perf_counter()
+    rows = parse_ledger(text)
+    rule_seconds = time.perf_counter() - start
+    rule_addresses = [row.address for row in rows if row.status == "target"]
+    unknown = sum(1 for row in rows if row.status == "unknown")
+
+    start = time.perf_counter()
+    llm_addresses = extract_addresses(text)
+    llm_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    hybrid_addresses = extract_addresses_with_rules([text])
+    hybrid_seconds = time.perf_counter() - start
+
+    llm = Counter(normalize(a) for a in llm_addresses)
+    for name, addresses, seconds in [
+        ("rules only", rule_addresses, rule_seconds),
+        ("rules+LLM", hybrid_addresses, hybrid_seconds),
+    ]:
+        found = Counter(normalize(a) for a in addresses)
+        agreed = sum((found & llm).values())
+        precision = agreed / sum(found.values()) if found else 1.0
+        recall = agreed / sum(llm.values()) if llm else 1.0
+        print(f" {label:30s} | {name:10s} | {len(addresses):5d} | {precision:7.1%} | {recall:7.1%} | {seconds:8.3f}")
+    print(f" {label:30s} | {'LLM':10s} | {len(llm_addresses):5d} |       - |       - | {llm_seconds:8.3f}"
+          f"   （登記行 {len(rows)} 件 / 判定不能 {unknown} 件）")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='ルールベース受付帳パーサーとLLMの一致率ベンチマーク')
+    parser.add_argument('pdfs',   nargs='*', default=[],         help='受付帳PDF')
+    parser.add_argument('--text', nargs='*', default=[],         help='OCR済みテキストファイル')
+    args = parser.parse_args()
+
+    print(" 入力                           | 方式       | 件数  | 適合率  | 再現率  | 秒")
+    print("--------------------------------+------------+-------+---------+---------+---------")
+    for path in args.text:
+        with open(path, encoding="utf-8") as f:
+            compare(path, f.read())
+    for path in args.pdfs:
+        from scripts.extract_info_from_pdf import ocr_pdf
+
+        compare(path, ocr_pdf(path))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+'''
+OCR前処理（scripts/ocr_preprocess.py）の設定ごとに、送信バイト数と住所の取りこぼしを比べるベンチマーク。
+
+各設定で PDF をページ画像にしてバイト数・前処理時間を測る（ここまではオフライン）。
+--ocr を付けると Google Vision で実際にOCRし、基準設定（フルカラーPNG・余白そのまま）で
+読み取れた住所がどれだけ同じように読み取れるかを比べる。住所の判定はOCRテキストから
+「〇〇市〇〇町123-4」の形の文字列を正規表現で拾うだけなので、LLM は呼ばない。
+
+使い方:
+  python -m benchmarks.bench_ocr_preprocess --pdf uploads/mvp_ledger.pdf [--ocr]
+'''
+
+import argparse
+import re
+import time
+import unicodedata
+from pdf2image import convert_from_path
+from scripts.ocr_preprocess import OcrImageSettings, preprocess_image
+
+BASELINE = OcrImageSettings(grayscale=False, crop_margins=False, image_format="png")
+
+CANDIDATES = {
+    "baseline（カラーPNG 300dpi）": BASELINE,
+    "gray+crop 300dpi auto":        OcrImageSettings(dpi=300),
+    "gray+crop 300dpi jpeg":        OcrImageSettings(dpi=300, image_format="jpeg"),
+    "gray+crop 200dpi auto":        OcrImageSettings(dpi=200),
+    "gray+crop 150dpi auto":        OcrImageSettings(dpi=150),
+    "binary160+crop 300dpi":        OcrImageSettings(dpi=300, binarize_threshold=160),
+    "binary160+crop 200dpi":        OcrImageSettings(dpi=200, binarize_threshold=160),
+}
+
+ADDRESS_PATTERN = re.compile(r"[^\s)）]+?[市区町村]\S*?\d+(?:[-－ー]\d+)*")
+
+
+def find_addresses(text: str) -> list[str]:
+    text = unicodedata.normalize("NFKC", text)
+    # OCR では全角数字の間に空白が入りやすいので詰めてから探す
+    text = re.sub(r"(?<=[\d-])\s+(?=[\d-])", "", text)
+    return ADDRESS_PATTERN.findall(text)
+
+
+def render(pdf_path: str, settings: OcrImageSettings) -> tuple[list[bytes], float]:
+    images = convert_from_path(pdf_path, dpi=settings.dpi)
+    start = time.perf_counter()
+    contents = [preprocess_image(image, settings) for image in images]
+    return contents, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='OCR前処理のサイズ・精度ベンチマーク')
+    parser.add_argument('--pdf', default='uploads/mvp_ledger.pdf', help='受付帳PDF')
+    parser.add_argument('--ocr', action='store_true',              help='Vision APIで実際にOCRして住所の一致率を測る')
+    args = parser.parse_args()
+
+    rows = []
+    baseline_addresses = None
+    for label, settings in CANDIDATES.items():
+        contents, prep_seconds = render(args.pdf, settings)
+        size = sum(len(c) for c in contents)
+        recall = ocr_seconds = None
+        if args.ocr:
+            from scripts.extract_info_from_pdf import ocr_images
+
+            start = time.perf_counter()
+            texts = ocr_images(contents)
+            ocr_seconds = time.perf_counter() - start
+            addresses = find_addresses("\n".join(t for t in texts if t))
+            if baseline_addresses is None:
+                baseline_addresses = addresses
+                print(f"基準設定で読み取れた住所: {len(addresses)} 件")
+            remaining = list(addresses)
+            matched = 0
+            for addr in baseline_addresses:
+                if addr in remaining:
+                    remaining.remove(addr)
+                    matched += 1
+            recall = matched / len(baseline_addresses) if baseline_addresses else 1.0
+        rows.append((label, size, prep_seconds, ocr_seconds, recall))
+
+    base_size = rows[0][1]
+    print("\n 設定                          |     bytes | 対基準 | 前処理(s) | OCR(s) | 住所一致率")
+    print("-------------------------------+-----------+--------+-----------+--------+-----------")
+    for label, size, prep_seconds, ocr_seconds, recall in rows:
+        ocr_col = f"{ocr_seconds:6.2f}" if ocr_seconds is not None else "     -"
+        recall_col = f"{recall:9.1%}" if recall is not None else "        -"
+        print(f" {label:30s}| {size:9d} | {size / base_size:5.1%} | {prep_seconds:9.2f} | {ocr_col} | {recall_col}")
+
+
+if __name__ == '__main__':
+    main()
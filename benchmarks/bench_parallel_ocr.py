@@ -0,0 +1,92 @@
+'''
+ocr_pdf の並列OCR（ocr_images の max_workers）と一括OCR（backend="batch"）の効果を測るベンチマーク。
+
+Google Vision は呼ばず、1リクエストあたり指定秒数だけ待ってからテキストを返す
+偽クライアント（FakeVisionClient）を使うので、認証情報やネットワークは不要。
+
+使い方:
+  python -m benchmarks.bench_parallel_ocr --pages 1 10 40 --workers 1 4 8 --latency 1.0 --backends page batch
+'''
+
+import argparse
+import random
+import threading
+import time
+from types import SimpleNamespace
+from scripts.extract_info_from_pdf import ocr_images
+
+
+class FakeVisionClient:
+    """
+    document_text_detection だけを持つ Vision クライアントの代わり。
+    latency ± jitter 秒待ってから「Page N」を返す。fail_pages に含まれるページはエラーを返す
+    """
+
+    def __init__(self, latency: float, jitter: float = 0.0, fail_pages=()):
+        self.latency = latency
+        self.jitter = jitter
+        self.fail_pages = set(fail_pages)
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def _wait(self):
+        with self._lock:
+            self.calls += 1
+        time.sleep(max(0.0, self.latency + random.uniform(-self.jitter, self.jitter)))
+
+    def _response(self, image):
+        page = int(image.content.decode())
+        error = SimpleNamespace(message="fake error" if page in self.fail_pages else "")
+        return SimpleNamespace(
+            error=error,
+            full_text_annotation=SimpleNamespace(text=f"Page {page}"),
+        )
+
+    def document_text_detection(self, image):
+        self._wait()
+        return self._response(image)
+
+    def batch_annotate_images(self, requests):
+        # 1往復分の待ち時間で複数ページをまとめて返す
+        self._wait()
+        return SimpleNamespace(responses=[self._response(r.image) for r in requests])
+
+
+def run_once(pages: int, workers: int, latency: float, jitter: float,
+             backend: str = "page") -> tuple[float, int]:
+    client = FakeVisionClient(latency, jitter)
+    contents = [str(i).encode() for i in range(1, pages + 1)]
+    start = time.perf_counter()
+    texts = ocr_images(contents, client=client, max_workers=workers, backend=backend)
+    elapsed = time.perf_counter() - start
+    # 並列・一括でもページ順が保たれていることを確認
+    assert texts == [f"Page {i}" for i in range(1, pages + 1)], texts
+    return elapsed, client.calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description='並列OCRのベンチマーク（偽Visionクライアント使用）')
+    parser.add_argument('--pages',   type=int,   nargs='+', default=[1, 5, 10, 40], help='ページ数')
+    parser.add_argument('--workers', type=int,   nargs='+', default=[1, 4, 8],      help='同時実行数')
+    parser.add_argument('--latency', type=float, default=1.0,                       help='1ページあたりの応答時間（秒）')
+    parser.add_argument('--jitter',  type=float, default=0.0,                       help='応答時間のばらつき（秒）')
+    parser.add_argument('--backends', nargs='+', default=['page'],                  help='page / batch')
+    args = parser.parse_args()
+
+    results = []
+    for pages in args.pages:
+        baseline = None
+        for backend in args.backends:
+            for workers in args.workers:
+                elapsed, calls = run_once(pages, workers, args.latency, args.jitter, backend)
+                baseline = baseline or elapsed
+                results.append((pages, backend, workers, calls, elapsed, baseline / elapsed))
+
+    print("\n pages | backend | workers | requests | seconds | speed-up")
+    print("-------+---------+---------+----------+---------+---------")
+    for pages, backend, workers, calls, elapsed, speedup in results:
+        print(f" {pages:5d} | {backend:7s} | {workers:7d} | {calls:8d} | {elapsed:7.2f} | {speedup:6.1f}x")
+
+
+if __name__ == '__main__':
+    main()
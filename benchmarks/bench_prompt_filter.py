@@ -0,0 +1,116 @@
+'''
+プロンプト前処理（scripts/prompt_filter.py）でLLMに送るトークン数がどれだけ減るか、
+切り出しにどれだけ時間がかかるかを測るベンチマーク。
+
+入力を指定しない場合は、受付帳・登記簿に似せた合成テキストで測る。
+--llm を付けると、前処理の有無それぞれで実際に gpt-4o を呼び出して応答時間と結果を比べる
+（キャッシュは使わない）。
+
+使い方:
+  python -m benchmarks.bench_prompt_filter [--ledger uploads/mvp_ledger.pdf ...]
+                                           [--registry downloads/xxx.pdf ...] [--llm]
+'''
+
+import argparse
+import time
+from scripts.prompt_filter import ledger_header, registry_owner_sections
+
+
+def sample_ledger(rows: int = 300) -> str:
+    lines = ["大津地方法務局 東近江支局", "受付帳（不動産）", "令和6年1月5日 〜 令和6年1月31日"]
+    for i in range(1, rows + 1):
+        purpose = "所有権移転相続・法人合併" if i % 4 == 0 else "抵当権の設定"
+        lines.append(f"【第{i}号 】 1月 5日受付（連先） {purpose}")
+        lines.append(f"既）土地 東近江市五個荘竜田町{400 + i}－{i % 9 + 1} 外1")
+        if i % 25 == 0:
+            lines.append(f"{i // 25}ページ")
+    return "\n".join(lines)
+
+
+def sample_registry(mortgages: int = 8) -> str:
+    lines = [
+        "滋賀県東近江市五個荘竜田町430-4 全部事項証明書 (土地)",
+        "表題部 (土地の表示) 調製 余白 不動産番号 1234567890123",
+        "地図番号 余白 筆界特定 余白",
+        "所在 東近江市五個荘竜田町 余白",
+        "①地番 ②地目 ③地積 ㎡ 原因及びその日付〔登記の日付〕",
+        "地番 430番4 宅地 198 45 〔昭和50年3月1日〕",
+        "権利部 (甲区) (所有権に関する事項)",
+        "順位番号 登記の目的 受付年月日・受付番号 原因 権利者その他の事項",
+        "1 所有権保存 昭和50年4月1日 第1234号 所有者 滋賀県東近江市五個荘竜田町430番地 山田一郎",
+        "* 下線のあるものは抹消事項であることを示す。 整理番号 D12345 (1/3) 1/3",
+        "2 所有権移転 令和6年1月5日 第49号 令和5年10月1日相続 所有者 大阪府大阪市北区梅田1丁目2番3号 山田太郎",
+        "権利部 (乙区) (所有権以外の権利に関する事項)",
+        "順位番号 登記の目的 受付年月日・受付番号 原因 権利者その他の事項",
+    ]
+    for i in range(1, mortgages + 1):
+        lines += [
+            f"{i} 抵当権設定 平成{i + 10}年5月1日 第{5000 + i}号 平成{i + 10}年5月1日金銭消費貸借同日設定",
+            f"債権額 金{i * 100}万円 利息 年2・5% 損害金 年14% 債務者 東近江市五個荘竜田町430番地 山田一郎",
+            f"抵当権者 滋賀県大津市浜町1番1号 株式会社びわこ銀行 共同担保 目録(あ)第{i}号",
+            "* 下線のあるものは抹消事項であることを示す。 整理番号 D12345 (2/3) 2/3",
+        ]
+    lines += [
+        "共同担保目録",
+        "記号及び番号 (あ)第1号 調製 平成11年5月1日",
+        "番号 担保の目的である権利の表示 順位番号 予備",
+        "1 東近江市五個荘竜田町 430番4の土地 1 余白",
+        "これは登記記録に記録されている事項の全部を証明した書面である。",
+        "令和6年2月1日 大津地方法務局東近江支局 登記官 法務 太郎",
+    ]
+    return "\n".join(lines)
+
+
+def measure(label: str, text: str, filter_func, llm_func=None) -> None:
+    start = time.perf_counter()
+    filtered = filter_func(text)
+    filter_ms = (time.perf_counter() - start) * 1000
+    saved = 1 - len(filtered) / len(text) if text else 0.0
+    print(f" {label:34s} | {len(text):7d} | {len(filtered):7d} | {saved:6.1%} | {filter_ms:8.2f}")
+    if llm_func is None:
+        return
+    for name, payload in [("全文", text), ("前処理後", filtered)]:
+        start = time.perf_counter()
+        answer = llm_func(payload)
+        seconds = time.perf_counter() - start
+        print(f"   └ LLM {name:8s} {seconds:6.2f}秒  {answer!r}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='プロンプト前処理のトークン削減・処理時間ベンチマーク')
+    parser.add_argument('--ledger',   nargs='*', default=[], help='受付帳PDF（OCRしてヘッダーを切り出す）')
+    parser.add_argument('--registry', nargs='*', default=[], help='登記簿PDF（MarkItDownで読み、甲区を切り出す）')
+    parser.add_argument('--llm', action='store_true', help='前処理の有無で gpt-4o の応答時間・結果も比べる')
+    args = parser.parse_args()
+
+    ledger_llm = registry_llm = None
+    if args.llm:
+        from scripts.llm_client import chat_completion
+
+        def ledger_llm(text):
+            prompt = f"以下のOCRテキストの冒頭に書かれている登記所名だけを1行で出力してください。\n\n{text}"
+            return chat_completion(prompt, use_cache=False).strip()
+
+        def registry_llm(text):
+            prompt = ("以下の登記簿テキストから、相続による最も新しい所有権移転の氏名・所有者住所・"
+                      f"不動産所在地を出力してください。\n\n{text}")
+            return chat_completion(prompt, use_cache=False).strip()
+
+    print(" 入力                               | 前(tok) | 後(tok) | 削減率 | 切出(ms)")
+    print("------------------------------------+---------+---------+--------+---------")
+    if not args.ledger and not args.registry:
+        measure("合成 受付帳（300行）", sample_ledger(), ledger_header, ledger_llm)
+        measure("合成 登記簿（抵当権8件）", sample_registry(), registry_owner_sections, registry_llm)
+        return
+    for path in args.ledger:
+        from scripts.extract_info_from_pdf import ocr_pdf
+
+        measure(path, ocr_pdf(path), ledger_header, ledger_llm)
+    for path in args.registry:
+        from markitdown import MarkItDown
+
+        measure(path, MarkItDown().convert(path).text_content, registry_owner_sections, registry_llm)
+
+
+if __name__ == '__main__':
+    main()
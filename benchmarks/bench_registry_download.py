@@ -0,0 +1,129 @@
+'''
+登記PDFダウンロード（scripts/auto_mode_chatgpt.py）の住所1件あたりの所要時間を、
+ローカルのモックサイト（benchmarks/mock_registry_site.py）で測るベンチマーク。
+
+本番サイトには接続しない。モックサイトの遅さ（--step-latency, --issue-latency）を変えて、
+待機条件による操作が固定 sleep の合計（旧実装で1件あたり15秒 + 住所間の待機）に
+左右されず、サイトの実際の応答時間に追従しているかを確かめる。
+--workers に複数の値を渡すと、並列ダウンロード（download_all）のワーカー数ごとの
+処理件数（件/分）を比べ、上限まではほぼ比例して伸びるかを確かめる。
+--session を付けると、セッションの準備（ブラウザの起動・接続とログイン）にかかる時間を
+初回（ブラウザ起動 + ログイン）と2回目以降（常駐ブラウザ + 保存済みログイン状態）で比べる。
+
+使い方:
+  python -m benchmarks.bench_registry_download [--addresses 5] [--step-latency 0.3] [--issue-latency 3]
+                                               [--workers 1 2 4] [--session]
+'''
+
+import argparse
+import os
+import tempfile
+import time
+from pathlib import Path
+from benchmarks.mock_registry_site import MockRegistrySite
+
+# 旧実装（run_auto_mode）の住所1件あたりの固定 sleep の合計と、住所間の待機
+LEGACY_SLEEP_PER_ADDRESS = 5.0
+LEGACY_INTERVAL = 10.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='登記PDFダウンロードの1件あたり所要時間ベンチマーク（モックサイト）')
+    parser.add_argument('--addresses',     type=int,   default=5,   help='ダウンロードする住所の件数')
+    parser.add_argument('--step-latency',  type=float, default=0.3, help='モックサイトのボタン操作ごとの表示待ち（秒）')
+    parser.add_argument('--issue-latency', type=float, default=3.0, help='モックサイトの取得依頼からPDFが出るまで（秒）')
+    parser.add_argument('--workers', type=int, nargs='*', default=[], help='並列ダウンロードのワーカー数（複数指定可）')
+    parser.add_argument('--session', action='store_true', help='ログイン状態・常駐ブラウザの使い回しの効果を測る')
+    parser.add_argument('--headed', action='store_true', help='ブラウザを表示して実行する')
+    args = parser.parse_args()
+
+    # モックサイトは空でなければどのログイン情報でも通す
+    os.environ.setdefault("REGISTRY_USER_ID", "bench")
+    os.environ.setdefault("REGISTRY_PASSWORD", "bench")
+    from playwright.sync_api import sync_playwright
+    from scripts.auto_mode_chatgpt import launch_browser, login, download_registry_pdf
+
+    addresses = [f"東近江市五個荘竜田町{400 + i}-{i + 1}" for i in range(args.addresses)]
+    with MockRegistrySite(step_latency=args.step_latency, issue_latency=args.issue_latency) as site, \
+            tempfile.TemporaryDirectory() as save_dir, sync_playwright() as playwright:
+        browser = launch_browser(playwright, headless=not args.headed)
+        context = browser.new_context(accept_downloads=True)
+        page = context.new_page()
+
+        start = time.perf_counter()
+        login(page, site.login_url)
+        login_seconds = time.perf_counter() - start
+
+        durations = []
+        for address in addresses:
+            start = time.perf_counter()
+            path = download_registry_pdf(page, address, Path(save_dir))
+            durations.append(time.perf_counter() - start)
+            assert Path(path).read_bytes().startswith(b"%PDF"), path
+        context.close()
+        browser.close()
+
+    # モックサイト側で必ずかかる時間（ボタン操作6回分の表示待ち + 取得処理 + iframe の表示待ち）
+    floor = args.step_latency * 7 + args.issue_latency
+    print(f"ログイン: {login_seconds:.2f}秒")
+    print(" 件目 | 所要(秒) | サイト側の下限(秒)")
+    print("------+----------+------------------")
+    for i, seconds in enumerate(durations, 1):
+        print(f" {i:4d} | {seconds:8.2f} | {floor:8.2f}")
+    average = sum(durations) / len(durations)
+    print(f"平均 {average:.2f}秒/件（住所間の待機を除く）")
+    print(f"参考: 旧実装の固定待機は {LEGACY_SLEEP_PER_ADDRESS:g}秒/件 + 住所間 {LEGACY_INTERVAL:g}秒"
+          "（サイトの処理時間はこれに上乗せされる）")
+
+    if args.workers:
+        compare_workers(addresses, args)
+    if args.session:
+        compare_session_reuse(args)
+
+
+def compare_session_reuse(args, runs: int = 3) -> None:
+    from playwright.sync_api import sync_playwright
+    from scripts.auto_mode_chatgpt import open_session, close_session
+    from scripts import registry_session
+
+    print("\n 回 | セッション準備(秒)")
+    print("----+-------------------")
+    with MockRegistrySite(step_latency=args.step_latency, issue_latency=args.issue_latency) as site, \
+            tempfile.TemporaryDirectory() as state_dir:
+        registry_session.REGISTRY_STATE_DIR = state_dir
+        for i in range(1, runs + 1):
+            # 実行ごとに Playwright を起動し直す（Streamlit の再実行・CLI の実行1回分に相当）
+            with sync_playwright() as playwright:
+                start = time.perf_counter()
+                browser, owned, context, page = open_session(playwright, 0, site.login_url, not args.headed)
+                seconds = time.perf_counter() - start
+                close_session(browser, owned, context)
+            print(f" {i:2d} | {seconds:17.2f}")
+        print(f"ログイン回数: {len(site.sessions)}")
+        registry_session.warm_browser.stop()
+
+
+def compare_workers(addresses: list[str], args) -> None:
+    from scripts.auto_mode_chatgpt import address_filename, download_all
+
+    print("\n ワーカー数 | 件数 | 秒      | 件/分  | 同時処理の最大 | 1ワーカー比")
+    print("------------+------+---------+--------+----------------+-----------")
+    baseline = None
+    for workers in args.workers:
+        with MockRegistrySite(step_latency=args.step_latency, issue_latency=args.issue_latency) as site, \
+                tempfile.TemporaryDirectory() as save_dir:
+            start = time.perf_counter()
+            paths = download_all(addresses, save_dir, login_url=site.login_url, interval=0,
+                                 headless=not args.headed, workers=workers,
+                                 resume=False, use_store=False, service_hours=False)
+            seconds = time.perf_counter() - start
+            # 保存したファイルが住所の順に並んでいること
+            assert [Path(p).name for p in paths] == [address_filename(a) for a in addresses]
+            peak = site.peak_in_flight
+        per_minute = len(paths) / seconds * 60
+        baseline = baseline or per_minute
+        print(f" {workers:10d} | {len(paths):4d} | {seconds:7.2f} | {per_minute:6.1f} | {peak:14d} | {per_minute / baseline:9.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,287 @@
+'''
+登記情報取得サイトの画面の流れだけを再現したローカルのモックサイト。
+
+scripts/auto_mode_chatgpt.py が操作する次の要素を持つ。
+  - login.php（id / pass と「利用規約に同意してログイン」ボタン）
+  - メニューの「不動産登記情報取得」セル → touki_search-iframe-frame
+      #check_direct_enable-inputEl, #direct_txt-inputEl, 直接入力取込, 確定, img,
+      登記情報取得（オンライン）, はい, #button-1005-btnEl
+  - mypage_list-iframe-frame（#ext-gen1323 に依頼の新しい順に .x-grid-row の行が並び、
+    行の PDF ボタン → はい → PDFダウンロード）。メニューの「マイページ」でも開ける
+
+各ボタンを押してから次の要素が表示されるまで step_latency 秒、
+登記情報の取得を依頼してから PDF が出るまで issue_latency 秒かかるようにしてあり、
+サイトの遅さを変えながら本番サイトに触れずに待機処理・所要時間を確かめられる。
+取得を依頼してからPDFがダウンロードされるまでの件数の最大値（peak_in_flight）も記録するので、
+並列ダウンロードで同時に処理されていた件数を確かめられる。
+error_rate を指定すると、その割合の依頼はマイページ一覧に「エラー」と表示されて PDF が出ないので、
+失敗した住所の再試行を確かめられる。
+
+使い方:
+  python -m benchmarks.mock_registry_site [--port 8765] [--step-latency 0.3] [--issue-latency 3] [--error-rate 0]
+  → REGISTRY_LOGIN_URL=http://127.0.0.1:8765/login.php を指定して auto_mode_chatgpt を実行する
+    （本番の受付時間外に試すときは REGISTRY_SERVICE_HOURS=0 も指定する）
+'''
+
+import argparse
+import html
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# 受け取ったPDFとして返す最小限のPDF
+PDF_TEMPLATE = (
+    "%PDF-1.4\n1 0 obj<</Type/Catalog/Pages 2 0 R>>endobj\n"
+    "2 0 obj<</Type/Pages/Kids[3 0 R]/Count 1>>endobj\n"
+    "3 0 obj<</Type/Page/Parent 2 0 R/MediaBox[0 0 595 842]>>endobj\n"
+    "% {address}\ntrailer<</Root 1 0 R>>\n%EOF\n"
+)
+
+LOGIN_PAGE = """<!doctype html><html><head><meta charset="utf-8"><title>ログイン</title></head><body>
+<form method="post" action="/login.php">
+  <input name="id"> <input name="pass" type="password">
+  <button type="submit">利用規約に同意してログイン</button>
+</form>{error}</body></html>"""
+
+MENU_PAGE = """<!doctype html><html><head><meta charset="utf-8"><title>メニュー</title></head><body>
+<div role="grid"><div role="row">
+  <div role="gridcell" onclick="openSearch()"><span>不動産登記情報取得</span></div>
+  <div role="gridcell" onclick="showMypage()"><span>マイページ</span></div>
+</div></div>
+<div id="area"></div>
+<script>
+function openSearch() {{
+  const old = document.querySelector('iframe[name="touki_search-iframe-frame"]');
+  if (old) old.remove();
+  setTimeout(() => {{
+    const f = document.createElement('iframe');
+    f.name = 'touki_search-iframe-frame';
+    f.src = '/touki_search.php';
+    document.getElementById('area').prepend(f);
+  }}, {step_ms});
+}}
+function showMypage() {{
+  let f = document.querySelector('iframe[name="mypage_list-iframe-frame"]');
+  if (!f) {{
+    f = document.createElement('iframe');
+    f.name = 'mypage_list-iframe-frame';
+    document.getElementById('area').append(f);
+  }}
+  f.src = '/mypage_list.php?t=' + Date.now();
+}}
+</script></body></html>"""
+
+SEARCH_PAGE = """<!doctype html><html><head><meta charset="utf-8"></head><body>
+<label><input type="checkbox" id="check_direct_enable-inputEl">直接入力</label>
+<input type="text" id="direct_txt-inputEl">
+<button onclick="next('confirm')">直接入力取込</button>
+<div id="confirm" hidden><button onclick="next('map')">確定</button></div>
+<div id="map" hidden><img alt="所在" width="20" height="20" onclick="next('online')"
+  src="data:image/gif;base64,R0lGODlhAQABAAAAACw="></div>
+<div id="online" hidden><button onclick="next('dialog')">登記情報取得（オンライン）</button></div>
+<div id="dialog" hidden><button onclick="document.getElementById('dialog').remove(); next('done')">はい</button></div>
+<div id="done" hidden><button id="button-1005-btnEl" onclick="request()">OK</button></div>
+<script>
+function next(id) {{ setTimeout(() => {{ document.getElementById(id).hidden = false; }}, {step_ms}); }}
+async function request() {{
+  const address = document.getElementById('direct_txt-inputEl').value;
+  await fetch('/api/request', {{method: 'POST', body: JSON.stringify({{address}})}});
+  parent.showMypage();
+}}
+</script></body></html>"""
+
+MYPAGE_PAGE = """<!doctype html><html><head><meta charset="utf-8"></head><body>
+<div id="ext-gen1323">{rows}</div>
+<div id="dialog" hidden><button onclick="location.href='/download?id=' + selected">はい</button></div>
+<script>
+let selected = 0;
+function openDialog(id) {{ selected = id; document.getElementById('dialog').hidden = false; }}
+{script}
+</script></body></html>"""
+
+
+class MockRegistrySite:
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, step_latency: float = 0.3,
+                 issue_latency: float = 3.0, error_rate: float = 0.0):
+        self.step_latency = step_latency
+        self.issue_latency = issue_latency
+        self.error_rate = error_rate
+        self.requests: dict[str, list[dict]] = {}
+        self.sessions: set[str] = set()
+        self.downloads = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def login_url(self) -> str:
+        return f"{self.url}/login.php"
+
+    def start(self) -> "MockRegistrySite":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _handler(self):
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _session(self) -> str | None:
+                for part in (self.headers.get("Cookie") or "").split(";"):
+                    name, _, value = part.strip().partition("=")
+                    if name == "session" and value in site.sessions:
+                        return value
+                return None
+
+            def _send(self, body: str | bytes, content_type: str = "text/html; charset=utf-8",
+                      status: int = 200, headers: dict | None = None):
+                data = body.encode("utf-8") if isinstance(body, str) else body
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _redirect(self, location: str, headers: dict | None = None):
+                self._send("", status=303, headers={"Location": location, **(headers or {})})
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                if url.path == "/login.php":
+                    return self._send(LOGIN_PAGE.format(error=""))
+                session = self._session()
+                if session is None:
+                    return self._redirect("/login.php")
+                step_ms = int(site.step_latency * 1000)
+                if url.path == "/menu.php":
+                    return self._send(MENU_PAGE.format(step_ms=step_ms))
+                if url.path == "/touki_search.php":
+                    return self._send(SEARCH_PAGE.format(step_ms=step_ms))
+                if url.path == "/mypage_list.php":
+                    return self._send(site.render_mypage(session))
+                if url.path == "/download":
+                    request_id = int(parse_qs(url.query).get("id", ["0"])[0])
+                    entry = site.find_request(session, request_id)
+                    if entry is None:
+                        return self._send("not found", status=404)
+                    with site._lock:
+                        site.downloads += 1
+                        if not entry.get("downloaded"):
+                            entry["downloaded"] = True
+                            site.in_flight -= 1
+                    return self._send(
+                        PDF_TEMPLATE.format(address=entry["address"]), "application/pdf",
+                        headers={"Content-Disposition": f'attachment; filename="{request_id}.pdf"'}
+                    )
+                self._send("not found", status=404)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length).decode("utf-8")
+                if self.path == "/login.php":
+                    form = parse_qs(body)
+                    if not form.get("id") or not form.get("pass"):
+                        return self._send(LOGIN_PAGE.format(error="<p>IDとパスワードを入力してください</p>"))
+                    with site._lock:
+                        session = f"s{len(site.sessions) + 1}-{random.randrange(10 ** 8)}"
+                        site.sessions.add(session)
+                    return self._redirect("/menu.php", {"Set-Cookie": f"session={session}; Path=/"})
+                session = self._session()
+                if session is None:
+                    return self._send("unauthorized", status=401)
+                if self.path == "/api/request":
+                    site.add_request(session, json.loads(body or "{}").get("address", ""))
+                    return self._send("{}", "application/json")
+                self._send("not found", status=404)
+
+        return Handler
+
+    def add_request(self, session: str, address: str) -> None:
+        with self._lock:
+            entries = self.requests.setdefault(session, [])
+            entries.append({
+                "id": sum(len(e) for e in self.requests.values()) + 1,
+                "address": address,
+                "requested_at": time.monotonic(),
+                "error": random.random() < self.error_rate,
+            })
+            if entries[-1]["error"]:
+                self.errors += 1
+                return
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+    def find_request(self, session: str, request_id: int) -> dict | None:
+        with self._lock:
+            for entries in self.requests.values():
+                for entry in entries:
+                    if entry["id"] == request_id:
+                        return entry
+        return None
+
+    def render_mypage(self, session: str) -> str:
+        with self._lock:
+            # マイページ一覧はアカウント単位なので、別のセッション（並列のワーカー・前回の実行）の依頼も並ぶ
+            entries = sorted((dict(entry) for entries in self.requests.values() for entry in entries),
+                             key=lambda entry: entry["id"])
+        rows = []
+        pending = False
+        for entry in reversed(entries):
+            label = f"受付 {entry['id']} {html.escape(entry['address'])}"
+            if time.monotonic() - entry["requested_at"] < self.issue_latency:
+                pending = True
+                rows.append(f'<div class="x-grid-row"><span>{label} 処理中</span></div>')
+            elif entry["error"]:
+                rows.append(f'<div class="x-grid-row"><span>{label} エラー</span></div>')
+            else:
+                rows.append(f'<div class="x-grid-row"><span>{label}</span>'
+                            f'<button onclick="openDialog({entry["id"]})">PDF</button></div>')
+        script = "setTimeout(() => location.reload(), 200);" if pending else ""
+        return MYPAGE_PAGE.format(rows="".join(rows), script=script)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='登記情報取得サイトのモック')
+    parser.add_argument('--host',          default='127.0.0.1')
+    parser.add_argument('--port',          type=int,   default=8765)
+    parser.add_argument('--step-latency',  type=float, default=0.3, help='ボタン操作ごとの表示待ち（秒）')
+    parser.add_argument('--issue-latency', type=float, default=3.0, help='取得依頼からPDFが出るまで（秒）')
+    parser.add_argument('--error-rate',    type=float, default=0.0, help='取得に失敗する依頼の割合（0〜1）')
+    args = parser.parse_args()
+
+    site = MockRegistrySite(args.host, args.port, args.step_latency, args.issue_latency, args.error_rate)
+    print(f"モックサイト起動: {site.login_url}")
+    try:
+        site._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
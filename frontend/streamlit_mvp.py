@@ -42,10 +42,10 @@ JWT_ALGORITHM = 'HS256'
 JWT_EXPIRE_MINUTES = 60
 
 # カスタムモジュールのインポート
-from scripts.extract_info_from_pdf import ocr_pdf, extract_registry_office
+from scripts.extract_info_from_pdf import extract_registry_office_from_pdf
 from scripts.auto_mode_chatgpt import run_auto_mode
 from scripts.pipeline import extract_owner_info
-from scripts.concat_markitdown_extract_zipcode import get_zipcode
+from scripts.concat_markitdown_extract_zipcode import get_zipcodes
 from scripts.merge_data import merge_data
 
 # --- データベース初期化 ---
@@ -233,15 +233,12 @@ def list_management_page():
                 with open(pdf_path, 'wb') as f:
                     f.write(uploaded.getbuffer())
                 # パイプライン
-                text = ocr_pdf(pdf_path)
-                registry_office = extract_registry_office(text)
+                registry_office = extract_registry_office_from_pdf(pdf_path)
                 pdf_paths = run_auto_mode(pdf_path, save_dir='downloads')
                 df_owner = extract_owner_info(pdf_paths)
                 # 郵便番号
-                zip_records = []
-                for addr in df_owner['所有者住所'].unique():
-                    zip_records.append({'所有者住所':addr, '郵便番号':get_zipcode(addr)})
-                df_zip = pd.DataFrame(zip_records)
+                owner_addrs = df_owner['所有者住所'].unique()
+                df_zip = pd.DataFrame({'所有者住所':owner_addrs, '郵便番号':get_zipcodes(owner_addrs)})
                 # CSV出力
                 csv_path = os.path.join('uploads', 'final_output.csv')
                 df_owner.to_csv('uploads/owner.csv', index=False, encoding='utf-8-sig')
@@ -0,0 +1,107 @@
+'''
+住所（地番・家屋番号の所在）の表記ゆれをそろえ、同じ物件を指す住所を1つにまとめる。
+
+受付帳から抽出した住所は、同じ物件でも次のような違いで別の文字列になることがある。
+  - 全角・半角（「４３０－４」「430-4」）、空白の有無
+  - 漢数字と算用数字（「四三〇番地四」「四百三十番四」「430-4」、「一丁目」「1丁目」）
+  - 地番の書き方（「430番地4」「430番4」「430の4」「430-4」、末尾の「番地」「番」）
+  - 末尾に残った「外1」などの件数
+normalize_address でこれらを1つの書き方（例: 東近江市五個荘竜田町430-4）にそろえたものを比較のキーにし、
+collapse_addresses でキーが同じ住所をまとめる。登記PDFの取得は1件ごとに料金と時間がかかるので、
+ブラウザで取得する前にまとめておく。
+
+漢数字を算用数字にするのは、丁目・番地・番・号・ハイフンの前、数字の前の「の」の前と末尾にあるものだけで、
+「五個荘」「八日市」「一の宮」のような地名の中の漢数字はそのまま残す。
+'''
+
+import re
+import unicodedata
+from dataclasses import dataclass, field
+
+KANJI_DIGITS = {"〇": 0, "零": 0, "一": 1, "二": 2, "三": 3, "四": 4, "五": 5,
+                "六": 6, "七": 7, "八": 8, "九": 9, "壱": 1, "弐": 2, "参": 3}
+KANJI_UNITS = {"十": 10, "拾": 10, "百": 100, "千": 1000}
+_KANJI_NUMERAL = "[" + "".join(KANJI_DIGITS) + "".join(KANJI_UNITS) + "]+"
+
+# 地番の区切りとして使われる記号（長音符「ー」は数字に挟まれているときだけ区切りとみなす）
+HYPHENS = "‐‑‒–—―−ーｰ－-"
+
+KANJI_NUMBER_PATTERN = re.compile(
+    rf"({_KANJI_NUMERAL})(?=丁目|番地|番|号|[{HYPHENS}]|の(?:\d|{_KANJI_NUMERAL})|$)"
+)
+FOREIGN_COUNT_PATTERN = re.compile(r"外\d+(?:筆|件|個)?$")
+
+
+def kanji_to_int(text: str) -> int:
+    """
+    漢数字を整数にする。「四三〇」のような位取りの書き方と「四百三十」のような書き方の両方を受け付ける
+    """
+    if not any(ch in KANJI_UNITS for ch in text):
+        return int("".join(str(KANJI_DIGITS[ch]) for ch in text))
+    total, current = 0, 0
+    for ch in text:
+        if ch in KANJI_UNITS:
+            total += (current or 1) * KANJI_UNITS[ch]
+            current = 0
+        else:
+            current = current * 10 + KANJI_DIGITS[ch]
+    return total + current
+
+
+def normalize_address(address: str) -> str:
+    """
+    住所を比較用の1つの書き方にそろえる
+    """
+    text = unicodedata.normalize("NFKC", address)
+    text = "".join(text.split())
+    text = KANJI_NUMBER_PATTERN.sub(lambda m: str(kanji_to_int(m.group(1))), text)
+    text = FOREIGN_COUNT_PATTERN.sub("", text)
+    text = text.replace("大字", "")
+    # 数字に挟まれた区切り（番地・番・の・各種ハイフン）を「-」に、号は区切りとして扱う
+    text = re.sub(rf"(?<=\d)(?:番地|番|の|[{HYPHENS}])(?=\d)", "-", text)
+    text = re.sub(r"(?<=\d)号(?=\d)", "-", text)
+    text = re.sub(r"(?<=\d)(?:番地|番|号)$", "", text)
+    text = re.sub(rf"丁目[{HYPHENS}]", "丁目", text)
+    return text
+
+
+@dataclass
+class CollapseResult:
+    addresses: list[str]                       # まとめた後の住所（各グループで最初に出てきた表記）
+    groups: dict[str, list[str]] = field(default_factory=dict)  # 代表の住所 → まとめた表記の一覧
+    total: int = 0                             # まとめる前の件数
+    exact_duplicates: int = 0                  # 文字列として全く同じで省いた件数
+    variants: int = 0                          # 表記ゆれとしてまとめた件数
+
+    @property
+    def saved(self) -> int:
+        return self.exact_duplicates + self.variants
+
+
+def collapse_addresses(addresses: list[str]) -> CollapseResult:
+    """
+    normalize_address が同じになる住所をまとめ、代表の住所をキーの順に並べて返す
+    """
+    representative: dict[str, str] = {}
+    groups: dict[str, list[str]] = {}
+    seen: set[str] = set()
+    exact = 0
+    for address in addresses:
+        if address in seen:
+            exact += 1
+            continue
+        seen.add(address)
+        key = normalize_address(address)
+        if key not in representative:
+            representative[key] = address
+            groups[address] = [address]
+        else:
+            groups[representative[key]].append(address)
+    ordered = [representative[key] for key in sorted(representative)]
+    return CollapseResult(
+        addresses=ordered,
+        groups={address: groups[address] for address in ordered},
+        total=len(addresses),
+        exact_duplicates=exact,
+        variants=len(seen) - len(ordered),
+    )
@@ -4,86 +4,473 @@ OCR済みテキストから抽出した住所リストを取得し、
 そのリストを使用して登記情報取得サイトに一度ログインし、
 各住所の登記PDFを自動ダウンロードする。
 
-営業時間外や重複住所は除外され、全処理後に自動でログアウトする。
+重複住所は除外され、全処理後に自動でログアウトする。
+受付時間外の住所は飛ばさず、service_hours のスケジューラーで次の受付時間まで待ってから取得する。
+重複は文字列の一致ではなく address_normalizer で表記ゆれをそろえて判定し、同じ物件は1度だけ取得する。
+
+画面の切り替わりは固定の sleep ではなく、Playwright の待機条件
+（iframe・ボタンの表示、マイページ一覧の行の更新、ダウンロードイベント）で待つ。
+サイトが遅いときは STEP_TIMEOUT_MS / ISSUE_TIMEOUT_MS まで待ち、速いときはすぐ次に進む。
+REGISTRY_LOGIN_URL を benchmarks/mock_registry_site.py のURLにすると、本番サイトに触れずに動作確認できる。
+
+DOWNLOAD_WORKERS を2以上にすると、住所を複数のブラウザで並列にダウンロードする。
+同じアカウントで同時にログインするのは REGISTRY_MAX_SESSIONS までとし、
+サイト全体への取得依頼は REGISTRY_RPM（1分あたりの件数、0 なら無制限）に抑える。
+
+ログイン状態（storage_state）とブラウザは registry_session で実行をまたいで使い回し、
+保存したセッションが切れているときだけログインし直す。
+
+住所と住所の間隔は固定ではなく、download_pacing で応答時間とエラー率から決める。
+失敗した住所は後ろに回して DOWNLOAD_MAX_ATTEMPTS 回まで試し直し、
+失敗が続くとき（サイトが落ちているとき）はサーキットブレーカーでしばらく全体を止める。
+最後まで取得できなかった住所は理由とともに一覧で表示し、黙って飛ばさない。
+
+住所ごとの状態は download_journal に記録し、途中で止まった実行をもう一度実行すると、
+取得済みの住所は飛ばして続きから再開する。
+取得したPDFは registry_store にも入れ、別の実行でも新しいうちはブラウザを使わずにそこから返す。
 '''
 
+from scripts.address_normalizer import collapse_addresses, normalize_address
 from scripts.extract_info_from_pdf import get_cleaned_addresses
-from datetime import datetime, time as dtime
-import holidays
+from scripts.download_journal import DownloadJournal, get_download_journal, make_run_id
+from scripts.download_pacing import CircuitBreaker, PacingController
+from scripts.registry_store import RegistryStore, get_registry_store
+from scripts.service_hours import (
+    DOWNLOAD_SECONDS_PER_ADDRESS, ServiceScheduler, is_within_service_hours, now_jst
+)
+from scripts.env_utils import env_bool
+from scripts.rate_limit import TokenBucket
+from scripts.registry_session import connect_browser, new_session_context, restore_session, save_session
+import hashlib
+import os
+import re
+import queue
+import threading
 import time
-from playwright.sync_api import Playwright, sync_playwright
+from playwright.sync_api import Playwright, sync_playwright, expect
+from collections.abc import Callable
 from pathlib import Path
 
-JP_HOLIDAYS = holidays.Japan()
-
-def is_within_service_hours(now: datetime) -> bool:
-    # 年末年始は終日NG
-    if datetime(now.year, 12, 29) <= now <= datetime(now.year + 1, 1, 3):
-        return False
-    
-    is_holiday_or_weekend = now.weekday() >= 5 or now.date() in JP_HOLIDAYS
-    
-    if is_holiday_or_weekend:
-        return dtime(8, 30) <= now.time() < dtime(18, 0)
+REGISTRY_LOGIN_URL = os.getenv("REGISTRY_LOGIN_URL", "https://xn--udk1b673pynnijsb3h8izqr1a.com/login.php")
+CHROMIUM_PATH = os.getenv("CHROMIUM_PATH", "/usr/bin/chromium")
+
+# 画面操作1回あたりの待機の上限（ボタンや iframe が表示されるまで）
+STEP_TIMEOUT_MS = int(os.getenv("STEP_TIMEOUT_MS", "30000"))
+# 登記情報の取得を依頼してから、マイページ一覧にPDFが出るまでの待機の上限
+ISSUE_TIMEOUT_MS = int(os.getenv("ISSUE_TIMEOUT_MS", "120000"))
+# 住所と住所の間に空ける秒数の初期値と範囲（サイトへの負荷を抑えるため。実際の間隔は応答に応じて調整する）
+DOWNLOAD_INTERVAL_SECONDS = float(os.getenv("DOWNLOAD_INTERVAL_SECONDS", "10"))
+DOWNLOAD_MIN_INTERVAL_SECONDS = float(os.getenv("DOWNLOAD_MIN_INTERVAL_SECONDS", "2"))
+DOWNLOAD_MAX_INTERVAL_SECONDS = float(os.getenv("DOWNLOAD_MAX_INTERVAL_SECONDS", "120"))
+# 1件の住所を試す回数の上限（失敗した住所は後ろに回して試し直す）
+DOWNLOAD_MAX_ATTEMPTS = int(os.getenv("DOWNLOAD_MAX_ATTEMPTS", "3"))
+# 続けてこの回数失敗したらサイトが落ちているとみなし、CIRCUIT_COOLDOWN_SECONDS の間ダウンロードを止める
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+CIRCUIT_COOLDOWN_SECONDS = float(os.getenv("CIRCUIT_COOLDOWN_SECONDS", "300"))
+# 並列にダウンロードするブラウザの数と、同じアカウントで同時にログインしてよい数の上限
+DOWNLOAD_WORKERS = int(os.getenv("DOWNLOAD_WORKERS", "1"))
+REGISTRY_MAX_SESSIONS = int(os.getenv("REGISTRY_MAX_SESSIONS", "3"))
+# サイト全体への取得依頼の上限（1分あたりの件数。0 なら制限しない）
+REGISTRY_RPM = float(os.getenv("REGISTRY_RPM", "0"))
+# 0 にすると受付時間を確認しない（モックサイトでの確認用）
+REGISTRY_SERVICE_HOURS = env_bool("REGISTRY_SERVICE_HOURS", True)
+
+SEARCH_FRAME = 'iframe[name="touki_search-iframe-frame"]'
+MYPAGE_FRAME = 'iframe[name="mypage_list-iframe-frame"]'
+MYPAGE_ROW = "#ext-gen1323"
+# マイページ一覧（MYPAGE_ROW）の中の1件分の行と、マイページ一覧を開くメニュー
+MYPAGE_ENTRY = os.getenv("MYPAGE_ENTRY_SELECTOR", ".x-grid-row")
+MYPAGE_MENU_LABEL = os.getenv("MYPAGE_MENU_LABEL", "マイページ")
+# マイページ一覧の行にこの文字があれば、取得に失敗したとみなして待たずに次へ進む
+MYPAGE_ERROR_TEXT = os.getenv("MYPAGE_ERROR_TEXT", "エラー")
+
+def address_filename(address: str) -> str:
+    # 記号を置き換えただけでは別の住所が同じ名前になることがあるので、住所のハッシュを付けて区別する
+    name = re.sub(r'[\\/:*?"<>|]', "-", address.replace(" ", "_"))
+    digest = hashlib.sha1(address.encode("utf-8")).hexdigest()[:8]
+    return f"{name}_{digest}.pdf"
+
+def _chromium_path() -> str | None:
+    # システムに入った Chromium があればそれを使い、無ければ Playwright 同梱のものを使う
+    return CHROMIUM_PATH if os.path.exists(CHROMIUM_PATH) else None
+
+def launch_browser(playwright: Playwright, headless: bool = True):
+    return playwright.chromium.launch(executable_path=_chromium_path(), headless=headless)
+
+def registry_credentials() -> tuple[str, str]:
+    """
+    登記情報取得サイトのログインID・パスワードを環境変数（.env でも可）から読む。未設定ならエラーにする
+    """
+    user_id = os.getenv("REGISTRY_USER_ID")
+    password = os.getenv("REGISTRY_PASSWORD")
+    if not user_id or not password:
+        raise RuntimeError("登記情報取得サイトのログイン情報がありません。"
+                           "環境変数 REGISTRY_USER_ID と REGISTRY_PASSWORD を設定してください")
+    return user_id, password
+
+def login(page, login_url: str | None = None) -> None:
+    """
+    ログインし、メニュー（不動産登記情報取得）が表示されるまで待つ
+    """
+    user_id, password = registry_credentials()
+    page.set_default_timeout(STEP_TIMEOUT_MS)
+    page.goto(login_url or REGISTRY_LOGIN_URL)
+    page.locator("input[name=\"id\"]").fill(user_id)
+    page.locator("input[name=\"pass\"]").fill(password)
+    page.get_by_role("button", name="利用規約に同意してログイン").click()
+    page.get_by_role("gridcell", name="不動産登記情報取得").wait_for()
+
+def is_logged_in(page) -> bool:
+    """
+    メニューとログイン画面のどちらが表示されたかで、ログイン済みかどうかを判定する
+    """
+    menu = page.get_by_role("gridcell", name="不動産登記情報取得")
+    menu.or_(page.locator("input[name=\"pass\"]")).first.wait_for()
+    return menu.is_visible()
+
+def open_session(playwright, slot: int = 0, login_url: str | None = None, headless: bool = True):
+    """
+    ブラウザに接続（または起動）し、ログイン済みのページを返す。
+    戻り値は (browser, 閉じるべきブラウザか, context, page)
+    """
+    site = login_url or REGISTRY_LOGIN_URL
+    browser, owned = connect_browser(
+        playwright, _chromium_path(), headless, launch=lambda p: launch_browser(p, headless=headless)
+    )
+    context = new_session_context(browser, site, slot, accept_downloads=True)
+    page = context.new_page()
+    page.set_default_timeout(STEP_TIMEOUT_MS)
+    if restore_session(page, site, slot, is_logged_in):
+        print("✅ 保存済みのログイン状態を利用します")
     else:
-        return dtime(8, 30) <= now.time() < dtime(23, 0)
+        login(page, site)
+        save_session(context, site, page.url, slot)
+    return browser, owned, context, page
 
-def download_owner_info(page, address: str) -> None:
-    now = datetime.now()
-    if not is_within_service_hours(now):
-        print(f"⚠️ 登記情報取得不可時間帯のためスキップ: {now.strftime('%Y-%m-%d %H:%M')} / {address}")
-        return
+def close_session(browser, owned: bool, context) -> None:
+    context.close()
+    # 常駐ブラウザは閉じずに残し、次の実行で使い回す
+    if owned:
+        browser.close()
 
+def _mypage_row_text(page) -> str | None:
+    # 依頼前のマイページ一覧の先頭行（まだ一覧が無ければ None）
+    frame = page.frame(name="mypage_list-iframe-frame")
+    if frame is None:
+        return None
+    row = frame.locator(MYPAGE_ROW).locator(MYPAGE_ENTRY).first
+    return row.inner_text() if row.count() else None
+
+def submit_registry_request(page, address: str, on_submit: Callable[[], None] | None = None) -> str | None:
+    """
+    1件の住所について登記情報の取得を依頼する（ここで料金がかかる）。
+    依頼前のマイページ一覧の先頭行を返す（fetch_registry_pdf で新しい行を見分けるのに使う）。
+    on_submit は依頼を確定するボタンを押す直前に呼ぶ。そこから先で失敗しても依頼は済んでいるかもしれないので、
+    呼び出し側は依頼済みとして扱う
+    """
     page.get_by_role("gridcell", name="不動産登記情報取得").locator("span").click()
-    time.sleep(1)
 
-    frame = page.frame(name="touki_search-iframe-frame")
+    # iframe が読み込まれ、各ボタンが押せる状態になるまでは locator が自動で待つ
+    frame = page.frame_locator(SEARCH_FRAME)
     frame.locator("#check_direct_enable-inputEl").click()
     frame.locator("#direct_txt-inputEl").fill(address)
-    time.sleep(1)
     frame.get_by_role("button", name="直接入力取込").click()
     frame.get_by_role("button", name="確定").click()
     frame.locator("img").click()
-    time.sleep(1)
 
     frame.get_by_role("button", name="登記情報取得（オンライン）").click()
-    time.sleep(1)
+    previous_row = _mypage_row_text(page)
+    if on_submit is not None:
+        on_submit()
     frame.get_by_role("button", name="はい").click()
-    time.sleep(1)
     frame.locator("#button-1005-btnEl").click()
-    time.sleep(15)
-
-    frame2 = page.frame(name="mypage_list-iframe-frame")
-    frame2.locator("#ext-gen1323").get_by_role("button", name="PDF").click()
+    return previous_row
+
+def open_mypage(page) -> None:
+    page.get_by_role("gridcell", name=MYPAGE_MENU_LABEL).click()
+
+def _find_mypage_row(entries, address: str):
+    """
+    マイページ一覧の行のうち、正規化した住所を含む最新の行を返す（無ければエラー）
+    """
+    entries.first.wait_for()
+    key = normalize_address(address)
+    for i, text in enumerate(entries.all_inner_texts()):
+        if key in normalize_address(text):
+            return entries.nth(i)
+    raise RuntimeError(f"マイページ一覧に依頼済みの登記情報が見つかりません: {address}")
+
+def fetch_registry_pdf(page, address: str, save_dir: Path, previous_row: str | None = None,
+                       reopen: bool = False) -> str:
+    """
+    依頼済みの登記情報のPDFをマイページ一覧からダウンロードし、save_dir に保存してそのパスを返す。
+    依頼した直後は一覧の先頭行が previous_row から変わるのを待ち、その新しい行を使う。
+    reopen=True（前の試行・前回の実行で依頼までは済んでいる場合）はマイページ一覧を開き直し、
+    新しい順に並んだ行のうち、住所を正規化して比べて一致する最新の行を使う
+    （サイトの表示は全角数字や都道府県付きのことがあり、入力した文字列そのままとは限らない）
+    """
+    if reopen:
+        open_mypage(page)
+    frame2 = page.frame_locator(MYPAGE_FRAME)
+    entries = frame2.locator(MYPAGE_ROW).locator(MYPAGE_ENTRY)
+    if reopen:
+        row = _find_mypage_row(entries, address)
+    else:
+        if previous_row is not None:
+            # 取得した登記情報がマイページ一覧の先頭に出るまで待つ（前の住所の行が残っている間は押さない）
+            expect(entries.first).not_to_have_text(previous_row, timeout=ISSUE_TIMEOUT_MS)
+        row = entries.first
+    pdf_button = row.get_by_role("button", name="PDF")
+    pdf_button.or_(row.get_by_text(MYPAGE_ERROR_TEXT)).first.wait_for(timeout=ISSUE_TIMEOUT_MS)
+    if not pdf_button.is_visible():
+        raise RuntimeError(f"登記情報を取得できませんでした: {row.inner_text()}")
+    pdf_button.click()
 
     with page.expect_download() as download_info:
         frame2.get_by_role("button", name="はい").click()
     download = download_info.value
 
-    save_dir = Path("/mnt/c/Users/shish/Documents")
     save_dir.mkdir(parents=True, exist_ok=True)
-    save_path = save_dir / f"{address.replace(' ', '_').replace('/', '-')}.pdf"
-    download.save_as(str(save_path))
+    save_path = save_dir / address_filename(address)
+    # 保存の途中で止まっても中途半端なファイルが残らないよう、書き終えてから名前を変える
+    part_path = save_path.with_name(save_path.name + ".part")
+    download.save_as(str(part_path))
+    os.replace(part_path, save_path)
     print(f"✅ Downloaded PDF for: {address}")
+    return str(save_path)
+
+def download_registry_pdf(page, address: str, save_dir: Path) -> str:
+    """
+    1件の住所について登記情報の取得を依頼し、PDFを save_dir に保存してそのパスを返す
+    """
+    previous_row = submit_registry_request(page, address)
+    return fetch_registry_pdf(page, address, save_dir, previous_row)
+
+def download_owner_info(page, address: str, save_dir: str = "/mnt/c/Users/shish/Documents") -> None:
+    if REGISTRY_SERVICE_HOURS and not is_within_service_hours(now_jst()):
+        # 受付時間外は飛ばさずに次の受付時間まで待ち、待っている間に切れたログインを張り直す
+        if ServiceScheduler(1).wait_for_window():
+            _recover_page(page, REGISTRY_LOGIN_URL)
+    download_registry_pdf(page, address, Path(save_dir))
+
+def _recover_page(page, site: str) -> None:
+    """
+    失敗した後、ダイアログなどが残った画面をメニューから開き直す（ログインが切れていればログインし直す）
+    """
+    try:
+        page.goto(page.url)
+        if not is_logged_in(page):
+            login(page, site)
+    except Exception as e:
+        print(f"⚠️ 画面を開き直せませんでした: {e}")
+
+def _download_worker(jobs: queue.Queue, results: dict[int, str], failures: dict[int, str], save_dir: Path,
+                     login_url: str | None, pacing: PacingController, breaker: CircuitBreaker,
+                     max_attempts: int, headless: bool, site_limiter: TokenBucket | None, total: int,
+                     journal: DownloadJournal | None = None, run_id: str = "",
+                     store: RegistryStore | None = None, scheduler: ServiceScheduler | None = None,
+                     slot: int = 0) -> None:
+    """
+    1つのセッション（slot）でログインし、jobs が空になるまで住所を取り出してダウンロードする。
+    失敗した住所は max_attempts 回までは jobs の後ろに戻し、それでも駄目なら failures に理由を残す。
+    取得の依頼を済ませた後で失敗した場合（PDFが出るのを待ちきれなかった・ダウンロードに失敗した等）は、
+    もう一度依頼すると料金が二重にかかるので、再試行ではマイページ一覧からPDFを取り直すだけにする。
+    journal があれば、住所ごとの状態をその都度記録する。store があれば、取得したPDFを入れておく。
+    scheduler があれば、受付時間外・締め切り間際は次の受付時間まで待つ。
+    sync API の Playwright はスレッドをまたいで使えないので、ワーカーごとに Playwright を起動する
+    """
+    site = login_url or REGISTRY_LOGIN_URL
+    submitted = False
+
+    def mark_submitted(address: str) -> None:
+        # 依頼を確定するボタンを押す直前に記録する（押した後で失敗しても、もう一度依頼しないように）
+        nonlocal submitted
+        submitted = True
+        if journal is not None:
+            journal.mark_requested(run_id, address)
+
+    with sync_playwright() as playwright:
+        browser, owned, context, page = open_session(playwright, slot, site, headless)
+        try:
+            while True:
+                try:
+                    idx, address, attempt, requested = jobs.get_nowait()
+                except queue.Empty:
+                    break
+                if scheduler is not None and scheduler.wait_for_window():
+                    _recover_page(page, site)
+                breaker.wait()
+                if site_limiter is not None:
+                    site_limiter.acquire()
+                retry_note = f"（{attempt}回目）" if attempt > 1 else ""
+                print(f"\n▶️ ({idx+1}/{total}) 処理開始{retry_note}: {address}")
+                if journal is not None:
+                    journal.mark_in_progress(run_id, address)
+                start = time.monotonic()
+                submitted = requested
+                try:
+                    if requested:
+                        print("📥 取得の依頼は済んでいるので、マイページ一覧からPDFだけを取り直します")
+                        results[idx] = fetch_registry_pdf(page, address, save_dir, reopen=True)
+                    else:
+                        previous_row = submit_registry_request(
+                            page, address, on_submit=lambda: mark_submitted(address))
+                        results[idx] = fetch_registry_pdf(page, address, save_dir, previous_row)
+                    ok = True
+                except Exception as e:
+                    ok = False
+                    print(f"❌ エラー発生: {address}\n{e}")
+                    reason = str(e).splitlines()[0] if str(e) else type(e).__name__
+                    if attempt < max_attempts:
+                        print(f"🔁 後でもう一度試します（{attempt}/{max_attempts}回）")
+                        if journal is not None:
+                            journal.mark_queued(run_id, address, reason)
+                        jobs.put((idx, address, attempt + 1, submitted))
+                    else:
+                        failures[idx] = reason
+                        if journal is not None:
+                            journal.mark_failed(run_id, address, reason)
+                    _recover_page(page, site)
+                else:
+                    if journal is not None:
+                        journal.mark_downloaded(run_id, address, results[idx])
+                    if store is not None:
+                        # PDFは取得できているので、保存庫に入れられなくても失敗とはせず（取得し直すと料金がかかる）警告だけ出す
+                        try:
+                            store.put(address, results[idx])
+                        except Exception as e:
+                            print(f"⚠️ 保存庫に入れられませんでした: {address}\n{e}")
+                    if scheduler is not None:
+                        scheduler.record_done()
+                        remaining = jobs.qsize()
+                        if remaining:
+                            print(f"📈 残り {remaining} 件（{scheduler.seconds_per_address():.0f}秒/件）"
+                                  f" 完了見込み: {scheduler.estimate(remaining):%m/%d %H:%M}")
+                pacing.record(time.monotonic() - start, ok)
+                breaker.record(ok)
+                delay = pacing.next_delay()
+                if delay > 0 and not jobs.empty():
+                    print(f"⏳ 次の住所まで{delay:.1f}秒待機中...\n")
+                    time.sleep(delay)
+        finally:
+            close_session(browser, owned, context)
+
+def download_all(address_list: list[str], save_dir: str = "downloads", login_url: str | None = None,
+                 interval: float | None = None, headless: bool = True,
+                 workers: int | None = None, failed: dict[str, str] | None = None,
+                 resume: bool = True, use_store: bool = True,
+                 service_hours: bool | None = None) -> list[str]:
+    """
+    ログインして address_list の登記PDFをダウンロードし、保存したファイルパスを address_list の順に返す。
+    workers（既定は環境変数 DOWNLOAD_WORKERS）が2以上なら、その数のブラウザで並列に処理する。
+    interval を指定すると住所の間隔をその秒数に固定する（省略時は応答に応じて調整する）。
+    取得できなかった住所とその理由は最後に一覧で表示し、failed を渡した場合はそこにも入れる。
+    resume が True なら、同じ住所リスト・保存先の前回の実行で取得済みの住所は取得し直さない。
+    use_store が True なら、保存庫に新しいPDFがある住所はブラウザを使わずにそれを save_dir に書き出す。
+    service_hours（既定は環境変数 REGISTRY_SERVICE_HOURS）が True なら、受付時間外は次の受付時間まで待つ
+    """
+    save_path_root = Path(save_dir)
+    save_path_root.mkdir(parents=True, exist_ok=True)
+    if not address_list:
+        return []
+
+    journal = get_download_journal() if resume else None
+    run_id = make_run_id(address_list, save_dir)
+    results: dict[int, str] = {}
+    if journal is not None:
+        finished, requested = journal.start_run(run_id, address_list)
+        for idx, address in enumerate(address_list):
+            if address in finished:
+                results[idx] = finished[address]
+        if results:
+            print(f"♻️ 前回の実行で取得済みの {len(results)} 件を飛ばし、残り {len(address_list) - len(results)} 件を取得します")
+        if requested:
+            print(f"📥 前回の実行で依頼済みの {len(requested)} 件は、依頼し直さずにマイページ一覧からPDFを取り直します")
+    else:
+        requested = set()
+
+    store = get_registry_store() if use_store else None
+    if store is not None:
+        reused = 0
+        for idx, address in enumerate(address_list):
+            if idx in results:
+                continue
+            path = store.fetch(address, str(save_path_root / address_filename(address)))
+            if path is not None:
+                results[idx] = path
+                reused += 1
+                if journal is not None:
+                    journal.mark_downloaded(run_id, address, path)
+        if reused:
+            print(f"📦 保存済みの新しい登記PDF {reused} 件を使い回します（ブラウザでの取得を省略）")
+    if len(results) == len(address_list):
+        return [results[idx] for idx in sorted(results)]
+    if interval is None:
+        pacing = PacingController(DOWNLOAD_INTERVAL_SECONDS, DOWNLOAD_MIN_INTERVAL_SECONDS,
+                                  DOWNLOAD_MAX_INTERVAL_SECONDS)
+    else:
+        pacing = PacingController(interval, interval, interval)
+    breaker = CircuitBreaker(CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_COOLDOWN_SECONDS)
+    remaining = len(address_list) - len(results)
+    workers = max(1, min(workers or DOWNLOAD_WORKERS, REGISTRY_MAX_SESSIONS, remaining))
+    site_limiter = TokenBucket(REGISTRY_RPM, capacity=1) if REGISTRY_RPM > 0 else None
+
+    jobs: queue.Queue = queue.Queue()
+    for idx, address in enumerate(address_list):
+        if idx not in results:
+            jobs.put((idx, address, 1, address in requested))
+    failures: dict[int, str] = {}
+
+    scheduler = None
+    if REGISTRY_SERVICE_HOURS if service_hours is None else service_hours:
+        # 実測が出るまでは、1件あたりの所要時間をワーカー数で割った間隔で終わっていくとみなす
+        scheduler = ServiceScheduler(remaining, seconds_per_address=DOWNLOAD_SECONDS_PER_ADDRESS / workers)
+        print(f"📅 {remaining} 件の完了見込み: {scheduler.estimate(remaining):%m/%d %H:%M}"
+              f"（{scheduler.seconds_per_address():.0f}秒/件として受付時間に割り振り）")
+    args = (jobs, results, failures, save_path_root, login_url, pacing, breaker,
+            max(1, DOWNLOAD_MAX_ATTEMPTS), headless, site_limiter, len(address_list), journal, run_id, store,
+            scheduler)
+
+    if workers == 1:
+        try:
+            _download_worker(*args)
+        except Exception as e:
+            print(f"❌ ブラウザの起動・ログインに失敗: {e}")
+    else:
+        print(f"ℹ️ {workers} 個のブラウザで並列にダウンロードします")
+
+        def run_worker(slot: int):
+            try:
+                _download_worker(*args, slot=slot)
+            except Exception as e:
+                print(f"❌ ブラウザの起動・ログインに失敗: {e}")
+
+        threads = [threading.Thread(target=run_worker, args=(slot,)) for slot in range(workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
 
+    # ログインできずに残った住所も、取得できなかったものとして扱う
+    while True:
+        try:
+            idx, address, attempt, requested = jobs.get_nowait()
+        except queue.Empty:
+            break
+        failures.setdefault(idx, "ログインできなかったため未処理")
+        if journal is not None:
+            journal.mark_queued(run_id, address, failures[idx])
+
+    if failures:
+        print(f"\n⚠️ 登記PDFを取得できなかった住所が {len(failures)} 件あります")
+        for idx in sorted(failures):
+            print(f"   - {address_list[idx]}: {failures[idx]}")
+        if failed is not None:
+            failed.update({address_list[idx]: failures[idx] for idx in failures})
+    return [results[idx] for idx in sorted(results)]
 
 def login_and_download_all(playwright, address_list):
-    browser = playwright.chromium.launch(
-        executable_path="/usr/bin/chromium",  # システムに入った Chromium を指定
-        headless=True                         # サーバでは headless 推奨
-    )
-    context = browser.new_context(accept_downloads=True)
-    page = context.new_page()
-    page.goto("https://xn--udk1b673pynnijsb3h8izqr1a.com/login.php")
-    time.sleep(1)
-
-    page.locator("input[name=\"id\"]").fill("NDVM3653")
-    page.locator("input[name=\"id\"]").press("Tab")
-    time.sleep(1)
-    page.locator("input[name=\"pass\"]").fill("201810010009")
-    time.sleep(1)
-    page.get_by_role("button", name="利用規約に同意してログイン").click()
-    time.sleep(1)
+    browser, owned, context, page = open_session(playwright)
 
     for idx, address in enumerate(address_list):
         print(f"\n▶️ ({idx+1}/{len(address_list)}) 処理開始: {address}")
@@ -91,12 +478,24 @@ def login_and_download_all(playwright, address_list):
             download_owner_info(page, address)
         except Exception as e:
             print(f"❌ エラー発生: {address}\n{e}")
-        print("⏳ 次の住所まで5秒待機中...\n")
-        time.sleep(5)
-
-    # ログアウト処理
-    context.close()
-    browser.close()
+        if DOWNLOAD_INTERVAL_SECONDS > 0 and idx + 1 < len(address_list):
+            print(f"⏳ 次の住所まで{DOWNLOAD_INTERVAL_SECONDS:g}秒待機中...\n")
+            time.sleep(DOWNLOAD_INTERVAL_SECONDS)
+
+    close_session(browser, owned, context)
+
+def unique_addresses(cleaned_addresses: list[str]) -> list[str]:
+    """
+    表記ゆれだけが違う住所を1つにまとめ、省けたダウンロードの件数を表示する
+    """
+    collapsed = collapse_addresses(cleaned_addresses)
+    if collapsed.saved:
+        print(f"🧹 重複住所をまとめ、{collapsed.total} 件 → {len(collapsed.addresses)} 件"
+              f"（ダウンロードを {collapsed.saved} 件省略。うち表記ゆれ {collapsed.variants} 件）")
+        for address, variants in collapsed.groups.items():
+            if len(variants) > 1:
+                print(f"   - {address} ← {' / '.join(variants[1:])}")
+    return collapsed.addresses
 
 # 最後の方に追加
 def run_auto_mode(
@@ -104,82 +503,8 @@ def run_auto_mode(
     save_dir: str = "downloads"
 ) -> list[str]:
     cleaned_addresses = get_cleaned_addresses(pdf_path)
-    address_list = sorted(set(cleaned_addresses))
-
-    save_path_root = Path(save_dir)
-    save_path_root.mkdir(parents=True, exist_ok=True)
-
-    saved_paths: list[str] = []
-
-    with sync_playwright() as playwright:
-        browser = playwright.chromium.launch(
-            executable_path="/usr/bin/chromium",  # システムに入った Chromium を指定
-            headless=True                         # サーバでは headless 推奨
-        )
-        context = browser.new_context(accept_downloads=True)
-        page = context.new_page()
-
-        # ログイン部分
-        page.goto("https://xn--udk1b673pynnijsb3h8izqr1a.com/login.php")
-        time.sleep(1)
-        page.locator("input[name=\"id\"]").fill("NDVM3653")
-        page.locator("input[name=\"id\"]").press("Tab")
-        time.sleep(1)
-        page.locator("input[name=\"pass\"]").fill("201810010009")
-        time.sleep(1)
-        page.get_by_role("button", name="利用規約に同意してログイン").click()
-        time.sleep(1)
-
-        # 3) 各地番ごとにPDFダウンロード
-        for idx, address in enumerate(address_list):
-            print(f"\n▶️ ({idx+1}/{len(address_list)}) 処理開始: {address}")
-            try:
-                now = datetime.now()
-                # if not is_within_service_hours(now):
-                #     print(f"⚠️ 時間外スキップ: {address}")
-                #     continue
-
-                page.get_by_role("gridcell", name="不動産登記情報取得").locator("span").click()
-                time.sleep(1)
-
-                frame = page.frame(name="touki_search-iframe-frame")
-                frame.locator("#check_direct_enable-inputEl").click()
-                frame.locator("#direct_txt-inputEl").fill(address)
-                time.sleep(1)
-                frame.get_by_role("button", name="直接入力取込").click()
-                frame.get_by_role("button", name="確定").click()
-                frame.locator("img").click()
-                time.sleep(1)
-
-                frame.get_by_role("button", name="登記情報取得（オンライン）").click()
-                time.sleep(1)
-                frame.get_by_role("button", name="はい").click()
-                time.sleep(1)
-                frame.locator("#button-1005-btnEl").click()
-                time.sleep(1)
-
-                frame2 = page.frame(name="mypage_list-iframe-frame")
-                frame2.locator("#ext-gen1323").get_by_role("button", name="PDF").click()
-
-                with page.expect_download() as download_info:
-                    frame2.get_by_role("button", name="はい").click()
-                download = download_info.value
-
-                filename = address.replace(" ", "_").replace("/", "-") + ".pdf"
-                out_path = save_path_root / filename
-                download.save_as(str(out_path))
-                saved_paths.append(str(out_path))
-                print(f"✅ Downloaded PDF for: {address}")
-
-            except Exception as e:
-                print(f"❌ エラー発生: {address}\n{e}")
-            print("⏳ 次の住所まで10秒待機中...\n")
-            time.sleep(10)
-
-        context.close()
-        browser.close()
-
-    return saved_paths  # 最後に保存したファイルパスを返す
+    address_list = unique_addresses(cleaned_addresses)
+    return download_all(address_list, save_dir)  # 保存したファイルパスを返す
 
 
 # 🔒メイン実行処理、他ファイルからimportしたときは実行されないようにしてる
@@ -188,8 +513,7 @@ if __name__ == "__main__":
     pdf_path = "/mnt/c/Users/shish/Documents/ocr_doc_test-1-3.pdf"
     cleaned_addresses = get_cleaned_addresses(pdf_path)
     print("cleaned_addresses", cleaned_addresses)
-    address_list = sorted(set(cleaned_addresses))
+    address_list = unique_addresses(cleaned_addresses)
 
     with sync_playwright() as playwright:
         login_and_download_all(playwright, address_list)
-
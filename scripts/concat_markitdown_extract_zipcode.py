@@ -4,9 +4,9 @@
 
 【主な処理の流れ】
 1. 必要なライブラリ（OpenAI, MarkItDown, pandas, re, unicodedata）をインポート
-2. 郵便番号検索に使用するKEN_ALL.CSVファイルを読み込み、適切な列名を設定
+2. 郵便番号検索に使用するKEN_ALL.CSVのパスを取得（索引は初回検索時にコンパイル済みキャッシュから読み込む）
 3. 漢数字（○丁目）をアラビア数字に変換するマップと関数を定義
-4. 住所から都道府県・市区町村・町域を抽出し、KEN_ALLデータから該当する郵便番号を返す関数を定義
+4. 住所から都道府県・市区町村・町域を抽出し、KEN_ALLデータの索引（zipcode_index）から該当する郵便番号を返す関数を定義
 5. MarkItDownを用いて指定したPDFファイルをテキストに変換
 6. OpenAI GPT-4oに対して、抽出したテキストの中から「最新の相続・遺贈の所有者氏名と住所」を抽出するプロンプトを送信
 7. GPTの応答から所有者住所を抽出し、先ほどの関数を用いて郵便番号を取得・表示
@@ -25,25 +25,14 @@ import sys
 from scripts.auto_mode_chatgpt import run_auto_mode
 import os
 from dotenv import load_dotenv
+from scripts.zipcode_index import ZipcodeIndex, load_zipcode_index, default_cache_dir, cache_generation
+import threading
+import time
 
 load_dotenv()
 
 KEN_ALL_CSV_PATH = os.getenv("KEN_ALL_CSV_PATH")
 
-# 日本郵便KEN_ALL.CSV読み込み
-df = pd.read_csv(
-    KEN_ALL_CSV_PATH,
-    encoding="shift_jis",
-    header=None
-)
-df.columns = [
-    "地域コード", "変更フラグ", "郵便番号", 
-    "都道府県カナ", "市区町村カナ", "町域カナ",
-    "都道府県", "市区町村", "町域", 
-    "フラグ1", "フラグ2", "フラグ3", 
-    "フラグ4", "フラグ5", "フラグ6"
-]
-
 KANJI_NUM_MAP = {
     '一': '1', '二': '2', '三': '3', '四': '4', '五': '5',
     '六': '6', '七': '7', '八': '8', '九': '9', '十': '10'
@@ -54,9 +43,43 @@ def kanji_to_arabic(text):
         text = text.replace(kanji + '丁目', num + '丁目')
     return text
 
-def get_zipcode(address: str) -> str:
+# KEN_ALLの索引は import 時には読まず、最初の get_zipcode 呼び出しで読み込む。
+# 常駐プロセスでは KEN_ALL_RELOAD_INTERVAL 秒ごとにキャッシュの世代を確認し、
+# `zipcode_index update` で差分が反映されていれば再起動せずに読み直す
+KEN_ALL_RELOAD_INTERVAL = float(os.getenv("KEN_ALL_RELOAD_INTERVAL", "60"))
+_zipcode_index = None
+_zipcode_index_checked_at = 0.0
+_zipcode_index_lock = threading.Lock()
+
+def get_zipcode_index() -> ZipcodeIndex:
     """
-    住所文字列から郵便番号を検索して返す
+    KEN_ALLの索引を返す（初回呼び出し時にコンパイル済みキャッシュから読み込む）
+    """
+    global _zipcode_index, _zipcode_index_checked_at
+    now = time.monotonic()
+    if _zipcode_index is None or now - _zipcode_index_checked_at >= KEN_ALL_RELOAD_INTERVAL:
+        with _zipcode_index_lock:
+            if _zipcode_index is None:
+                _zipcode_index = load_zipcode_index(KEN_ALL_CSV_PATH)
+            elif now - _zipcode_index_checked_at >= KEN_ALL_RELOAD_INTERVAL:
+                cache_dir = default_cache_dir(KEN_ALL_CSV_PATH)
+                generation = cache_generation(cache_dir)
+                # 世代が読めないのは差分更新がキャッシュを置き換えている最中なので、次の確認まで今の索引を使う。
+                # ここで load_zipcode_index を呼ぶと元CSVから再コンパイルされ、反映済みの差分が消えてしまう
+                if generation is not None and generation != _zipcode_index.meta.get("generation", 0):
+                    try:
+                        reloaded = ZipcodeIndex.load(cache_dir)
+                    except OSError as e:
+                        print(f"⚠️ KEN_ALLキャッシュを読み直せなかったため、次の確認まで今の索引を使います: {e}")
+                    else:
+                        print("🔄 KEN_ALLキャッシュが更新されたため読み直します")
+                        _zipcode_index = reloaded
+            _zipcode_index_checked_at = now
+    return _zipcode_index
+
+def parse_address(address: str) -> tuple[str, str, str]:
+    """
+    住所文字列を (都道府県, 市区町村, 町域) に分解する
     """
     address = unicodedata.normalize("NFKC", address)
     address = kanji_to_arabic(address)
@@ -68,22 +91,27 @@ def get_zipcode(address: str) -> str:
     pref, city, rest = m.groups()
     rest = rest.split()[0]
     town = re.split(r"[\d\-－ー0-9]", rest)[0]
+    return pref, city, town
 
-    result = df[
-        (df["都道府県"] == pref) &
-        (df["市区町村"] == city) &
-        (df["町域"] == town)
-    ]
-    if result.empty:
-        result = df[
-            (df["都道府県"] == pref) &
-            (df["市区町村"] == city) &
-            (df["町域"].str.contains(town))
-        ]
-    if not result.empty:
-        zip7 = str(result.iloc[0]["郵便番号"]).zfill(7)
-        return f"{zip7[:3]}-{zip7[3:]}"
-    return "該当なし"
+def get_zipcode(address: str) -> str:
+    """
+    住所文字列から郵便番号を検索して返す
+    """
+    zipcode = get_zipcode_index().lookup(*parse_address(address))
+    return zipcode if zipcode is not None else "該当なし"
+
+def get_zipcodes(addresses) -> list[str]:
+    """
+    住所の列（list や DataFrame の列）をまとめて郵便番号に変換する。
+    同じ住所は一度だけ検索し、入力と同じ順序で結果を返す
+    """
+    resolved: dict[str, str] = {}
+    results = []
+    for address in addresses:
+        if address not in resolved:
+            resolved[address] = get_zipcode(address)
+        results.append(resolved[address])
+    return results
 
 # テスト用メイン関数
 def main():
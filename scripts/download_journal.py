@@ -0,0 +1,167 @@
+'''
+登記PDFダウンロードの進み具合を住所ごとに SQLite に記録するジャーナル。
+
+数百件のダウンロードは数時間かかるため、途中で落ちたり Streamlit が再実行されたりしても、
+同じ住所リスト・保存先でもう一度実行すれば、取得済みの住所は飛ばして続きから再開できるようにする。
+
+住所ごとの状態:
+  queued       まだ取得していない（再試行待ちも含む）
+  in_progress  取得中（この状態のまま残っていれば、前回の実行が途中で止まったということ）
+  requested    登記情報の取得を依頼済みで、PDFはまだ保存していない
+  downloaded   取得済み（path に保存先）
+  failed       上限まで試しても取得できなかった（error に理由）
+
+取得を依頼した時刻は requested_at に別に残し、その後 queued・in_progress に戻っても消さない。
+依頼は料金がかかるので、再開したときに依頼済みの住所はもう一度依頼せず、マイページ一覧からPDFだけを取り直す。
+
+状態の書き込みは1件ずつトランザクションで行うので、どの時点で止まっても記録は壊れない。
+実行の区別（run_id）は保存先と住所リストから決めるので、同じ台帳を同じ保存先に処理し直せば同じ実行とみなす。
+
+環境変数:
+  DOWNLOAD_JOURNAL_ENABLED        0 にするとジャーナルを使わない（毎回すべて取得し直す）
+  DOWNLOAD_JOURNAL_PATH           保存先（既定: cache/download_journal.db）
+  DOWNLOAD_JOURNAL_MAX_AGE_HOURS  これより前に取得した住所は取得済みとみなさない（既定: 24時間）
+'''
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from scripts.env_utils import env_bool
+
+DOWNLOAD_JOURNAL_ENABLED = env_bool("DOWNLOAD_JOURNAL_ENABLED", True)
+DOWNLOAD_JOURNAL_PATH = os.getenv("DOWNLOAD_JOURNAL_PATH", os.path.join("cache", "download_journal.db"))
+DOWNLOAD_JOURNAL_MAX_AGE = float(os.getenv("DOWNLOAD_JOURNAL_MAX_AGE_HOURS", "24")) * 3600
+
+QUEUED = "queued"
+IN_PROGRESS = "in_progress"
+REQUESTED = "requested"
+DOWNLOADED = "downloaded"
+FAILED = "failed"
+
+_journal = None
+
+
+def make_run_id(address_list: list[str], save_dir: str) -> str:
+    payload = json.dumps([os.path.abspath(save_dir), sorted(address_list)], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+class DownloadJournal:
+    def __init__(self, path: str, max_age: float | None = None):
+        self.path = path
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS jobs (
+                run_id TEXT,
+                address TEXT,
+                state TEXT,
+                path TEXT,
+                attempts INTEGER DEFAULT 0,
+                error TEXT,
+                updated_at REAL,
+                requested_at REAL,
+                PRIMARY KEY (run_id, address)
+            )
+        ''')
+        # requested_at が無かった頃に作ったジャーナルにも列を足す
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")]
+        if "requested_at" not in columns:
+            self._conn.execute("ALTER TABLE jobs ADD COLUMN requested_at REAL")
+        self._conn.commit()
+
+    def start_run(self, run_id: str, address_list: list[str]) -> tuple[dict[str, str], set[str]]:
+        """
+        実行を始める（再開する）。(取得済みでファイルも残っている住所の {住所: パス}, 依頼済みの住所) を返す。
+        依頼済み（古くないもの）は requested のまま残し、
+        それ以外（未取得・取得中のまま止まったもの・前回失敗したもの・古いもの）は queued に戻す
+        """
+        now = time.time()
+        finished = {}
+        requested = set()
+        with self._lock, self._conn:
+            rows = self._conn.execute(
+                "SELECT address, state, path, updated_at, requested_at FROM jobs WHERE run_id=?", (run_id,)
+            ).fetchall()
+            known = {row[0]: row[1:] for row in rows}
+            for address in address_list:
+                state, path, updated_at, requested_at = known.get(address, (None, None, None, None))
+                fresh = self.max_age is None or (updated_at or 0) + self.max_age >= now
+                if state == DOWNLOADED and fresh and path and os.path.exists(path):
+                    finished[address] = path
+                    continue
+                if requested_at is not None and (self.max_age is None or requested_at + self.max_age >= now):
+                    requested.add(address)
+                    self._conn.execute(
+                        "UPDATE jobs SET state=?, path=NULL, attempts=0, updated_at=? WHERE run_id=? AND address=?",
+                        (REQUESTED, now, run_id, address)
+                    )
+                    continue
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO jobs "
+                    "(run_id, address, state, path, attempts, error, updated_at, requested_at) "
+                    "VALUES (?, ?, ?, NULL, 0, NULL, ?, NULL)",
+                    (run_id, address, QUEUED, now)
+                )
+        return finished, requested
+
+    def _update(self, run_id: str, address: str, state: str, path: str | None = None,
+                error: str | None = None, attempt: bool = False) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE jobs SET state=?, path=?, error=?, updated_at=?, attempts=attempts+? "
+                "WHERE run_id=? AND address=?",
+                (state, path, error, time.time(), 1 if attempt else 0, run_id, address)
+            )
+
+    def mark_in_progress(self, run_id: str, address: str) -> None:
+        self._update(run_id, address, IN_PROGRESS, attempt=True)
+
+    def mark_requested(self, run_id: str, address: str) -> None:
+        with self._lock, self._conn:
+            now = time.time()
+            self._conn.execute(
+                "UPDATE jobs SET state=?, updated_at=?, requested_at=? WHERE run_id=? AND address=?",
+                (REQUESTED, now, now, run_id, address)
+            )
+
+    def mark_queued(self, run_id: str, address: str, error: str | None = None) -> None:
+        self._update(run_id, address, QUEUED, error=error)
+
+    def mark_downloaded(self, run_id: str, address: str, path: str) -> None:
+        self._update(run_id, address, DOWNLOADED, path=path)
+
+    def mark_failed(self, run_id: str, address: str, error: str) -> None:
+        self._update(run_id, address, FAILED, error=error)
+
+    def summary(self, run_id: str) -> dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT state, COUNT(*) FROM jobs WHERE run_id=? GROUP BY state", (run_id,)
+            ).fetchall()
+        return dict(rows)
+
+    def entries(self, run_id: str) -> list[dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT address, state, path, attempts, error, updated_at, requested_at FROM jobs "
+                "WHERE run_id=? ORDER BY address",
+                (run_id,)
+            ).fetchall()
+        keys = ("address", "state", "path", "attempts", "error", "updated_at", "requested_at")
+        return [dict(zip(keys, row)) for row in rows]
+
+
+def get_download_journal() -> DownloadJournal | None:
+    global _journal
+    if not DOWNLOAD_JOURNAL_ENABLED:
+        return None
+    if _journal is None:
+        _journal = DownloadJournal(DOWNLOAD_JOURNAL_PATH, max_age=DOWNLOAD_JOURNAL_MAX_AGE)
+    return _journal
@@ -0,0 +1,109 @@
+'''
+登記PDFダウンロードの間隔調整（ペーシング）とサーキットブレーカー。
+
+住所ごとに固定で10秒空けるのではなく、直近の応答時間とエラー率から次の依頼までの間隔を決める。
+  - 成功が続いている間は間隔を縮める（ただし応答が遅いときは応答時間に応じた間隔は空ける）
+  - 失敗したら間隔を倍にして、サイトへの負荷を下げる
+失敗が続いてサイトが落ちていると判断したら（サーキットブレーカーが開いたら）、
+一定時間すべてのワーカーを止め、その後1件だけ試して回復を確かめてから再開する。
+
+並列ダウンロードのワーカー間で共有して使う（スレッドセーフ）。
+'''
+
+import threading
+import time
+
+
+class PacingController:
+    """
+    依頼と依頼の間隔を、応答時間・エラー率の指数移動平均から決める
+    """
+
+    def __init__(self, initial: float, min_interval: float, max_interval: float,
+                 latency_factor: float = 0.2, decrease: float = 0.7, smoothing: float = 0.3):
+        self.min_interval = min_interval
+        self.max_interval = max(max_interval, min_interval)
+        self.interval = min(max(initial, min_interval), self.max_interval)
+        self.latency_factor = latency_factor
+        self.decrease = decrease
+        self.smoothing = smoothing
+        self.latency: float | None = None
+        self.error_rate = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, latency: float, ok: bool) -> None:
+        with self._lock:
+            a = self.smoothing
+            self.latency = latency if self.latency is None else (1 - a) * self.latency + a * latency
+            self.error_rate = (1 - a) * self.error_rate + a * (0.0 if ok else 1.0)
+            if ok:
+                # 応答が遅いときは、その分だけは間隔を空けておく
+                floor = self.min_interval + self.latency * self.latency_factor
+                self.interval = max(floor, self.interval * self.decrease)
+            else:
+                self.interval = max(self.interval, self.min_interval, 1.0) * 2
+            self.interval = min(self.interval, self.max_interval)
+
+    def next_delay(self) -> float:
+        """
+        次の依頼までに空ける秒数（エラー率が高いほど長くする）
+        """
+        with self._lock:
+            return min(self.max_interval, self.interval * (1 + self.error_rate))
+
+
+class CircuitBreaker:
+    """
+    failure_threshold 回続けて失敗したら開き、cooldown 秒たつまで wait() で待たせる。
+    開いた後の最初の1件が成功すれば閉じ、失敗すれば待ち時間を倍にして（max_cooldown まで）また開く
+    """
+
+    def __init__(self, failure_threshold: int, cooldown: float, max_cooldown: float | None = None,
+                 clock=time.monotonic, sleep=time.sleep):
+        self.failure_threshold = failure_threshold
+        self.base_cooldown = cooldown
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown if max_cooldown is not None else cooldown * 8
+        self.failures = 0
+        self.opened_at: float | None = None
+        self.trips = 0
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        return self.opened_at is not None
+
+    def wait(self) -> float:
+        """
+        開いていれば閉じる（試行を再開できる）まで待つ。待った秒数を返す
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                if self.opened_at is None:
+                    return waited
+                remaining = self.opened_at + self.cooldown - self._clock()
+                if remaining <= 0:
+                    # 半開: 1件だけ試させ、結果が出るまで他のワーカーは待たせる
+                    self.opened_at = self._clock() + 10 ** 9
+                    return waited
+            self._sleep(min(remaining, 5.0))
+            waited += min(remaining, 5.0)
+
+    def record(self, ok: bool) -> None:
+        with self._lock:
+            if ok:
+                self.failures = 0
+                self.opened_at = None
+                self.cooldown = self.base_cooldown
+                return
+            self.failures += 1
+            half_open = self.opened_at is not None
+            if half_open or self.failures >= self.failure_threshold:
+                if half_open:
+                    self.cooldown = min(self.cooldown * 2, self.max_cooldown)
+                self.opened_at = self._clock()
+                self.trips += 1
+                print(f"🛑 失敗が続いているため {self.cooldown:.0f}秒 ダウンロードを止めます")
@@ -0,0 +1,18 @@
+'''
+環境変数で指定する設定値の読み取り。
+'''
+
+import os
+
+# オン／オフの設定で「オン」とみなす値（大文字・小文字は区別しない）
+TRUE_VALUES = ("1", "true", "yes", "on")
+
+
+def env_bool(name: str, default: bool, true_values: tuple[str, ...] = TRUE_VALUES) -> bool:
+    """
+    オン／オフの設定を読む。未設定なら default、設定されていれば true_values のどれかならオン
+    """
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in true_values
@@ -3,55 +3,345 @@ PDFファイルから登記所の名前と相続関連の住所一覧を一括
 '''
 
 from google.cloud import vision
-from pdf2image import convert_from_path
-from openai import OpenAI
-from tempfile import TemporaryDirectory
+from pdf2image import convert_from_path, pdfinfo_from_path
+from concurrent.futures import ThreadPoolExecutor
+from collections import deque
 import os
 import io
 import re
+import unicodedata
 from dotenv import load_dotenv
+from scripts.env_utils import env_bool
+from scripts.ocr_preprocess import OcrImageSettings, preprocess_image
+from scripts.pdf_text_layer import extract_text_layer, is_usable_text
+from scripts.cache_store import SqliteCache
+from scripts.llm_client import chat_completion
+from scripts.ledger_parser import parse_ledger
+from scripts.prompt_filter import ledger_header
+from scripts.registry_office import resolve_registry_office
+from scripts.file_utils import file_sha256
 import json
 from google.oauth2 import service_account
 from google.cloud.vision_v1 import ImageAnnotatorClient
-from google.cloud.vision_v1.types import Image
+from google.cloud.vision_v1.types import (
+    AnnotateFileRequest, AnnotateImageRequest, Feature, Image, InputConfig
+)
 
 load_dotenv()
 
-# ── OpenAI クライアントの初期化 ──
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-openai_client = OpenAI(api_key=OPENAI_API_KEY)
+# OCR の同時実行数（Vision API へのリクエストを並列に投げるページ数）
+OCR_MAX_WORKERS = int(os.getenv("OCR_MAX_WORKERS", "4"))
+
+# OCR の送り方: "page"（1ページ1リクエスト）/ "batch"（複数画像を1リクエスト）/ "file"（PDFを直接送信）
+OCR_BACKEND = os.getenv("OCR_BACKEND", "page")
+# batch_annotate_images 1回あたりの上限（Vision API の同期リクエストは最大16画像）
+OCR_BATCH_MAX_IMAGES = int(os.getenv("OCR_BATCH_MAX_IMAGES", "16"))
+OCR_BATCH_MAX_BYTES = int(os.getenv("OCR_BATCH_MAX_BYTES", str(8 * 1024 * 1024)))
+# batch_annotate_files 1回あたりのページ数（同期のファイルアノテーションは最大5ページ）
+OCR_FILE_MAX_PAGES = int(os.getenv("OCR_FILE_MAX_PAGES", "5"))
+
+# PDF を一度に画像化するページ数（大きくすると pdftoppm の起動回数は減るが、メモリ使用量が増える）
+OCR_RASTER_WINDOW = int(os.getenv("OCR_RASTER_WINDOW", "1"))
+
+# 埋め込みテキスト層のあるページは OCR せずにそのテキストを使う
+OCR_USE_TEXT_LAYER = env_bool("OCR_USE_TEXT_LAYER", True)
+
+# OCR結果のキャッシュ（PDFの内容ハッシュ・ページ番号・OCR設定ごとに保存し、同じ台帳は二度OCRしない）
+OCR_CACHE_ENABLED = env_bool("OCR_CACHE_ENABLED", True)
+OCR_CACHE_PATH = os.getenv("OCR_CACHE_PATH", os.path.join("cache", "ocr_cache.db"))
+OCR_CACHE_MAX_BYTES = int(float(os.getenv("OCR_CACHE_MAX_MB", "200")) * 1024 * 1024)
+
+# 住所抽出のチャンク分割（1チャンクの最大文字数・前のチャンクと重ねる行数・並列数）
+ADDRESS_CHUNK_MAX_CHARS = int(os.getenv("ADDRESS_CHUNK_MAX_CHARS", "6000"))
+ADDRESS_CHUNK_OVERLAP_LINES = int(os.getenv("ADDRESS_CHUNK_OVERLAP_LINES", "3"))
+ADDRESS_EXTRACT_WORKERS = int(os.getenv("ADDRESS_EXTRACT_WORKERS", "4"))
+
+# 住所抽出の方式: "rules"（ルールベース + 判定不能行のみLLM）/ "llm"（全文をLLM）
+ADDRESS_PARSER = os.getenv("ADDRESS_PARSER", "rules")
+
+DOCUMENT_TEXT_FEATURE = Feature(type_=Feature.Type.DOCUMENT_TEXT_DETECTION)
 
 # ── Google Vision 用認証情報のセットアップ ──
 # streamlit_mvp.py で os.environ["GCP_SA_INFO_JSON"] にセットした文字列 JSON を読み込む
-sa_info_json = os.getenv("GCP_SA_INFO_JSON")
-if sa_info_json:
-    sa_info = json.loads(sa_info_json)
-    creds = service_account.Credentials.from_service_account_info(sa_info)
-    vision_client = vision.ImageAnnotatorClient(credentials=creds)
-else:
-    # ローカル開発時に GOOGLE_APPLICATION_CREDENTIALS 環境変数経由で読み込みたい場合
-    vision_client = vision.ImageAnnotatorClient()
-
-def ocr_pdf(pdf_path: str) -> str:
-    client_vision = vision_client
-    all_text = []
-    with TemporaryDirectory() as tempdir:
-        print("✅ PDF → 画像変換中...")
-        images = convert_from_path(pdf_path, dpi=300, output_folder=tempdir, fmt='png')
-        for idx, image in enumerate(images, 1):
-            image_path = os.path.join(tempdir, f"page_{idx}.png")
-            image.save(image_path, "PNG")
+_vision_client = None
+
+def get_vision_client() -> ImageAnnotatorClient:
+    global _vision_client
+    if _vision_client is None:
+        sa_info_json = os.getenv("GCP_SA_INFO_JSON")
+        if sa_info_json:
+            sa_info = json.loads(sa_info_json)
+            creds = service_account.Credentials.from_service_account_info(sa_info)
+            _vision_client = vision.ImageAnnotatorClient(credentials=creds)
+        else:
+            # ローカル開発時に GOOGLE_APPLICATION_CREDENTIALS 環境変数経由で読み込みたい場合
+            _vision_client = vision.ImageAnnotatorClient()
+    return _vision_client
+
+def _response_text(idx: int, response) -> str | None:
+    """
+    Vision の1ページ分の応答からテキストを取り出す。エラーなら表示して None を返す
+    """
+    if response.error.message:
+        print(f"❌ Page {idx} OCR失敗: {response.error.message}")
+        return None
+    return response.full_text_annotation.text
+
+def _map_in_order(func, items, max_workers: int) -> list:
+    """
+    items に func を最大 max_workers 並列で適用し、入力順に結果を返す。
+    items はジェネレータでもよく、先読みは同時実行数の2倍までに抑える（メモリ使用量を一定に保つため）
+    """
+    if max_workers == 1:
+        return [func(item) for item in items]
+    results = []
+    pending = deque()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for item in items:
+            pending.append(executor.submit(func, item))
+            if len(pending) >= max_workers * 2:
+                results.append(pending.popleft().result())
+        while pending:
+            results.append(pending.popleft().result())
+    return results
+
+def _make_batches(contents):
+    """
+    ページ画像を batch_annotate_images 1回分ずつにまとめる（枚数と合計バイト数の上限内で最大限詰める）
+    """
+    current, current_bytes = [], 0
+    for idx, content in enumerate(contents, 1):
+        if current and (len(current) >= OCR_BATCH_MAX_IMAGES
+                        or current_bytes + len(content) > OCR_BATCH_MAX_BYTES):
+            yield current
+            current, current_bytes = [], 0
+        current.append((idx, content))
+        current_bytes += len(content)
+    if current:
+        yield current
+
+def _page_runs(pages: list[int], window: int) -> list[tuple[int, int]]:
+    """
+    ページ番号のリストを、連続していて window ページ以内の (first, last) の組に分ける
+    """
+    runs = []
+    for page in pages:
+        if runs and page == runs[-1][1] + 1 and page - runs[-1][0] < window:
+            runs[-1] = (runs[-1][0], page)
+        else:
+            runs.append((page, page))
+    return runs
+
+def iter_page_images(pdf_path: str, settings: OcrImageSettings | None = None,
+                     window: int | None = None, pages: list[int] | None = None):
+    """
+    PDFを window ページずつ画像化し、前処理（ocr_preprocess）をかけたバイト列を1ページずつ返すジェネレータ。
+    全ページを一度にデコードしないので、ページ数が増えてもメモリ使用量はほぼ一定。
+    pages（1始まりのページ番号）を指定した場合はそのページだけを画像化する
+    """
+    settings = settings or OcrImageSettings.from_env()
+    window = max(1, window or OCR_RASTER_WINDOW)
+    if pages is None:
+        pages = list(range(1, pdfinfo_from_path(pdf_path)["Pages"] + 1))
+    for first, last in _page_runs(pages, window):
+        images = convert_from_path(pdf_path, dpi=settings.dpi, first_page=first, last_page=last)
+        for image in images:
+            content = preprocess_image(image, settings)
+            image.close()
+            yield content
+
+_ocr_cache = None
+
+def get_ocr_cache() -> SqliteCache:
+    global _ocr_cache
+    if _ocr_cache is None:
+        _ocr_cache = SqliteCache(OCR_CACHE_PATH, max_bytes=OCR_CACHE_MAX_BYTES)
+    return _ocr_cache
+
+def ocr_cache_key(pdf_hash: str, page: int, backend: str, settings: OcrImageSettings) -> str:
+    # "file" は PDF をそのまま送るので画像の前処理設定は結果に影響しない
+    settings_key = "pdf" if backend == "file" else settings.cache_key()
+    return f"{pdf_hash}:{page}:{backend}:{settings_key}"
+
+def ocr_images(contents, client=None, max_workers: int | None = None,
+               backend: str = "page", page_numbers: list[int] | None = None) -> list[str | None]:
+    """
+    ページ画像（PNG等のバイト列のリストまたはジェネレータ）をOCRし、ページ順のテキストのリストを返す。
+    失敗したページは None になる。max_workers 件まで並列に Vision API を呼び出す。
+    page_numbers はログ表示用のページ番号（省略時は 1, 2, 3, ...）
+
+    backend:
+      "page"  … 1ページ1リクエスト（document_text_detection）
+      "batch" … 複数ページを1リクエストにまとめる（batch_annotate_images）
+    """
+    client_vision = client or get_vision_client()
+    max_workers = max(1, max_workers or OCR_MAX_WORKERS)
+    numbered = zip(page_numbers, contents) if page_numbers is not None else enumerate(contents, 1)
+
+    if backend == "page":
+        def ocr_page(idx_content):
+            idx, content = idx_content
             print(f"📄 Page {idx} OCR実行中...")
-            with open(image_path, "rb") as image_file:
-                content = image_file.read()
             response = client_vision.document_text_detection(image=Image(content=content))
-            if response.error.message:
-                print(f"❌ Page {idx} OCR失敗: {response.error.message}")
+            return _response_text(idx, response)
+
+        return _map_in_order(ocr_page, numbered, max_workers)
+
+    if backend == "batch":
+        def ocr_batch(batch):
+            print(f"📄 Page {batch[0][0]}-{batch[-1][0]} OCR実行中（{len(batch)}ページ一括）...")
+            response = client_vision.batch_annotate_images(requests=[
+                AnnotateImageRequest(image=Image(content=content), features=[DOCUMENT_TEXT_FEATURE])
+                for _, content in batch
+            ])
+            return [_response_text(idx, r) for (idx, _), r in zip(batch, response.responses)]
+
+        results = _map_in_order(ocr_batch, _make_batches(numbered), max_workers)
+        return [text for batch_texts in results for text in batch_texts]
+
+    raise ValueError(f"未対応のOCRバックエンドです: {backend}")
+
+def split_pdf_pages(pdf_path: str, page_groups: list[list[int]]) -> list[bytes]:
+    """
+    PDFから page_groups（1始まりのページ番号のリストのリスト）ごとにページを抜き出し、
+    それぞれを小さなPDFのバイト列にして返す
+    """
+    from pypdf import PdfReader, PdfWriter
+
+    reader = PdfReader(pdf_path)
+    parts = []
+    for group in page_groups:
+        writer = PdfWriter()
+        for page in group:
+            writer.add_page(reader.pages[page - 1])
+        buffer = io.BytesIO()
+        writer.write(buffer)
+        parts.append(buffer.getvalue())
+    return parts
+
+def ocr_pdf_file(pdf_path: str, client=None, max_workers: int | None = None,
+                 pages: list[int] | None = None) -> list[str | None]:
+    """
+    PDFファイルをそのまま Vision のファイル単位アノテーション（batch_annotate_files）に送り、
+    ページ順のテキストのリストを返す。1リクエストあたり OCR_FILE_MAX_PAGES ページずつ処理する。
+    各リクエストには、そのページだけを抜き出したPDFを送る（PDF全体を毎回送らない）。
+    pages（1始まりのページ番号）を指定した場合はそのページだけをOCRする
+    """
+    client_vision = client or get_vision_client()
+    max_workers = max(1, max_workers or OCR_MAX_WORKERS)
+    if pages is None:
+        pages = list(range(1, pdfinfo_from_path(pdf_path)["Pages"] + 1))
+    page_groups = [pages[i:i + OCR_FILE_MAX_PAGES] for i in range(0, len(pages), OCR_FILE_MAX_PAGES)]
+    parts = split_pdf_pages(pdf_path, page_groups)
+
+    def ocr_pages(group_part):
+        group, part = group_part
+        print(f"📄 Page {group[0]}-{group[-1]} OCR実行中（PDF直接）...")
+        response = client_vision.batch_annotate_files(requests=[AnnotateFileRequest(
+            input_config=InputConfig(content=part, mime_type="application/pdf"),
+            features=[DOCUMENT_TEXT_FEATURE],
+            pages=list(range(1, len(group) + 1)),
+        )])
+        file_response = response.responses[0]
+        if file_response.error.message:
+            print(f"❌ Page {group[0]}-{group[-1]} OCR失敗: {file_response.error.message}")
+            return [None] * len(group)
+        return [_response_text(idx, r) for idx, r in zip(group, file_response.responses)]
+
+    results = _map_in_order(ocr_pages, list(zip(page_groups, parts)), max_workers)
+    return [text for group_texts in results for text in group_texts]
+
+def ocr_pdf_pages(pdf_path: str, max_workers: int | None = None, client=None,
+                  backend: str | None = None, settings: OcrImageSettings | None = None,
+                  use_text_layer: bool | None = None, use_cache: bool | None = None,
+                  pages: list[int] | None = None) -> list[str | None]:
+    """
+    PDFをページごとにテキスト化し、ページ順のリストを返す（OCRに失敗したページは None）。
+    pages（1始まりのページ番号）を指定した場合は、そのページだけをOCRする（他のページは None）。
+
+    use_text_layer が有効（既定、環境変数 OCR_USE_TEXT_LAYER）なら、まず埋め込みテキスト層を読み、
+    使えるテキストがあるページはそれを採用する。
+    use_cache が有効（既定、環境変数 OCR_CACHE_ENABLED）なら、同じ内容のPDF・ページ・OCR設定で
+    過去にOCRした結果を再利用する。Vision に送るのは残りのページだけ
+    """
+    backend = backend or OCR_BACKEND
+    if use_text_layer is None:
+        use_text_layer = OCR_USE_TEXT_LAYER
+
+    texts: list[str | None] = []
+    if use_text_layer:
+        try:
+            if pages is None:
+                texts = [t if is_usable_text(t) else None for t in extract_text_layer(pdf_path)]
             else:
-                all_text.append(response.full_text_annotation.text)
-    return "\n".join(all_text)
+                # 指定したページだけを解析する（1ページ目だけ読むときに全ページをレイアウト解析しない）
+                texts = [None] * pdfinfo_from_path(pdf_path)["Pages"]
+                targets = [idx for idx in sorted(set(pages)) if 1 <= idx <= len(texts)]
+                for idx, t in zip(targets, extract_text_layer(pdf_path, targets)):
+                    texts[idx - 1] = t if is_usable_text(t) else None
+        except Exception as e:
+            print(f"⚠️ テキスト層の読み取りに失敗したため全ページOCRします: {e}")
+            texts = []
+    if not texts:
+        texts = [None] * pdfinfo_from_path(pdf_path)["Pages"]
+
+    wanted = range(1, len(texts) + 1) if pages is None else [idx for idx in sorted(set(pages)) if 1 <= idx <= len(texts)]
+    if pages is not None:
+        texts = [text if idx in wanted else None for idx, text in enumerate(texts, 1)]
+    ocr_targets = [idx for idx in wanted if texts[idx - 1] is None]
+    if len(ocr_targets) < len(wanted):
+        print(f"✅ テキスト層を利用: {len(wanted) - len(ocr_targets)}/{len(wanted)} ページ（OCR不要）")
+
+    if use_cache is None:
+        use_cache = OCR_CACHE_ENABLED
+    if use_cache and ocr_targets:
+        settings = settings or OcrImageSettings.from_env()
+        cache = get_ocr_cache()
+        pdf_hash = file_sha256(pdf_path)
+        for idx in ocr_targets:
+            texts[idx - 1] = cache.get(ocr_cache_key(pdf_hash, idx, backend, settings))
+        cached = [idx for idx in ocr_targets if texts[idx - 1] is not None]
+        if cached:
+            print(f"✅ OCRキャッシュを利用: {len(cached)} ページ")
+        ocr_targets = [idx for idx in ocr_targets if texts[idx - 1] is None]
+    if not ocr_targets:
+        return texts
+
+    if backend == "file":
+        ocr_texts = ocr_pdf_file(pdf_path, client=client, max_workers=max_workers, pages=ocr_targets)
+    else:
+        print("✅ PDF → 画像変換中...")
+        contents = iter_page_images(pdf_path, settings, pages=ocr_targets)
+        ocr_texts = ocr_images(contents, client=client, max_workers=max_workers,
+                               backend=backend, page_numbers=ocr_targets)
+    for idx, text in zip(ocr_targets, ocr_texts):
+        texts[idx - 1] = text
+        # 失敗したページはキャッシュせず、次回もう一度OCRする
+        if use_cache and text is not None:
+            cache.set(ocr_cache_key(pdf_hash, idx, backend, settings), text)
+    return texts
+
+def ocr_pdf(pdf_path: str, max_workers: int | None = None, client=None,
+            backend: str | None = None, settings: OcrImageSettings | None = None,
+            use_text_layer: bool | None = None, use_cache: bool | None = None) -> str:
+    """
+    PDFをOCRしてページ順に連結したテキストを返す。
+    backend は "page"（既定）/ "batch" / "file" から選ぶ（省略時は環境変数 OCR_BACKEND）。
+    settings はページ画像の前処理設定（"file" の場合はPDFをそのまま送るので使わない）。
+    埋め込みテキスト層のあるページやOCRキャッシュにあるページは Vision に送らない（use_text_layer, use_cache）
+    """
+    texts = ocr_pdf_pages(pdf_path, max_workers=max_workers, client=client, backend=backend,
+                          settings=settings, use_text_layer=use_text_layer, use_cache=use_cache)
+    return "\n".join(text for text in texts if text is not None)
 
 def extract_registry_office(text_data: str) -> str:
+    # 登記所名は1ページ目の冒頭にしか無いので、ヘッダー部分だけを見る
+    text_data = ledger_header(text_data)
+    # まず登記所一覧と照合し、見つからないときだけ LLM に読ませる
+    office = resolve_registry_office(text_data)
+    if office:
+        return office
+    print("ℹ️ 登記所一覧と照合できなかったためLLMで登記所名を読み取ります")
     prompt = f"""
 以下のOCRテキストから、冒頭に書かれている「登記所の名前」のみを抽出してください。
 
@@ -66,12 +356,14 @@ def extract_registry_office(text_data: str) -> str:
 【テキスト終了】
 
 """
-    response = openai_client.chat.completions.create(
-        model="gpt-4o",
-        messages=[{"role": "user", "content": prompt}],
-        temperature=0.0
-    )
-    return response.choices[0].message.content.strip()
+    return chat_completion(prompt, model="gpt-4o", temperature=0.0).strip()
+
+def extract_registry_office_from_pdf(pdf_path: str) -> str:
+    """
+    受付帳PDFの1ページ目だけをテキスト化（OCRキャッシュがあればそれを利用）して登記所名を返す
+    """
+    texts = ocr_pdf_pages(pdf_path, pages=[1])
+    return extract_registry_office(texts[0] or "")
 
 def extract_addresses(text_data: str) -> list[str]:
     prompt = f"""
@@ -87,16 +379,12 @@ def extract_addresses(text_data: str) -> list[str]:
 {text_data}
 【テキスト終了】
 """
-    response = openai_client.chat.completions.create(
-        model="gpt-4o",
-        messages=[{"role": "user", "content": prompt}],
-        temperature=0.0
-    )
+    output = chat_completion(prompt, model="gpt-4o", temperature=0.0)
 
     # ① マークダウンの「1. 」などを除去 → 「-」や「・」なども除去
     raw_lines = [
         re.sub(r"^(\d+\.\s*|[-・\s]*)", "", line).strip()
-        for line in response.choices[0].message.content.strip().splitlines()
+        for line in output.strip().splitlines()
     ]
 
     # ② 「都道府県市区町村」が含まれており、数字もある行を抽出
@@ -106,10 +394,111 @@ def extract_addresses(text_data: str) -> list[str]:
     return [re.sub(r"\s?外\s?\d+", "", addr).strip() for addr in filtered]
 
 
+def split_into_chunks(pages: list[str], max_chars: int | None = None,
+                      overlap_lines: int | None = None) -> list[tuple[str, str]]:
+    """
+    OCRテキストを住所抽出用のチャンクに分ける。(チャンク本文, 直前のチャンクと重なっている部分) のリストを返す。
+    基本はページ単位で、1ページが max_chars を超える場合は行のまとまりで分け、
+    行の途中で登記行が切れないよう直前の overlap_lines 行を次のチャンクの先頭にも含める
+    """
+    max_chars = max_chars or ADDRESS_CHUNK_MAX_CHARS
+    overlap_lines = ADDRESS_CHUNK_OVERLAP_LINES if overlap_lines is None else overlap_lines
+    chunks = []
+    for page in pages:
+        if len(page) <= max_chars:
+            chunks.append((page, ""))
+            continue
+        lines = page.splitlines()
+        block: list[str] = []
+        overlap: list[str] = []
+        for line in lines:
+            if block and sum(len(l) + 1 for l in block) + len(line) > max_chars and len(block) > len(overlap):
+                chunks.append(("\n".join(block), "\n".join(overlap)))
+                overlap = block[-overlap_lines:] if overlap_lines else []
+                block = list(overlap)
+            block.append(line)
+        if len(block) > len(overlap):
+            chunks.append(("\n".join(block), "\n".join(overlap)))
+    return chunks
+
+def _compact(text: str) -> str:
+    return re.sub(r"\s", "", unicodedata.normalize("NFKC", text))
+
+def merge_chunk_addresses(results: list[list[str]], overlaps: list[str]) -> list[str]:
+    """
+    チャンクごとの抽出結果を連結する。
+    重なり部分に書かれている住所は前後のチャンクで二重に抽出されるので、後ろのチャンクから
+    「重なり部分での出現回数」と「直前のチャンクでの抽出回数」の小さい方だけ取り除く
+    （台帳上で本当に重複している住所は残す）
+    """
+    merged: list[str] = []
+    previous: list[str] = []
+    for addresses, overlap in zip(results, overlaps):
+        kept = list(addresses)
+        if overlap:
+            compact_overlap = _compact(overlap)
+            for addr in set(addresses):
+                in_overlap = compact_overlap.count(_compact(addr)) if _compact(addr) else 0
+                duplicates = min(in_overlap, previous.count(addr), kept.count(addr))
+                for _ in range(duplicates):
+                    kept.remove(addr)
+        merged.extend(kept)
+        previous = addresses
+    return merged
+
+def extract_addresses_chunked(pages: list[str], max_workers: int | None = None,
+                              max_chars: int | None = None) -> list[str]:
+    """
+    ページ（または行のまとまり）ごとに分けて並列に extract_addresses を実行し、結果を結合する。
+    分厚い受付帳でも、所要時間は最も大きいチャンク1つ分程度になる
+    """
+    chunks = split_into_chunks([p for p in pages if p], max_chars=max_chars)
+    print(f"✅ 住所抽出をチャンク分割して実行: {len(chunks)} チャンク")
+    max_workers = max(1, max_workers or ADDRESS_EXTRACT_WORKERS)
+    results = _map_in_order(lambda chunk: extract_addresses(chunk[0]), chunks, max_workers)
+    return merge_chunk_addresses(results, [overlap for _, overlap in chunks])
+
+def _extract_addresses_llm(pages: list[str], chunked: bool | None = None) -> list[str]:
+    if chunked is None:
+        chunked = sum(len(p) for p in pages) > ADDRESS_CHUNK_MAX_CHARS
+    if chunked:
+        return extract_addresses_chunked(pages)
+    return extract_addresses("\n".join(pages))
+
+def extract_addresses_with_rules(pages: list[str], chunked: bool | None = None) -> list[str]:
+    """
+    受付帳のOCRテキストをまずルールベースのパーサー（ledger_parser）で解析し、
+    判定できなかった登記行だけを LLM（extract_addresses）に回す。
+    登記行を1件も認識できない様式の場合は、従来どおり全文を LLM に渡す
+    """
+    rows = parse_ledger("\n".join(pages))
+    if not rows:
+        print("⚠️ 受付帳の登記行を認識できないため、LLMで住所を抽出します")
+        return _extract_addresses_llm(pages, chunked)
+
+    addresses = [row.address for row in rows if row.status == "target"]
+    unknown = [row.text for row in rows if row.status == "unknown"]
+    print(f"✅ ルール解析: {len(rows)} 件中 対象 {len(addresses)} 件 / 判定不能 {len(unknown)} 件")
+    if unknown:
+        addresses += _extract_addresses_llm(["\n".join(unknown)], chunked)
+    return addresses
+
 # 下記の関数で、なぜextract_addressesの引数にtext_data（登記所名）を加えているのか分からん
-def get_cleaned_addresses(pdf_path: str) -> list[str]:
-    text_data = ocr_pdf(pdf_path)
-    return extract_addresses(text_data)
+def get_cleaned_addresses(pdf_path: str, chunked: bool | None = None,
+                          parser: str | None = None) -> list[str]:
+    """
+    受付帳PDFから相続登記の住所一覧を返す。
+    parser が "rules"（既定、環境変数 ADDRESS_PARSER）ならルールベースで解析し、判定不能な行だけ LLM に回す。
+    "llm" なら全文を LLM で抽出する。
+    chunked を省略した場合、LLM に渡すテキストが ADDRESS_CHUNK_MAX_CHARS を超えるときだけチャンク分割する
+    """
+    pages = [text for text in ocr_pdf_pages(pdf_path) if text is not None]
+    parser = parser or ADDRESS_PARSER
+    if parser == "rules":
+        return extract_addresses_with_rules(pages, chunked)
+    if parser == "llm":
+        return _extract_addresses_llm(pages, chunked)
+    raise ValueError(f"未対応の住所抽出方式です: {parser}")
 
 # 実行関数
 def run(pdf_path: str):
@@ -0,0 +1,16 @@
+'''
+ファイルの内容を扱う小さな共通処理。
+'''
+
+import hashlib
+
+
+def file_sha256(path: str) -> str:
+    """
+    ファイル内容の SHA-256（16進文字列）を返す。大きなファイルでも 1MB ずつ読んで計算する
+    """
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
@@ -0,0 +1,104 @@
+'''
+受付帳（不動産）のOCRテキストを、LLMを使わずに登記行ごとに分解するパーサー。
+
+受付帳の1件は次のような決まった形をしている。
+
+  【第４９号        】  １月  ５日受付（連先）  所有権移転相続・法人合併
+  既）土地  東近江市五個荘竜田町４３０－４  外１
+
+「【第N号」で始まる行から次の「【第N号」の手前までを1件とみなし、
+- 登記の目的が「所有権移転相続・法人合併」なら対象（target）
+- 既知の別の登記の目的（抵当権の設定・分筆など）なら対象外（other）
+- どちらとも判定できない、または対象なのに所在が読み取れない場合は判定不能（unknown）
+に分類する。判定不能の行だけを LLM（extract_addresses）に回せばよい。
+'''
+
+import re
+import unicodedata
+from dataclasses import dataclass
+
+ROW_START_PATTERN = re.compile(r"【\s*第\s*([\d\s]+)\s*号")
+TARGET_PURPOSE = "所有権移転相続法人合併"
+
+# 対象外と判定してよい登記の目的（空白・中黒を除いた形で部分一致させる）
+OTHER_PURPOSES = [
+    "所有権の保存", "所有権保存", "所有権移転売買", "所有権移転遺贈", "所有権移転贈与",
+    "所有権移転その他", "所有権移転共有物分割", "所有権移転財産分与", "所有権移転交換",
+    "所有権移転代物弁済", "所有権移転信託", "所有権移転時効取得", "所有権移転真正な登記名義",
+    "抵当権", "根抵当権", "質権", "先取特権", "地上権", "地役権", "賃借権", "永小作権",
+    "権利の変更", "更正", "変更", "抹消", "仮登記", "差押", "仮差押", "仮処分", "破産",
+    "分筆", "合筆", "表題", "滅失", "地目", "地積", "合体", "分割", "区分", "名義人", "信託",
+]
+
+# 「既）土地」「新）建物」などの後ろに続く所在
+LOCATION_PATTERN = re.compile(r"(?:既|新)\s*[)）]\s*(?:土地|建物|区建|区分建物)?\s*(.+)")
+FOREIGN_COUNT_PATTERN = re.compile(r"\s?外\s?\d+")
+
+
+@dataclass
+class LedgerRow:
+    number: int | None
+    text: str
+    status: str  # "target" / "other" / "unknown"
+    address: str | None = None
+
+
+def _compact(text: str) -> str:
+    return re.sub(r"[\s・･.,、]", "", text)
+
+
+def normalize_line(line: str) -> str:
+    line = unicodedata.normalize("NFKC", line)
+    # OCRでは全角数字の間に空白が入りやすいので、数字・ハイフンの間の空白を詰める
+    return re.sub(r"(?<=[\d\-])\s+(?=[\d\-])", "", line)
+
+
+def split_rows(text: str) -> list[tuple[int | None, list[str]]]:
+    """
+    テキストを「【第N号」で始まる登記行のまとまりに分ける（最初の行より前のヘッダーは捨てる）
+    """
+    rows: list[tuple[int | None, list[str]]] = []
+    for raw in text.splitlines():
+        line = normalize_line(raw).strip()
+        if not line:
+            continue
+        m = ROW_START_PATTERN.search(line)
+        if m:
+            digits = re.sub(r"\s", "", m.group(1))
+            rows.append((int(digits) if digits else None, [line]))
+        elif rows:
+            rows[-1][1].append(line)
+    return rows
+
+
+def extract_location(lines: list[str]) -> str | None:
+    for line in lines:
+        m = LOCATION_PATTERN.search(line)
+        if m:
+            address = FOREIGN_COUNT_PATTERN.sub("", m.group(1)).strip()
+            # 所在の後ろに登記の目的の続き（「無償名義」など）が同じ行に並ぶ場合があるので、空白で切る
+            address = re.split(r"\s{2,}|\s(?=\D)", address)[0].strip()
+            if re.search(r"[市区町村郡].*\d", address):
+                return address
+    return None
+
+
+def classify_row(number: int | None, lines: list[str]) -> LedgerRow:
+    text = "\n".join(lines)
+    compact = _compact(text)
+    if TARGET_PURPOSE in compact:
+        address = extract_location(lines)
+        return LedgerRow(number, text, "target" if address else "unknown", address)
+    if "所有権移転" in compact and "相続" in compact:
+        # 相続を含むが目的の表記が崩れている行は LLM に任せる
+        return LedgerRow(number, text, "unknown")
+    if any(purpose in compact for purpose in OTHER_PURPOSES):
+        return LedgerRow(number, text, "other")
+    return LedgerRow(number, text, "unknown")
+
+
+def parse_ledger(text: str) -> list[LedgerRow]:
+    """
+    受付帳のOCRテキストを登記行に分解して分類する
+    """
+    return [classify_row(number, lines) for number, lines in split_rows(text)]
@@ -0,0 +1,156 @@
+'''
+OpenAI（gpt-4o）呼び出しの共通窓口。
+
+extract_registry_office / extract_addresses / extract_owner_info はいずれも temperature=0.0 の
+決まったプロンプトなので、同じ入力なら同じ応答を再利用できる。
+ここでは (モデル, メッセージ, パラメータ) のハッシュをキーに応答を SQLite（cache_store）へ保存し、
+同じ台帳・登記簿を処理し直すときに LLM を呼ばずに済むようにする。
+
+設定（環境変数）:
+  LLM_CACHE_ENABLED   0 にするとキャッシュを使わない（chat_completion(use_cache=False) でも可）
+  LLM_CACHE_PATH      保存先（既定: cache/llm_cache.db）
+  LLM_CACHE_TTL_HOURS 有効期間（既定: 720時間 = 30日）
+  LLM_CACHE_MAX_MB    最大サイズ（超えたら参照の古いものから削除）
+
+API への実際の呼び出しは、プロセス内で共有するトークンバケット（rate_limit）で
+1分あたりのリクエスト数・トークン数を制限し、429 や 5xx の場合は指数バックオフで再試行する。
+  LLM_RPM / LLM_TPM   1分あたりのリクエスト数・トークン数の上限
+  LLM_MAX_RETRIES     再試行の最大回数
+'''
+
+import hashlib
+import json
+import os
+import random
+import time
+import openai
+from openai import OpenAI
+from dotenv import load_dotenv
+from scripts.cache_store import SqliteCache
+from scripts.env_utils import env_bool
+from scripts.rate_limit import RateLimiter
+
+load_dotenv()
+
+DEFAULT_MODEL = "gpt-4o"
+
+LLM_CACHE_ENABLED = env_bool("LLM_CACHE_ENABLED", True)
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", os.path.join("cache", "llm_cache.db"))
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL_HOURS", "720")) * 3600
+LLM_CACHE_MAX_BYTES = int(float(os.getenv("LLM_CACHE_MAX_MB", "100")) * 1024 * 1024)
+
+LLM_RPM = float(os.getenv("LLM_RPM", "500"))
+LLM_TPM = float(os.getenv("LLM_TPM", "30000"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "5"))
+LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "1.0"))
+LLM_BACKOFF_MAX = float(os.getenv("LLM_BACKOFF_MAX", "60"))
+
+rate_limiter = RateLimiter(LLM_RPM, LLM_TPM)
+
+# import 時に API キーが無くても読み込めるよう、最初に使うときに作成する
+_openai_client = None
+_llm_cache = None
+
+
+def get_openai_client() -> OpenAI:
+    global _openai_client
+    if _openai_client is None:
+        # 再試行はこのモジュールで流量制限と合わせて行うので、SDK 側の再試行は切っておく
+        _openai_client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"), max_retries=0)
+    return _openai_client
+
+
+def get_llm_cache() -> SqliteCache:
+    global _llm_cache
+    if _llm_cache is None:
+        _llm_cache = SqliteCache(LLM_CACHE_PATH, max_bytes=LLM_CACHE_MAX_BYTES, ttl=LLM_CACHE_TTL)
+    return _llm_cache
+
+
+def llm_cache_key(model: str, messages: list[dict], params: dict) -> str:
+    payload = json.dumps(
+        {"model": model, "messages": messages, "params": params},
+        ensure_ascii=False, sort_keys=True
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def estimate_tokens(messages: list[dict], max_tokens: int | None = None) -> int:
+    """
+    流量制限用のトークン数の見積もり。日本語はおおむね1文字1トークン前後なので、文字数をそのまま使う
+    """
+    prompt_tokens = sum(len(m.get("content") or "") for m in messages)
+    return prompt_tokens + (max_tokens or 500)
+
+
+def _is_retryable(error: Exception) -> bool:
+    if isinstance(error, (openai.RateLimitError, openai.APIConnectionError, openai.APITimeoutError)):
+        return True
+    return isinstance(error, openai.APIStatusError) and error.status_code >= 500
+
+
+def _retry_delay(error: Exception, attempt: int) -> float:
+    # 429 で Retry-After が返っていればそれに従う
+    response = getattr(error, "response", None)
+    retry_after = response.headers.get("retry-after") if response is not None else None
+    if retry_after:
+        try:
+            return float(retry_after)
+        except ValueError:
+            pass
+    delay = min(LLM_BACKOFF_MAX, LLM_BACKOFF_BASE * (2 ** attempt))
+    return delay * random.uniform(0.5, 1.0)
+
+
+def create_completion(model: str, messages: list[dict], **params):
+    """
+    流量制限と再試行つきで chat.completions.create を呼び出す
+    """
+    tokens = estimate_tokens(messages, params.get("max_tokens"))
+    for attempt in range(LLM_MAX_RETRIES + 1):
+        rate_limiter.acquire(tokens)
+        try:
+            return get_openai_client().chat.completions.create(
+                model=model,
+                messages=messages,
+                **params
+            )
+        except Exception as e:
+            if attempt >= LLM_MAX_RETRIES or not _is_retryable(e):
+                raise
+            delay = _retry_delay(e, attempt)
+            print(f"⏳ LLM呼び出し失敗（{type(e).__name__}）、{delay:.1f}秒後に再試行 ({attempt + 1}/{LLM_MAX_RETRIES})")
+            time.sleep(delay)
+
+
+def chat_completion(prompt: str | None = None, messages: list[dict] | None = None,
+                    model: str = DEFAULT_MODEL, temperature: float = 0.0,
+                    use_cache: bool | None = None, **params) -> str:
+    """
+    Chat Completions を呼び出し、応答の本文を返す。
+    prompt を渡した場合は user メッセージ1件として送る。同じ入力の応答はキャッシュから返す
+    """
+    if messages is None:
+        messages = [{"role": "user", "content": prompt}]
+    params = {"temperature": temperature, **params}
+    if use_cache is None:
+        use_cache = LLM_CACHE_ENABLED
+
+    key = llm_cache_key(model, messages, params)
+    if use_cache:
+        cached = get_llm_cache().get(key)
+        if cached is not None:
+            return cached
+
+    response = create_completion(model, messages, **params)
+    content = response.choices[0].message.content
+    if use_cache and content is not None:
+        get_llm_cache().set(key, content)
+    return content
+
+
+def llm_cache_stats() -> dict:
+    """
+    このプロセスでのキャッシュのヒット数・ミス数と、保存件数・サイズを返す
+    """
+    return get_llm_cache().stats()
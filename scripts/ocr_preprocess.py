@@ -0,0 +1,110 @@
+'''
+OCRに送る前のページ画像の前処理。
+
+300dpi のフルカラーPNGをそのまま送ると1ページ数MBになり、アップロード時間がOCR全体の
+大半を占めるため、以下の処理でバイト数を減らしてから Vision API に渡す。
+
+1. グレースケール化（受付帳・登記簿はモノクロなので色情報は不要）
+2. 二値化（任意。しきい値を指定したときのみ。1bit PNG になり最も小さくなる）
+3. 余白の切り落とし（文字・罫線の外側の白い部分を除去）
+4. 出力形式の選択（PNG と高画質JPEGの両方でエンコードし、小さい方を採用）
+
+設定は環境変数（OCR_DPI, OCR_GRAYSCALE, OCR_BINARIZE_THRESHOLD, OCR_CROP_MARGINS,
+OCR_IMAGE_FORMAT, OCR_JPEG_QUALITY）か OcrImageSettings で指定する。
+どの設定で住所が取りこぼされないかは benchmarks/bench_ocr_preprocess.py で確認できる。
+'''
+
+import io
+import os
+from dataclasses import dataclass, asdict
+from PIL import Image, ImageOps
+from scripts.env_utils import env_bool
+
+# 余白判定で「白」とみなす明るさ（これより暗い画素を文字・罫線とみなす）
+MARGIN_WHITE_LEVEL = 240
+
+
+@dataclass(frozen=True)
+class OcrImageSettings:
+    dpi: int = 300
+    grayscale: bool = True
+    binarize_threshold: int | None = None
+    crop_margins: bool = True
+    margin_padding: int = 20
+    image_format: str = "auto"  # "auto" / "png" / "jpeg"
+    jpeg_quality: int = 90
+
+    @classmethod
+    def from_env(cls) -> "OcrImageSettings":
+        threshold = os.getenv("OCR_BINARIZE_THRESHOLD")
+        return cls(
+            dpi=int(os.getenv("OCR_DPI", "300")),
+            grayscale=env_bool("OCR_GRAYSCALE", True),
+            binarize_threshold=int(threshold) if threshold else None,
+            crop_margins=env_bool("OCR_CROP_MARGINS", True),
+            image_format=os.getenv("OCR_IMAGE_FORMAT", "auto"),
+            jpeg_quality=int(os.getenv("OCR_JPEG_QUALITY", "90")),
+        )
+
+    def cache_key(self) -> str:
+        """
+        OCR結果のキャッシュキーに含める設定文字列
+        """
+        return ",".join(f"{k}={v}" for k, v in sorted(asdict(self).items()))
+
+
+def crop_margins(image: Image.Image, padding: int = 20) -> Image.Image:
+    """
+    文字・罫線を含む範囲の外側にある白い余白を切り落とす
+    """
+    gray = image if image.mode == "L" else image.convert("L")
+    # 暗い画素だけが非ゼロになるマスクを作り、その外接矩形を求める
+    mask = gray.point(lambda p: 255 if p < MARGIN_WHITE_LEVEL else 0)
+    bbox = mask.getbbox()
+    if bbox is None:
+        return image
+    left, top, right, bottom = bbox
+    return image.crop((
+        max(0, left - padding),
+        max(0, top - padding),
+        min(image.width, right + padding),
+        min(image.height, bottom + padding),
+    ))
+
+
+def _encode(image: Image.Image, image_format: str, jpeg_quality: int) -> bytes:
+    buffer = io.BytesIO()
+    if image_format == "png":
+        image.save(buffer, "PNG")
+    else:
+        if image.mode not in ("L", "RGB"):
+            image = image.convert("L" if image.mode == "1" else "RGB")
+        image.save(buffer, "JPEG", quality=jpeg_quality)
+    return buffer.getvalue()
+
+
+def preprocess_image(image: Image.Image, settings: OcrImageSettings | None = None) -> bytes:
+    """
+    ページ画像に前処理をかけ、Vision API に送るバイト列を返す
+    """
+    settings = settings or OcrImageSettings()
+    if settings.grayscale or settings.binarize_threshold is not None:
+        image = ImageOps.grayscale(image)
+    if settings.binarize_threshold is not None:
+        threshold = settings.binarize_threshold
+        image = image.point(lambda p: 255 if p > threshold else 0, mode="1")
+    if settings.crop_margins:
+        image = crop_margins(image, settings.margin_padding)
+
+    if settings.image_format == "png":
+        return _encode(image, "png", settings.jpeg_quality)
+    if settings.image_format == "jpeg":
+        return _encode(image, "jpeg", settings.jpeg_quality)
+    if settings.image_format != "auto":
+        raise ValueError(f"未対応の画像形式です: {settings.image_format}")
+    # 二値画像は PNG の方がほぼ確実に小さいので、JPEG は試さない
+    png = _encode(image, "png", settings.jpeg_quality)
+    if image.mode == "1":
+        return png
+    jpeg = _encode(image, "jpeg", settings.jpeg_quality)
+    return jpeg if len(jpeg) < len(png) else png
@@ -0,0 +1,137 @@
+'''
+複数の登記簿テキストを1回の LLM 呼び出しにまとめて、所有者情報を JSON で受け取る。
+
+1件ずつ問い合わせると登記簿の数だけ往復が発生し、自由記述の応答を正規表現で拾うため
+書式が少し崩れると行が落ちてしまう。ここでは
+
+  {"results": [{"id": "doc1", "氏名": "...", "所有者住所": "...", "不動産所在地": "..."}, ...]}
+
+という決まった形の JSON（response_format=json_object）で応答させ、
+文書IDごとに必須項目がそろっているかを検証する。検証に通らなかった文書だけを、
+まとめる件数を半分にして再送する（最後は1件ずつ）。
+
+設定（環境変数）:
+  OWNER_BATCH_MAX_DOCS    1回にまとめる登記簿の最大件数
+  OWNER_BATCH_MAX_CHARS   1回にまとめるテキストの最大文字数
+  OWNER_BATCH_MAX_ROUNDS  検証に失敗した文書を再送する最大回数
+  OWNER_BATCH_WORKERS     同時に送るまとまりの数
+'''
+
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from scripts.llm_client import chat_completion
+
+OWNER_BATCH_MAX_DOCS = int(os.getenv("OWNER_BATCH_MAX_DOCS", "8"))
+OWNER_BATCH_MAX_CHARS = int(os.getenv("OWNER_BATCH_MAX_CHARS", "12000"))
+OWNER_BATCH_MAX_ROUNDS = int(os.getenv("OWNER_BATCH_MAX_ROUNDS", "3"))
+OWNER_BATCH_WORKERS = int(os.getenv("OWNER_BATCH_WORKERS", "4"))
+
+OWNER_FIELDS = ("氏名", "所有者住所", "不動産所在地")
+
+
+def build_batch_prompt(docs: list[tuple[str, str]]) -> str:
+    sections = "\n\n".join(
+        f"【文書ID: {doc_id} 開始】\n{text}\n【文書ID: {doc_id} 終了】" for doc_id, text in docs
+    )
+    ids = ", ".join(f'"{doc_id}"' for doc_id, _ in docs)
+    return f"""
+以下は複数の登記簿のOCRテキストです。文書ごとに、次の情報を抽出してください。
+
+1. 「原因」が「相続」または「遺贈」である所有権移転に関して、**最も新しい**氏名とその所有者住所（共有者の住所）。
+2. その相続によって取得された不動産の所在地（住所）。
+
+- 出力は次の形式の JSON オブジェクトのみとし、説明文は付けないでください。
+  {{"results": [{{"id": "文書ID", "氏名": "○○○○", "所有者住所": "○○県○○市○○…", "不動産所在地": "○○県○○市○○…"}}]}}
+- results には文書ID {ids} のすべてを1件ずつ含めてください。
+- 値はすべて文字列とし、読み取れない項目は空文字 "" にしてください。
+
+{sections}
+"""
+
+
+def validate_batch_response(content: str | None, doc_ids: list[str]) -> tuple[dict[str, dict], list[str]]:
+    """
+    応答の JSON を検証し、(文書ID→所有者情報, 検証に通らなかった文書ID) を返す
+    """
+    records: dict[str, dict] = {}
+    try:
+        data = json.loads(content or "")
+    except json.JSONDecodeError:
+        return records, list(doc_ids)
+    items = data.get("results") if isinstance(data, dict) else data
+    if not isinstance(items, list):
+        return records, list(doc_ids)
+
+    expected = set(doc_ids)
+    for item in items:
+        if not isinstance(item, dict) or item.get("id") not in expected:
+            continue
+        values = {field: item.get(field) for field in OWNER_FIELDS}
+        if all(isinstance(v, str) and v.strip() for v in values.values()):
+            records[item["id"]] = {field: v.strip() for field, v in values.items()}
+    return records, [doc_id for doc_id in doc_ids if doc_id not in records]
+
+
+def make_batches(docs: list[tuple[str, str]], max_docs: int, max_chars: int) -> list[list[tuple[str, str]]]:
+    """
+    件数と文字数の上限を超えないよう文書をまとめる（上限より長い文書は単独で1まとまりにする）
+    """
+    batches: list[list[tuple[str, str]]] = []
+    current: list[tuple[str, str]] = []
+    size = 0
+    for doc in docs:
+        length = len(doc[1])
+        if current and (len(current) >= max_docs or size + length > max_chars):
+            batches.append(current)
+            current, size = [], 0
+        current.append(doc)
+        size += length
+    if current:
+        batches.append(current)
+    return batches
+
+
+def _submit(batch: list[tuple[str, str]], use_cache: bool | None) -> tuple[dict[str, dict], list[str]]:
+    doc_ids = [doc_id for doc_id, _ in batch]
+    try:
+        content = chat_completion(
+            build_batch_prompt(batch), model="gpt-4o", temperature=0.0,
+            use_cache=use_cache, response_format={"type": "json_object"}
+        )
+    except Exception as e:
+        print(f"⚠️ 所有者情報のまとめ抽出に失敗: {', '.join(doc_ids)} ({e})")
+        return {}, doc_ids
+    return validate_batch_response(content, doc_ids)
+
+
+def extract_owner_records_batched(docs: dict[str, str], max_docs: int | None = None,
+                                  max_chars: int | None = None, max_rounds: int | None = None,
+                                  max_workers: int | None = None) -> dict[str, dict | None]:
+    """
+    文書ID→登記簿テキストを受け取り、文書ID→所有者情報（最後まで検証に通らなければ None）を返す
+    """
+    max_docs = max(1, max_docs or OWNER_BATCH_MAX_DOCS)
+    max_chars = max_chars or OWNER_BATCH_MAX_CHARS
+    max_rounds = OWNER_BATCH_MAX_ROUNDS if max_rounds is None else max_rounds
+    max_workers = max(1, max_workers or OWNER_BATCH_WORKERS)
+
+    results: dict[str, dict | None] = {doc_id: None for doc_id in docs}
+    pending = list(docs.items())
+    for round_no in range(max_rounds + 1):
+        if not pending:
+            break
+        batches = make_batches(pending, max_docs, max_chars)
+        # 再送では同じ応答がキャッシュから返らないようにする
+        use_cache = None if round_no == 0 else False
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(batches))) as executor:
+            outcomes = list(executor.map(lambda b: _submit(b, use_cache), batches))
+        failed = []
+        for records, failed_ids in outcomes:
+            results.update(records)
+            failed += failed_ids
+        if failed and round_no < max_rounds:
+            print(f"ℹ️ 所有者情報の検証に失敗した {len(failed)} 件を再送します（{round_no + 1}回目）")
+        pending = [(doc_id, docs[doc_id]) for doc_id in failed]
+        max_docs = max(1, max_docs // 2)
+    return results
@@ -0,0 +1,50 @@
+'''
+PDFに埋め込まれたテキスト層を、ページごとにローカルで取り出す。
+
+電子的に作成された受付帳・登記簿はテキスト層を持っているので、
+そのページは画像化・OCRせずにテキストを使える（Vision API を呼ばない）。
+スキャン画像だけのページや、文字コード対応が無く「(cid:123)」のような文字化けになるページは
+「使えない」と判定し、OCRに回す。
+'''
+
+import os
+import re
+
+# 使えるテキスト層とみなす最低文字数（空白を除く）
+TEXT_LAYER_MIN_CHARS = int(os.getenv("TEXT_LAYER_MIN_CHARS", "20"))
+
+CID_PATTERN = re.compile(r"\(cid:\d+\)")
+# 日本語（かな・漢字）・英数字を「意味のある文字」とみなす
+MEANINGFUL_PATTERN = re.compile(r"[぀-ヿ㐀-鿿０-ｚ0-9A-Za-z]")
+
+
+def is_usable_text(text: str | None) -> bool:
+    """
+    テキスト層の内容がOCRの代わりに使えるかを判定する
+    """
+    if not text:
+        return False
+    if CID_PATTERN.search(text):
+        return False
+    compact = re.sub(r"\s", "", text)
+    if len(compact) < TEXT_LAYER_MIN_CHARS:
+        return False
+    meaningful = len(MEANINGFUL_PATTERN.findall(compact))
+    return meaningful / len(compact) >= 0.5
+
+
+def extract_text_layer(pdf_path: str, page_numbers: list[int] | None = None) -> list[str]:
+    """
+    ページごとのテキスト層を返す（テキスト層の無いページは空文字）。
+    page_numbers（1始まり）を指定した場合は、そのページだけをレイアウト解析してページ番号順に返す
+    """
+    from pdfminer.high_level import extract_pages
+    from pdfminer.layout import LTTextContainer
+
+    targets = None if page_numbers is None else {page - 1 for page in page_numbers}
+    pages = []
+    for layout in extract_pages(pdf_path, page_numbers=targets):
+        pages.append("".join(
+            element.get_text() for element in layout if isinstance(element, LTTextContainer)
+        ))
+    return pages
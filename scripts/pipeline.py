@@ -1,13 +1,20 @@
 # pipeline.py
 import argparse
 import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
-from openai import OpenAI
 from markitdown import MarkItDown
-from scripts.extract_info_from_pdf import ocr_pdf, extract_registry_office
+from scripts.extract_info_from_pdf import extract_registry_office_from_pdf
 from scripts.auto_mode_chatgpt import run_auto_mode
-from scripts.concat_markitdown_extract_zipcode import get_zipcode
+from scripts.concat_markitdown_extract_zipcode import get_zipcodes
 from scripts.merge_data import merge_data
+from scripts.llm_client import chat_completion, llm_cache_stats
+from scripts.registry_parser import parse_registry
+from scripts.prompt_filter import registry_owner_sections, prompt_filter_stats
+from scripts.owner_batch import extract_owner_records_batched
+from scripts.registry_store import get_registry_store
+from scripts.env_utils import env_bool
 from dotenv import load_dotenv
 import os
 import streamlit as st
@@ -16,21 +23,46 @@ import streamlit as st
 OPENAI_API_KEY = st.secrets.get("OPENAI_API_KEY")
 os.environ["OPENAI_API_KEY"] = OPENAI_API_KEY
 
-def extract_owner_info(pdf_paths):
+# 所有者情報抽出の同時実行数（MarkItDown変換 + LLM呼び出しを並列に行うPDF数）
+OWNER_EXTRACT_WORKERS = int(os.getenv("OWNER_EXTRACT_WORKERS", "4"))
+
+# 甲区パーサーの結果をそのまま採用する確信度の下限（これ未満なら LLM で抽出する）
+REGISTRY_PARSER_MIN_CONFIDENCE = float(os.getenv("REGISTRY_PARSER_MIN_CONFIDENCE", "0.8"))
+
+# LLM に回す登記簿を数件ずつまとめて JSON で抽出するか（0 なら1件ずつ問い合わせる）
+OWNER_LLM_BATCH = env_bool("OWNER_LLM_BATCH", True)
+
+_markitdown = threading.local()
+
+def _get_markitdown() -> MarkItDown:
+    # MarkItDown のインスタンスはスレッドごとに作る
+    if not hasattr(_markitdown, "md"):
+        _markitdown.md = MarkItDown()
+    return _markitdown.md
+
+def prepare_owner_record(pdf_path: str) -> tuple[dict | None, str]:
     """
-    ダウンロード済みの所有者情報PDFを解析し、氏名・所有者住所・不動産所在地を抽出してDataFrameを返す
+    所有者情報PDFをテキストにし、甲区パーサーで抽出する。
+    確信度が十分なら (所有者情報, "")、LLM に回す必要があれば (None, LLM に送るテキスト) を返す
     """
-    client = OpenAI(api_key=OPENAI_API_KEY)  # 環境変数推奨
-    md = MarkItDown()
-    records = []
+    # 1) PDF→テキスト
+    result = _get_markitdown().convert(pdf_path)
+    text_data = result.text_content
+
+    # 2) まずローカルの甲区パーサーで抽出し、確信度が低いときだけ LLM に回す
+    parsed = parse_registry(text_data)
+    if parsed.record is not None and parsed.confidence >= REGISTRY_PARSER_MIN_CONFIDENCE:
+        return parsed.record, ""
+    print(f"ℹ️ 甲区パーサーの確信度が低いためLLMで抽出: {pdf_path} ({'; '.join(parsed.reasons)})")
 
-    for pdf_path in pdf_paths:
-        # 1) PDF→テキスト
-        result = md.convert(pdf_path)
-        text_data = result.text_content
+    # 乙区やページ末尾の定型文は落とし、所在・甲区だけを送る
+    return None, registry_owner_sections(text_data)
 
-        # 2) GPTプロンプト送信
-        prompt = f"""
+def extract_owner_with_llm(text_data: str) -> dict | None:
+    """
+    登記簿テキスト1件を gpt-4o に送り、氏名・所有者住所・不動産所在地を返す（抽出できなければ None）
+    """
+    prompt = f"""
 以下は登記簿のOCRテキストです。この中から以下の情報を抽出してください。
 
 1. 「原因」が「相続」または「遺贈」である所有権移転に関して、**最も新しい**氏名とその所有者住所（共有者の住所）。
@@ -45,27 +77,65 @@ def extract_owner_info(pdf_paths):
 {text_data}
 【テキスト終了】
 """
-        resp = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[{"role":"user","content":prompt}],
-            temperature=0.0
-        )
-        output = resp.choices[0].message.content.strip()
-
-        # 3) 正規表現で抽出
-        name_m = re.search(r"氏名:\s*(.+)", output)
-        addr_m = re.search(r"所有者住所:\s*(.+)", output)
-        prop_m = re.search(r"不動産所在地:\s*(.+)", output)
-        if name_m and addr_m and prop_m:
-            records.append({
-                "氏名": name_m.group(1).strip(),
-                "所有者住所": addr_m.group(1).strip(),
-                "不動産所在地": prop_m.group(1).strip()
-            })
-
+    output = chat_completion(prompt, model="gpt-4o", temperature=0.0).strip()
+
+    # 正規表現で抽出
+    name_m = re.search(r"氏名:\s*(.+)", output)
+    addr_m = re.search(r"所有者住所:\s*(.+)", output)
+    prop_m = re.search(r"不動産所在地:\s*(.+)", output)
+    if name_m and addr_m and prop_m:
+        return {
+            "氏名": name_m.group(1).strip(),
+            "所有者住所": addr_m.group(1).strip(),
+            "不動産所在地": prop_m.group(1).strip()
+        }
+    return None
+
+def extract_owner_record(pdf_path: str) -> dict | None:
+    """
+    所有者情報PDFを1件解析し、氏名・所有者住所・不動産所在地を返す（抽出できなければ None）
+    """
+    record, text_data = prepare_owner_record(pdf_path)
+    if record is not None:
+        return record
+    return extract_owner_with_llm(text_data)
+
+def _map(func, items: list, max_workers: int) -> list:
+    if max_workers == 1 or len(items) <= 1:
+        return [func(item) for item in items]
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(items))) as executor:
+        return list(executor.map(func, items))
+
+def extract_owner_info(pdf_paths, max_workers: int | None = None, batched: bool | None = None):
+    """
+    ダウンロード済みの所有者情報PDFを解析し、氏名・所有者住所・不動産所在地を抽出してDataFrameを返す。
+    max_workers 件まで並列に処理し（LLMの流量制限・再試行は llm_client が行う）、行は pdf_paths の順に並ぶ。
+    batched=True（既定は環境変数 OWNER_LLM_BATCH）なら、LLM に回す登記簿を数件ずつまとめて JSON で抽出する
+    """
+    pdf_paths = list(pdf_paths)
+    max_workers = max(1, max_workers or OWNER_EXTRACT_WORKERS)
+    if batched is None:
+        batched = OWNER_LLM_BATCH
+
+    if not batched:
+        results = _map(extract_owner_record, pdf_paths, max_workers)
+    else:
+        prepared = _map(prepare_owner_record, pdf_paths, max_workers)
+        results = [record for record, _ in prepared]
+        docs = {f"doc{i + 1}": text for i, (record, text) in enumerate(prepared) if record is None}
+        if docs:
+            extracted = extract_owner_records_batched(docs)
+            for doc_id, record in extracted.items():
+                i = int(doc_id[len("doc"):]) - 1
+                # まとめ抽出で最後まで検証に通らなかったものは、1件ずつの従来のプロンプトで抽出する
+                results[i] = record if record is not None else extract_owner_with_llm(docs[doc_id])
+
+    for path, record in zip(pdf_paths, results):
+        if record is None:
+            print(f"⚠️ 所有者情報を抽出できませんでした: {path}")
+    records = [r for r in results if r is not None]
     return pd.DataFrame(records)
 
-
 def main():
     parser = argparse.ArgumentParser(description='不動産相続情報パイプライン')
     parser.add_argument('--ledger-pdf',   required=True,               help='受付台帳PDFパス')
@@ -76,28 +146,34 @@ def main():
 
     # ステップ0: 担当法務局取得
     print("▶️ 担当法務局取得開始")
-    text_data = ocr_pdf(args.ledger_pdf)
-    registry_office = extract_registry_office(text_data)
+    registry_office = extract_registry_office_from_pdf(args.ledger_pdf)
     print(f"✅ 担当法務局: {registry_office}")
 
     # ステップ1: 地番抽出 & PDFダウンロード
     print("▶️ 地番抽出とPDFダウンロード開始")
     pdf_paths = run_auto_mode(args.ledger_pdf)
     print(f"✅ PDFダウンロード完了: {len(pdf_paths)} 件")
+    store = get_registry_store()
+    if store is not None:
+        store_stats = store.stats()
+        print(f"ℹ️ 登記PDF保存庫: 使い回し {store_stats['hits']} 件 / 保存 {store_stats['entries']} 住所"
+              f"（PDF {store_stats['objects']} 件, {store_stats['stored_bytes']} バイト）")
 
     # ステップ2: 所有者情報抽出
     print("▶️ 所有者情報抽出開始")
     df_owner = extract_owner_info(pdf_paths)
     df_owner.to_csv(args.owner_out, index=False, encoding='utf-8-sig')
     print(f"✅ 所有者情報CSV出力: {args.owner_out}")
+    stats = llm_cache_stats()
+    print(f"ℹ️ LLMキャッシュ: ヒット {stats['hits']} 件 / ミス {stats['misses']} 件")
+    saved = prompt_filter_stats()
+    print(f"ℹ️ プロンプト前処理: {saved['calls']} 件で約 {saved['tokens_saved']} トークン削減"
+          f"（{saved['tokens_before']} → {saved['tokens_after']}）")
 
     # ステップ3: 郵便番号取得
     print("▶️ 郵便番号検索開始")
-    zip_records = []
-    for addr in df_owner['所有者住所'].unique():
-        zipcode = get_zipcode(addr)
-        zip_records.append({'所有者住所': addr, '郵便番号': zipcode})
-    df_zip = pd.DataFrame(zip_records)
+    owner_addrs = df_owner['所有者住所'].unique()
+    df_zip = pd.DataFrame({'所有者住所': owner_addrs, '郵便番号': get_zipcodes(owner_addrs)})
     df_zip.to_csv(args.zipcode_out, index=False, encoding='utf-8-sig')
     print(f"✅ 郵便番号CSV出力: {args.zipcode_out}")
 
@@ -0,0 +1,109 @@
+'''
+LLM に送る前に、OCR / MarkItDown のテキストから必要な部分だけを切り出す前処理。
+
+- 受付帳（extract_registry_office）
+    登記所名は1ページ目の冒頭にしか書かれていないので、最初の登記行（「【第N号」）より前の
+    ヘッダー部分だけを送る。
+- 登記簿（extract_owner_record）
+    所有者の判定に必要なのは、冒頭の都道府県を含む行・表題部の所在／地番・権利部（甲区）だけなので、
+    乙区（抵当権など）・共同担保目録・ページ末尾の定型文などを落として送る。
+
+切り出せなかった場合（見出しが OCR で崩れている等）は元のテキストをそのまま返す。
+削減したトークン数（llm_client.estimate_tokens と同じく1文字1トークンで見積もる）は
+prompt_filter_stats() で確認できる。PROMPT_FILTER_ENABLED=0 で無効にできる。
+'''
+
+import os
+import re
+import threading
+import unicodedata
+from scripts.env_utils import env_bool
+from scripts.ledger_parser import ROW_START_PATTERN
+from scripts.registry_parser import SECTION_END_MARKERS, PAGE_FOOTER_MARKERS, PREFECTURE_PATTERN
+
+PROMPT_FILTER_ENABLED = env_bool("PROMPT_FILTER_ENABLED", True)
+# 登記行が見つからない場合に、ヘッダーとして送る先頭の行数
+HEADER_MAX_LINES = int(os.getenv("PROMPT_FILTER_HEADER_LINES", "15"))
+
+# 表題部のうち、不動産所在地の組み立てに使う項目
+TITLE_FIELDS = ("所在", "地番", "家屋番号")
+
+_stats_lock = threading.Lock()
+_stats = {"calls": 0, "chars_before": 0, "chars_after": 0}
+
+
+def _compact(text: str) -> str:
+    # registry_parser が見出しを探すときと同じく、NFKC で全角の括弧などをそろえてから空白を除く
+    return re.sub(r"\s", "", unicodedata.normalize("NFKC", text))
+
+
+def _record(before: str, after: str) -> str:
+    with _stats_lock:
+        _stats["calls"] += 1
+        _stats["chars_before"] += len(before)
+        _stats["chars_after"] += len(after)
+    return after
+
+
+def prompt_filter_stats() -> dict:
+    """
+    これまでに切り出したテキストの件数と、見積もりトークン数（前・後・削減分）を返す
+    """
+    with _stats_lock:
+        stats = dict(_stats)
+    return {
+        "calls": stats["calls"],
+        "tokens_before": stats["chars_before"],
+        "tokens_after": stats["chars_after"],
+        "tokens_saved": stats["chars_before"] - stats["chars_after"],
+    }
+
+
+def ledger_header(text: str, max_lines: int | None = None) -> str:
+    """
+    受付帳のテキストから、最初の登記行より前のヘッダー部分を返す
+    """
+    if not PROMPT_FILTER_ENABLED:
+        return text
+    max_lines = max_lines or HEADER_MAX_LINES
+    lines = [line for line in text.splitlines() if line.strip()]
+    header = []
+    for line in lines:
+        if ROW_START_PATTERN.search(line):
+            break
+        header.append(line)
+    # 登記行が見当たらない（または冒頭から始まる）場合は先頭の数行だけにする
+    if not header or len(header) == len(lines):
+        header = lines[:max_lines]
+    filtered = "\n".join(header[:max_lines])
+    return _record(text, filtered if filtered else text)
+
+
+def registry_owner_sections(text: str) -> str:
+    """
+    登記簿のテキストから、冒頭行・表題部の所在／地番・権利部（甲区）だけを残したテキストを返す
+    """
+    if not PROMPT_FILTER_ENABLED:
+        return text
+    lines = [line for line in text.splitlines() if line.strip()]
+    kept = []
+    in_kou = False
+    found_kou = False
+    for i, line in enumerate(lines):
+        compact = _compact(line)
+        if "権利部(甲区)" in compact:
+            in_kou = found_kou = True
+            kept.append(line)
+            continue
+        if in_kou:
+            if any(marker in compact for marker in SECTION_END_MARKERS):
+                in_kou = False
+            elif not any(marker in compact for marker in PAGE_FOOTER_MARKERS):
+                kept.append(line)
+            continue
+        # 冒頭の「滋賀県東近江市…」のような都道府県から始まる行と、表題部の所在・地番
+        if (i < 5 and PREFECTURE_PATTERN.match(compact)) or compact.startswith(TITLE_FIELDS):
+            kept.append(line)
+    if not found_kou:
+        return _record(text, text)
+    return _record(text, "\n".join(kept))
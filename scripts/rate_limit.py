@@ -0,0 +1,63 @@
+'''
+API呼び出しの流量制限（トークンバケット）。
+
+OpenAI の利用上限（1分あたりのリクエスト数 RPM・トークン数 TPM）を超えないよう、
+並列に呼び出すスレッドの間で共有して使う。
+'''
+
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    1分あたり rate_per_minute だけ補充され、最大 capacity まで貯まるバケット。
+    acquire(amount) は必要な量が貯まるまで待ってから消費する
+    """
+
+    def __init__(self, rate_per_minute: float, capacity: float | None = None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else rate_per_minute
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def acquire(self, amount: float = 1.0) -> float:
+        """
+        amount 分を消費する。待った秒数を返す
+        """
+        # 1回の要求が容量を超える場合は、容量いっぱいまで貯まれば通す
+        amount = min(amount, self.capacity)
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return waited
+                wait = (amount - self.tokens) / self.rate
+            time.sleep(wait)
+            waited += wait
+
+
+class RateLimiter:
+    """
+    リクエスト数とトークン数の両方を制限する（どちらかが None なら制限しない）
+    """
+
+    def __init__(self, requests_per_minute: float | None = None, tokens_per_minute: float | None = None):
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+
+    def acquire(self, tokens: float = 0.0) -> float:
+        waited = 0.0
+        if self.requests:
+            waited += self.requests.acquire(1)
+        if self.tokens and tokens:
+            waited += self.tokens.acquire(tokens)
+        return waited
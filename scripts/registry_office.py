@@ -0,0 +1,267 @@
+'''
+受付帳の1ページ目の冒頭から、LLMを使わずに登記所名を読み取る。
+
+受付帳の冒頭には「大津地方法務局 東近江支局」のように登記所名が印字されているので、
+OCRテキストのヘッダー部分（最初の登記行より前）を、下の登記所一覧（法務局・地方法務局と
+その支局・出張所）と照合する。
+
+1. まず法務局・地方法務局を決める。ヘッダーに名称がそのまま含まれていればそれを、
+   無ければヘッダーの語（空白区切り）とのあいまい照合で決める
+   （OCRの誤読で1〜2文字違う場合を拾う。類似度は REGISTRY_OFFICE_MIN_SIMILARITY 以上）
+2. 支局・出張所は、決まった法務局のものだけと同じように照合する
+   （「北出張所」「府中支局」のように別の法務局に同じ名前があるため）
+3. 法務局名と支局・出張所名をつなげた名称（例: 「大津地方法務局東近江支局」）、
+   本局だけなら法務局名（例: 「東京法務局」）を返す
+4. 登記所名の代わりに「登記部門」と書かれている場合は OFFICE_OMITTED_MESSAGE を返す
+
+あいまい照合で候補が同点・僅差（REGISTRY_OFFICE_MIN_MARGIN 未満）のとき、
+法務局名が読めず支局・出張所名だけでは法務局が1つに決まらないとき、
+一覧にない支局・出張所が書かれているときは None を返し、呼び出し側（extract_registry_office）が LLM で読み取る。
+一覧にない登記所（統廃合・新設など）はここに追記する。
+'''
+
+import os
+import re
+import unicodedata
+from difflib import SequenceMatcher
+
+REGISTRY_OFFICE_MIN_SIMILARITY = float(os.getenv("REGISTRY_OFFICE_MIN_SIMILARITY", "0.75"))
+# あいまい照合で1位と2位の類似度の差がこれ未満なら、どちらとも決めずに LLM に任せる
+REGISTRY_OFFICE_MIN_MARGIN = float(os.getenv("REGISTRY_OFFICE_MIN_MARGIN", "0.1"))
+
+OFFICE_OMITTED_MESSAGE = "登記部門という記載のため省略されております"
+
+# 法務局・地方法務局 → その支局・出張所
+REGISTRY_OFFICES = {
+    # 東京法務局管内
+    "東京法務局": [
+        "台東出張所", "墨田出張所", "品川出張所", "城南出張所", "渋谷出張所", "新宿出張所",
+        "中野出張所", "杉並出張所", "北出張所", "板橋出張所", "練馬出張所", "江戸川出張所",
+        "城北出張所", "港出張所", "世田谷出張所", "八王子支局", "府中支局", "西多摩支局",
+        "町田出張所", "田無出張所", "立川出張所",
+    ],
+    "横浜地方法務局": [
+        "神奈川出張所", "金沢出張所", "青葉出張所", "旭出張所", "栄出張所", "港北出張所",
+        "戸塚出張所", "麻生出張所", "川崎支局", "横須賀支局", "湘南支局", "西湘二宮支局",
+        "相模原支局", "厚木支局", "大和出張所", "上溝出張所",
+    ],
+    "さいたま地方法務局": [
+        "志木出張所", "川口出張所", "鴻巣出張所", "上尾出張所", "坂戸出張所", "川越支局",
+        "所沢支局", "飯能出張所", "熊谷支局", "秩父支局", "東松山出張所", "越谷支局",
+        "春日部支局", "久喜支局", "草加出張所",
+    ],
+    "千葉地方法務局": [
+        "市川支局", "船橋支局", "松戸支局", "柏支局", "木更津支局", "香取支局", "佐倉支局",
+        "匝瑳支局", "茂原支局", "館山支局", "市原出張所", "八街出張所", "豊四季出張所",
+    ],
+    "水戸地方法務局": [
+        "日立支局", "土浦支局", "龍ケ崎支局", "下妻支局", "常陸太田支局", "鹿嶋支局",
+        "取手出張所", "つくば出張所", "笠間出張所", "常総支局",
+    ],
+    "宇都宮地方法務局": [
+        "日光支局", "真岡支局", "大田原支局", "栃木支局", "足利支局", "小山支局",
+    ],
+    "前橋地方法務局": [
+        "高崎支局", "桐生支局", "伊勢崎支局", "沼田支局", "太田支局", "富岡支局",
+        "中之条支局", "渋川出張所", "館林出張所",
+    ],
+    "静岡地方法務局": [
+        "沼津支局", "熱海出張所", "富士支局", "下田支局", "浜松支局", "掛川支局",
+        "袋井出張所", "藤枝支局", "島田出張所", "湖西出張所",
+    ],
+    "甲府地方法務局": ["大月支局", "韮崎出張所", "鰍沢支局", "吉田出張所"],
+    "長野地方法務局": [
+        "上田支局", "佐久支局", "松本支局", "飯田支局", "諏訪支局", "伊那支局", "木曽支局",
+        "大町支局", "中野支局", "飯山支局", "須坂出張所", "千曲出張所",
+    ],
+    "新潟地方法務局": [
+        "三条支局", "新発田支局", "長岡支局", "柏崎支局", "南魚沼支局", "十日町支局",
+        "上越支局", "糸魚川支局", "佐渡支局", "村上支局", "新津出張所",
+    ],
+    # 大阪法務局管内
+    "大阪法務局": [
+        "北出張所", "天王寺出張所", "守口出張所", "堺支局", "岸和田支局", "富田林支局",
+        "池田出張所", "北大阪支局", "東大阪支局", "枚方出張所", "八尾出張所",
+    ],
+    "京都地方法務局": [
+        "伏見出張所", "嵯峨出張所", "宇治支局", "園部支局", "福知山支局", "舞鶴支局",
+        "宮津支局", "京丹後支局", "木津出張所", "田辺出張所",
+    ],
+    "神戸地方法務局": [
+        "須磨出張所", "北神出張所", "西宮支局", "尼崎支局", "伊丹支局", "明石支局",
+        "姫路支局", "加古川支局", "洲本支局", "豊岡支局", "柏原支局", "社支局", "龍野支局",
+    ],
+    "奈良地方法務局": ["葛城支局", "桜井支局", "五條支局", "中和出張所"],
+    "大津地方法務局": ["彦根支局", "長浜支局", "東近江支局", "甲賀支局", "高島出張所"],
+    "和歌山地方法務局": ["田辺支局", "新宮支局", "御坊支局", "橋本支局", "湯浅出張所"],
+    # 名古屋法務局管内
+    "名古屋法務局": [
+        "熱田出張所", "名東出張所", "春日井支局", "津島支局", "一宮支局", "半田支局",
+        "岡崎支局", "豊田支局", "西尾支局", "刈谷支局", "豊橋支局", "新城支局",
+    ],
+    "津地方法務局": [
+        "四日市支局", "伊勢支局", "松阪支局", "伊賀支局", "尾鷲支局", "熊野支局",
+        "桑名支局", "鈴鹿支局",
+    ],
+    "岐阜地方法務局": ["大垣支局", "多治見支局", "美濃加茂支局", "中津川支局", "高山支局", "八幡出張所"],
+    "福井地方法務局": ["武生支局", "敦賀支局", "小浜支局", "大野支局"],
+    "金沢地方法務局": ["小松支局", "七尾支局", "輪島支局"],
+    "富山地方法務局": ["高岡支局", "魚津支局", "砺波支局"],
+    # 広島法務局管内
+    "広島法務局": [
+        "呉支局", "尾道支局", "福山支局", "三次支局", "東広島支局", "府中支局", "廿日市出張所",
+    ],
+    "岡山地方法務局": ["倉敷出張所", "津山支局", "笠岡支局", "高梁支局", "新見支局"],
+    "鳥取地方法務局": ["米子支局", "倉吉支局"],
+    "松江地方法務局": ["出雲支局", "浜田支局", "益田支局", "隠岐支局"],
+    "山口地方法務局": ["下関支局", "宇部支局", "周南支局", "岩国支局", "萩支局", "柳井出張所"],
+    # 福岡法務局管内
+    "福岡法務局": [
+        "西新出張所", "北九州支局", "久留米支局", "飯塚支局", "田川支局", "行橋支局",
+        "直方支局", "八女支局", "柳川支局", "甘木支局", "大牟田出張所",
+    ],
+    "佐賀地方法務局": ["唐津支局", "伊万里支局", "武雄支局"],
+    "長崎地方法務局": ["佐世保支局", "諫早支局", "島原支局", "五島支局", "壱岐支局", "対馬支局"],
+    "大分地方法務局": ["中津支局", "佐伯支局", "日田支局"],
+    "熊本地方法務局": ["八代支局", "人吉支局", "天草支局", "玉名支局"],
+    "鹿児島地方法務局": ["鹿屋支局", "川内支局", "加治木支局", "名瀬支局"],
+    "宮崎地方法務局": ["延岡支局", "日南支局", "都城支局"],
+    "那覇地方法務局": ["沖縄支局", "名護支局", "宮古島支局", "石垣支局"],
+    # 仙台法務局管内
+    "仙台法務局": ["石巻支局", "塩釜支局", "古川支局", "大河原支局", "気仙沼支局", "登米支局"],
+    "福島地方法務局": ["郡山支局", "白河支局", "若松支局", "いわき支局", "相馬支局", "富岡出張所"],
+    "山形地方法務局": ["米沢支局", "鶴岡支局", "酒田支局", "新庄支局"],
+    "盛岡地方法務局": ["花巻支局", "二戸支局", "宮古支局", "一関支局", "水沢支局"],
+    "秋田地方法務局": ["能代支局", "本荘支局", "大館支局", "横手支局", "大曲支局"],
+    "青森地方法務局": ["弘前支局", "八戸支局", "五所川原支局", "十和田支局", "むつ支局"],
+    # 札幌法務局管内
+    "札幌法務局": [
+        "北出張所", "南出張所", "岩見沢支局", "滝川支局", "室蘭支局", "苫小牧支局",
+        "日高支局", "小樽支局", "倶知安支局",
+    ],
+    "函館地方法務局": ["江差支局", "八雲支局"],
+    "旭川地方法務局": ["名寄支局", "紋別支局", "稚内支局", "留萌支局"],
+    "釧路地方法務局": ["帯広支局", "北見支局", "根室支局"],
+    # 高松法務局管内
+    "高松法務局": ["丸亀支局", "観音寺支局"],
+    "徳島地方法務局": ["阿南支局", "美馬支局"],
+    "高知地方法務局": ["須崎支局", "香美支局", "安芸支局", "四万十支局"],
+    "松山地方法務局": ["今治支局", "宇和島支局", "大洲支局", "西条支局", "四国中央支局"],
+}
+
+BRANCH_SUFFIX_PATTERN = re.compile(r"支局|出張所")
+
+# 照合に使うヘッダーの長さ（登記所名は冒頭にあるので、先頭だけを見れば足りる）
+HEADER_MAX_CHARS = 300
+
+
+def _compact(text: str) -> str:
+    return re.sub(r"\s", "", unicodedata.normalize("NFKC", text))
+
+
+def _branches() -> list[str]:
+    return sorted({name for names in REGISTRY_OFFICES.values() for name in names}, key=len, reverse=True)
+
+
+def _bureaus() -> list[str]:
+    return sorted(REGISTRY_OFFICES, key=len, reverse=True)
+
+
+def _branch_owners() -> dict[str, list[str]]:
+    """
+    支局・出張所名 → それを持つ法務局の一覧（「北出張所」「府中支局」のように複数の法務局にある名称がある）
+    """
+    owners: dict[str, list[str]] = {}
+    for bureau, names in REGISTRY_OFFICES.items():
+        for name in names:
+            owners.setdefault(name, []).append(bureau)
+    return owners
+
+
+def find_exact(header: str, names: list[str]) -> str | None:
+    """
+    ヘッダーにそのまま含まれる名称のうち、最も長いものを返す（「北出張所」より「城北出張所」を優先する）
+    """
+    for name in sorted(names, key=len, reverse=True):
+        if name in header:
+            return name
+    return None
+
+
+def _windows(text: str, remove: str | None = None) -> list[str]:
+    """
+    あいまい照合の比較対象（空白で区切った語と、隣り合う2語をつなげたもの）。
+    OCRで名称の途中に空白が入る場合があるので2語をつなげたものも含める
+    """
+    words = [word.replace(remove, "") if remove else word for word in text.split()]
+    words = [word for word in words if word]
+    return words + [a + b for a, b in zip(words, words[1:])]
+
+
+def fuzzy_scores(windows: list[str], names: list[str], min_similarity: float) -> dict[str, float]:
+    """
+    名称ごとに、windows の語との類似度の最高値を返す（min_similarity に届かない名称は含めない）。
+    語全体と比べるので、「茨木出張所」の一部の「木出張所」が「北出張所」に似ている、といった取り違えはしない
+    """
+    scores: dict[str, float] = {}
+    for name in names:
+        matcher = SequenceMatcher(None, b=name)
+        for window in windows:
+            matcher.set_seq1(window)
+            if matcher.real_quick_ratio() < min_similarity or matcher.quick_ratio() < min_similarity:
+                continue
+            score = matcher.ratio()
+            if score >= max(min_similarity, scores.get(name, 0.0)):
+                scores[name] = score
+    return scores
+
+
+def find_fuzzy(windows: list[str], names: list[str], min_similarity: float,
+               min_margin: float | None = None) -> str | None:
+    """
+    類似度が最も高い名称を返す。2番目の候補との差が min_margin 未満（同点・僅差）なら、
+    どちらとも決められないので None を返す
+    """
+    if min_margin is None:
+        min_margin = REGISTRY_OFFICE_MIN_MARGIN
+    ranked = sorted(fuzzy_scores(windows, names, min_similarity).items(), key=lambda item: item[1], reverse=True)
+    if not ranked:
+        return None
+    if len(ranked) > 1 and ranked[0][1] - ranked[1][1] < min_margin:
+        return None
+    return ranked[0][0]
+
+
+def resolve_registry_office(header_text: str, min_similarity: float | None = None) -> str | None:
+    """
+    受付帳のヘッダーから登記所名（例: 「大津地方法務局東近江支局」、本局なら「東京法務局」）を返す。
+    一覧と照合して1つに決められなければ None
+    """
+    if min_similarity is None:
+        min_similarity = REGISTRY_OFFICE_MIN_SIMILARITY
+    text = unicodedata.normalize("NFKC", header_text)[:HEADER_MAX_CHARS]
+    header = _compact(text)
+    if not header:
+        return None
+
+    bureau = find_exact(header, _bureaus()) or find_fuzzy(_windows(text), _bureaus(), min_similarity)
+    if bureau is None:
+        # 法務局名が読めないときは、どの法務局のものか一意に決まる支局・出張所名がそのまま書かれている場合だけ採用する
+        if "登記部門" in header:
+            return OFFICE_OMITTED_MESSAGE
+        branch = find_exact(header, list(_branch_owners()))
+        owners = _branch_owners().get(branch, [])
+        return owners[0] + branch if len(owners) == 1 else None
+
+    # 支局・出張所は、その法務局のものだけと照合する
+    rest = header.replace(bureau, "", 1) if bureau in header else header
+    branches = REGISTRY_OFFICES[bureau]
+    branch = find_exact(rest, branches) or find_fuzzy(_windows(text, bureau), branches, min_similarity)
+    if branch:
+        return bureau + branch
+    if "登記部門" in rest:
+        return OFFICE_OMITTED_MESSAGE
+    if BRANCH_SUFFIX_PATTERN.search(rest):
+        # 一覧にない支局・出張所（統廃合・新設など）は本局と取り違えないよう LLM に任せる
+        return None
+    return bureau
@@ -0,0 +1,214 @@
+'''
+登記簿（全部事項）PDFのテキストから、LLMを使わずに所有者情報を取り出すパーサー。
+
+登記情報提供サービスの登記簿は様式が決まっている。
+
+  表題部 … 所在 / 地番 / 地目 / 地積
+  権利部（甲区）（所有権に関する事項）
+    順位番号 | 登記の目的 | 受付年月日・受付番号 | 原因 | 権利者その他の事項
+    2          所有権移転   令和6年1月5日 第49号    令和5年10月1日相続   所有者 東京都… 氏名
+  権利部（乙区）（所有権以外の権利に関する事項）
+
+甲区の順位番号ごとに記載を分け、原因が「相続」または「遺贈」の所有権移転のうち最も新しいものから
+氏名・所有者住所を、表題部の所在から不動産所在地を取り出す。
+共有者が複数いる・住所変更の登記が後にある等、判断が難しい場合は confidence を下げ、
+呼び出し側（pipeline.extract_owner_record）が LLM にフォールバックできるようにする。
+'''
+
+import re
+import unicodedata
+from dataclasses import dataclass, field
+
+PREFECTURE_PATTERN = re.compile(r"(北海道|東京都|大阪府|京都府|.{2,3}県)")
+ENTRY_START_PATTERN = re.compile(r"^(\d+)(?:付記\d+号)?(?=\D)")
+CAUSE_PATTERN = re.compile(r"日(相続|遺贈)")
+OWNER_LABEL_PATTERN = re.compile(r"(所有者|共有者)")
+# 氏名（法人名を除く）の1語分。氏と名が空白で分かれている場合に備え、NAME_MAX_WORDS 語までつなげる
+NAME_WORD_PATTERN = re.compile(r"[一-鿿々〆ヶぁ-んァ-ヶー・]+")
+NAME_MAX_WORDS = 2
+SECTION_END_MARKERS = ("権利部(乙区)", "共同担保目録", "これは登記記録に記録されている")
+# 各ページ末尾の定型文（甲区がページをまたぐ場合もあるので、区の終わりとはみなさず読み飛ばす）
+PAGE_FOOTER_MARKERS = ("下線のあるものは抹消事項", "整理番号")
+
+
+@dataclass
+class RegistryParseResult:
+    record: dict | None
+    confidence: float
+    reasons: list[str] = field(default_factory=list)
+
+
+def _lines(text: str) -> list[str]:
+    text = unicodedata.normalize("NFKC", text)
+    # MarkItDown の表組み（| 区切り）や罫線文字は区切りの空白とみなす
+    text = re.sub(r"[|│┃]", " ", text)
+    return [line.strip() for line in text.splitlines() if line.strip()]
+
+
+def _compact(text: str) -> str:
+    return re.sub(r"\s", "", text)
+
+
+def find_location(lines: list[str]) -> str | None:
+    """
+    表題部の「所在」「地番」と、ページ上部に書かれた都道府県から不動産所在地を組み立てる
+    """
+    location = None
+    lot = None
+    for line in lines:
+        compact = _compact(line)
+        if location is None and compact.startswith("所在") and not compact.startswith("所在図"):
+            location = re.sub(r"余白.*$", "", compact[len("所在"):]) or None
+        elif lot is None and compact.startswith(("地番", "家屋番号")):
+            m = re.match(r"(?:地番|家屋番号)(\d+番[\d\-の]*)", compact)
+            lot = m.group(1) if m else None
+    if not location:
+        return None
+    if lot and not re.search(r"\d", location):
+        location += lot
+    if PREFECTURE_PATTERN.match(location):
+        return location
+    # 登記簿の冒頭（「滋賀県東近江市…」）から都道府県を補う
+    for line in lines[:10]:
+        compact = _compact(line)
+        m = PREFECTURE_PATTERN.match(compact)
+        if m and location[:4] in compact:
+            return m.group(1) + location
+    return location
+
+
+def kou_section(lines: list[str]) -> list[str]:
+    """
+    権利部（甲区）の行だけを返す（見つからなければ空リスト）
+    """
+    start = None
+    for i, line in enumerate(lines):
+        if "権利部(甲区)" in _compact(line):
+            start = i + 1
+            break
+    if start is None:
+        return []
+    section = []
+    for line in lines[start:]:
+        compact = _compact(line)
+        if any(marker in compact for marker in SECTION_END_MARKERS):
+            break
+        # 見出し行（順位番号 登記の目的 …）とページ末尾の定型文は飛ばす
+        if compact.startswith("順位番号") or any(marker in compact for marker in PAGE_FOOTER_MARKERS):
+            continue
+        section.append(line)
+    return section
+
+
+def split_entries(section: list[str]) -> list[tuple[int, list[str]]]:
+    entries: list[tuple[int, list[str]]] = []
+    for line in section:
+        m = ENTRY_START_PATTERN.match(_compact(line))
+        if m and ("所有権" in line or "登記" in line or "差押" in line or "仮" in line):
+            entries.append((int(m.group(1)), [line]))
+        elif entries:
+            entries[-1][1].append(line)
+    return entries
+
+
+def parse_owners(entry_lines: list[str]) -> list[tuple[str, str, list[str]]]:
+    """
+    権利者その他の事項から (住所, 氏名, 氏名の後に続く語) の組を取り出す。
+    氏名は住所の後から次の「所有者」「共有者」「持分」・住所の手前までの語で、
+    「山田 太郎」のように空白で分かれていればつなげる。氏名らしくない語が続いた場合は3つ目に残す
+    """
+    tokens = " ".join(entry_lines).split()
+    owners = []
+    active = False
+    address = None
+    words: list[str] = []
+
+    def flush():
+        nonlocal address, words
+        if address is not None and words:
+            name_words = []
+            for word in words:
+                if len(name_words) == NAME_MAX_WORDS or not NAME_WORD_PATTERN.fullmatch(word):
+                    break
+                name_words.append(word)
+            owners.append((address, "".join(name_words) or words[0], words[len(name_words) or 1:]))
+        address = None
+        words = []
+
+    for token in tokens:
+        m = OWNER_LABEL_PATTERN.match(token)
+        if m:
+            flush()
+            active = True
+            token = token[m.end():]
+            if not token:
+                continue
+        if not active:
+            continue
+        if token.startswith("持分"):
+            # 「共有者 住所 持分2分の1 氏名」のように住所と氏名の間にある場合は読み飛ばす
+            if words:
+                flush()
+        elif PREFECTURE_PATTERN.match(token):
+            flush()
+            address = token
+        elif address is not None:
+            # 住所の途中に空白が入っている場合（「梅田1丁目 2番3号」）は住所の続きとみなす
+            if not words and re.search(r"\d", token):
+                address += token
+            else:
+                words.append(token)
+    flush()
+    return owners
+
+
+def parse_registry(text: str) -> RegistryParseResult:
+    """
+    登記簿のテキストから {"氏名", "所有者住所", "不動産所在地"} と確信度（0〜1）を返す
+    """
+    lines = _lines(text)
+    section = kou_section(lines)
+    if not section:
+        return RegistryParseResult(None, 0.0, ["甲区が見つかりません"])
+    entries = split_entries(section)
+
+    inherited = [
+        i for i, (_, entry) in enumerate(entries)
+        if "所有権移転" in _compact(entry[0]) and CAUSE_PATTERN.search(_compact(" ".join(entry)))
+    ]
+    if not inherited:
+        return RegistryParseResult(None, 0.0, ["相続・遺贈による所有権移転が見つかりません"])
+    number, entry = entries[inherited[-1]]
+
+    reasons = []
+    confidence = 1.0
+    owners = parse_owners(entry)
+    if not owners:
+        return RegistryParseResult(None, 0.0, [f"順位{number}の所有者を読み取れません"])
+    if len(owners) > 1:
+        reasons.append(f"順位{number}に共有者が{len(owners)}名います")
+        confidence -= 0.5
+    # 付記登記（「2付記1号」）も含め、後ろに続く記載
+    later = [e for _, e in entries[inherited[-1] + 1:]]
+    if any("住所" in _compact(" ".join(e)) or "氏名" in _compact(" ".join(e)) for e in later):
+        reasons.append("後の順位に住所・氏名の変更があります")
+        confidence -= 0.5
+
+    address, name, trailing = owners[0]
+    if trailing:
+        reasons.append(f"氏名の後に読み取れない記載があります: {' '.join(trailing)}")
+        confidence -= 0.3
+    if not re.search(r"\d|番地|番", address):
+        reasons.append("所有者住所に番地がありません")
+        confidence -= 0.3
+    if not re.fullmatch(r"[一-鿿々〆ヶぁ-んァ-ヶー・]{2,15}", name):
+        reasons.append(f"氏名の形式が不自然です: {name}")
+        confidence -= 0.3
+
+    location = find_location(lines)
+    if not location:
+        reasons.append("所在が見つかりません")
+        confidence -= 0.5
+
+    record = {"氏名": name, "所有者住所": address, "不動産所在地": location or ""}
+    return RegistryParseResult(record, max(0.0, confidence), reasons)
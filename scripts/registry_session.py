@@ -0,0 +1,186 @@
+'''
+登記情報取得サイトのログイン状態とブラウザを、実行をまたいで使い回す。
+
+1. ログイン状態の保存
+   ログインに成功したら Playwright の storage_state（Cookie など）とメニュー画面のURLを
+   REGISTRY_STATE_DIR に保存する。次の実行ではそれを読み込んだコンテキストでメニュー画面を開き、
+   メニューが表示されればログインを省略する（ログイン画面に戻された場合だけログインし直す）。
+   並列ダウンロードではワーカーごとに別のセッションを使うので、保存先もワーカー番号（slot）ごとに分ける。
+   REGISTRY_SESSION_MAX_AGE_MINUTES を過ぎた状態は確認せずに捨てる。
+
+2. ブラウザの常駐
+   REGISTRY_WARM_BROWSER が有効なら、Chromium をリモートデバッグ付きで1度だけ起動してプロセス内に残し、
+   各実行（Streamlit の再実行・CLI のパイプラインなど、同じプロセス内のもの）は connect_over_cdp で接続する。
+   sync API の Playwright はスレッドをまたいで使えないが、ブラウザ本体への接続は実行ごとに張り直せる。
+   起動・接続に失敗した場合は、従来どおり実行ごとにブラウザを起動する。
+'''
+
+import atexit
+import json
+import os
+import socket
+import subprocess
+import tempfile
+import threading
+import time
+import urllib.request
+from scripts.env_utils import env_bool
+
+REGISTRY_STATE_DIR = os.getenv("REGISTRY_STATE_DIR", os.path.join("cache", "registry_session"))
+REGISTRY_SESSION_MAX_AGE = float(os.getenv("REGISTRY_SESSION_MAX_AGE_MINUTES", "120")) * 60
+REGISTRY_WARM_BROWSER = env_bool("REGISTRY_WARM_BROWSER", True)
+
+
+def state_path(slot: int = 0) -> str:
+    return os.path.join(REGISTRY_STATE_DIR, f"state_{slot}.json")
+
+
+def _meta_path(slot: int) -> str:
+    return os.path.join(REGISTRY_STATE_DIR, f"state_{slot}.meta.json")
+
+
+def load_session_meta(slot: int = 0, site: str | None = None) -> dict | None:
+    """
+    保存済みのログイン状態の情報（site, menu_url, saved_at）を返す。
+    無い・古すぎる・別のサイト（ログインURL）のものである場合は None
+    """
+    try:
+        with open(_meta_path(slot), encoding="utf-8") as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not os.path.exists(state_path(slot)) or time.time() - meta.get("saved_at", 0) > REGISTRY_SESSION_MAX_AGE:
+        return None
+    if site is not None and meta.get("site") != site:
+        return None
+    return meta
+
+
+def save_session(context, site: str, menu_url: str, slot: int = 0) -> None:
+    os.makedirs(REGISTRY_STATE_DIR, exist_ok=True)
+    context.storage_state(path=state_path(slot))
+    tmp_path = _meta_path(slot) + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"site": site, "menu_url": menu_url, "saved_at": time.time()}, f)
+    os.replace(tmp_path, _meta_path(slot))
+
+
+def discard_session(slot: int = 0) -> None:
+    for path in (state_path(slot), _meta_path(slot)):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def new_session_context(browser, site: str, slot: int = 0, **kwargs):
+    """
+    保存済みのログイン状態があればそれを読み込んだコンテキストを作る
+    """
+    if load_session_meta(slot, site) is not None:
+        kwargs["storage_state"] = state_path(slot)
+    return browser.new_context(**kwargs)
+
+
+def restore_session(page, site: str, slot: int, is_logged_in) -> bool:
+    """
+    保存済みのメニュー画面を開き、ログイン済みのままなら True を返す
+    """
+    meta = load_session_meta(slot, site)
+    if meta is None:
+        return False
+    try:
+        page.goto(meta["menu_url"])
+        if is_logged_in(page):
+            return True
+    except Exception as e:
+        print(f"⚠️ 保存済みのログイン状態を確認できませんでした: {e}")
+    discard_session(slot)
+    return False
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class WarmBrowser:
+    """
+    リモートデバッグ付きで起動したまま残しておく Chromium
+    """
+
+    def __init__(self):
+        self.process: subprocess.Popen | None = None
+        self.endpoint: str | None = None
+        self._profile_dir = None
+        self._lock = threading.RLock()
+
+    def _start(self, executable_path: str, headless: bool) -> None:
+        port = _free_port()
+        self._profile_dir = tempfile.TemporaryDirectory(prefix="registry_browser_")
+        args = [
+            executable_path,
+            f"--remote-debugging-port={port}",
+            f"--user-data-dir={self._profile_dir.name}",
+            "--no-first-run", "--no-default-browser-check", "--no-sandbox",
+            "about:blank",
+        ]
+        if headless:
+            args.insert(1, "--headless=new")
+        self.process = subprocess.Popen(args, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        endpoint = f"http://127.0.0.1:{port}"
+        # DevTools のエンドポイントが応答するまで待つ
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            returncode = self.process.poll()
+            if returncode is not None:
+                self.stop()
+                raise RuntimeError(f"Chromium が終了しました（終了コード {returncode}）")
+            try:
+                urllib.request.urlopen(f"{endpoint}/json/version", timeout=1).read()
+                self.endpoint = endpoint
+                return
+            except OSError:
+                time.sleep(0.1)
+        self.stop()
+        raise RuntimeError("Chromium のリモートデバッグに接続できませんでした")
+
+    def get_endpoint(self, executable_path: str, headless: bool = True) -> str:
+        with self._lock:
+            if self.process is None or self.process.poll() is not None:
+                self._start(executable_path, headless)
+                print("✅ ブラウザを起動しました（以降の実行で使い回します）")
+            return self.endpoint
+
+    def stop(self) -> None:
+        with self._lock:
+            if self.process is not None and self.process.poll() is None:
+                self.process.terminate()
+                try:
+                    self.process.wait(timeout=10)
+                except subprocess.TimeoutExpired:
+                    self.process.kill()
+            self.process = None
+            self.endpoint = None
+            if self._profile_dir is not None:
+                self._profile_dir.cleanup()
+                self._profile_dir = None
+
+
+warm_browser = WarmBrowser()
+atexit.register(warm_browser.stop)
+
+
+def connect_browser(playwright, executable_path: str | None, headless: bool = True, launch=None):
+    """
+    (browser, owned) を返す。常駐ブラウザに接続できたときは owned=False（閉じずに残す）、
+    できなければ launch(playwright) で起動したブラウザを owned=True で返す
+    """
+    if REGISTRY_WARM_BROWSER:
+        try:
+            endpoint = warm_browser.get_endpoint(executable_path or playwright.chromium.executable_path, headless)
+            return playwright.chromium.connect_over_cdp(endpoint), False
+        except Exception as e:
+            print(f"⚠️ 常駐ブラウザを使えないため、この実行用にブラウザを起動します: {e}")
+    return launch(playwright), True
@@ -0,0 +1,170 @@
+'''
+取得した登記PDFを実行をまたいで使い回すための保存庫。
+
+PDF本体は内容の SHA-256 をファイル名にして objects/ に1つだけ保存し（同じ内容なら重複して持たない）、
+どの住所がどのPDFかは SQLite の索引（index.db）に持つ。索引のキーは住所を正規化した文字列
+（address_normalizer.normalize_address）なので、表記ゆれだけが違う住所は同じ物件として扱う。
+取得してから REGISTRY_STORE_TTL_DAYS 以内のPDFは「新しい」とみなし、ブラウザを使わずにこちらから返す。
+
+環境変数:
+  REGISTRY_STORE_ENABLED   0 にすると保存庫を使わない
+  REGISTRY_STORE_DIR       保存先（既定: cache/registry_store）
+  REGISTRY_STORE_TTL_DAYS  取得したPDFを使い回す日数（既定: 30日。0 なら使い回さない）
+  REGISTRY_STORE_COMPRESS  1 にすると gzip で圧縮して保存する（既定: 0）
+'''
+
+import gzip
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from scripts.address_normalizer import normalize_address
+from scripts.env_utils import TRUE_VALUES, env_bool
+from scripts.file_utils import file_sha256
+
+REGISTRY_STORE_ENABLED = env_bool("REGISTRY_STORE_ENABLED", True)
+REGISTRY_STORE_DIR = os.getenv("REGISTRY_STORE_DIR", os.path.join("cache", "registry_store"))
+REGISTRY_STORE_TTL = float(os.getenv("REGISTRY_STORE_TTL_DAYS", "30")) * 86400
+REGISTRY_STORE_COMPRESS = env_bool("REGISTRY_STORE_COMPRESS", False, TRUE_VALUES + ("gzip",))
+
+_store = None
+
+
+def store_key(address: str) -> str:
+    return normalize_address(address)
+
+
+class RegistryStore:
+    def __init__(self, root: str, ttl: float | None = None, compress: bool = False):
+        self.root = root
+        self.ttl = ttl
+        self.compress = compress
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.join(root, "objects"), exist_ok=True)
+        self._conn = sqlite3.connect(os.path.join(root, "index.db"), check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                address TEXT,
+                sha256 TEXT,
+                stored_at REAL
+            )
+        ''')
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS objects (
+                sha256 TEXT PRIMARY KEY,
+                path TEXT,
+                size INTEGER,
+                stored_size INTEGER
+            )
+        ''')
+        self._conn.commit()
+
+    def _object_path(self, sha256: str, compressed: bool) -> str:
+        suffix = ".pdf.gz" if compressed else ".pdf"
+        return os.path.join(self.root, "objects", sha256[:2], sha256 + suffix)
+
+    def put(self, address: str, pdf_path: str) -> str:
+        """
+        PDFを保存庫に入れ、住所に結びつける。内容の SHA-256 を返す
+        """
+        sha256 = file_sha256(pdf_path)
+        with self._lock:
+            row = self._conn.execute("SELECT path FROM objects WHERE sha256=?", (sha256,)).fetchone()
+            if row is None or not os.path.exists(row[0]):
+                object_path = self._object_path(sha256, self.compress)
+                os.makedirs(os.path.dirname(object_path), exist_ok=True)
+                # 書き終えてから名前を変え、途中で止まっても壊れたファイルが索引に載らないようにする
+                fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(object_path), suffix=".tmp")
+                with os.fdopen(fd, "wb") as out, open(pdf_path, "rb") as src:
+                    if self.compress:
+                        with gzip.GzipFile(fileobj=out, mode="wb") as gz:
+                            shutil.copyfileobj(src, gz)
+                    else:
+                        shutil.copyfileobj(src, out)
+                os.replace(tmp_path, object_path)
+                with self._conn:
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO objects (sha256, path, size, stored_size) VALUES (?,?,?,?)",
+                        (sha256, object_path, os.path.getsize(pdf_path), os.path.getsize(object_path))
+                    )
+            with self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO entries (key, address, sha256, stored_at) VALUES (?,?,?,?)",
+                    (store_key(address), address, sha256, time.time())
+                )
+        return sha256
+
+    def lookup(self, address: str) -> dict | None:
+        """
+        住所に結びついた新しいPDFがあれば {address, sha256, stored_at, path} を返す（古い・無ければ None）
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT e.address, e.sha256, e.stored_at, o.path FROM entries e "
+                "JOIN objects o ON o.sha256 = e.sha256 WHERE e.key=?",
+                (store_key(address),)
+            ).fetchone()
+            fresh = row is not None and (self.ttl is None or row[2] + self.ttl >= time.time())
+            if not fresh or not os.path.exists(row[3]):
+                self.misses += 1
+                return None
+            self.hits += 1
+        return dict(zip(("address", "sha256", "stored_at", "path"), row))
+
+    def fetch(self, address: str, dest_path: str) -> str | None:
+        """
+        新しいPDFがあれば dest_path に書き出してそのパスを返す（無ければ None）
+        """
+        entry = self.lookup(address)
+        if entry is None:
+            return None
+        os.makedirs(os.path.dirname(os.path.abspath(dest_path)), exist_ok=True)
+        tmp_path = dest_path + ".part"
+        opener = gzip.open if entry["path"].endswith(".gz") else open
+        with opener(entry["path"], "rb") as src, open(tmp_path, "wb") as out:
+            shutil.copyfileobj(src, out)
+        os.replace(tmp_path, dest_path)
+        return dest_path
+
+    def prune(self) -> int:
+        """
+        期限切れの索引と、どの住所からも参照されなくなったPDFを削除する。削除したPDFの数を返す
+        """
+        with self._lock, self._conn:
+            if self.ttl is not None:
+                self._conn.execute("DELETE FROM entries WHERE stored_at < ?", (time.time() - self.ttl,))
+            orphans = self._conn.execute(
+                "SELECT sha256, path FROM objects WHERE sha256 NOT IN (SELECT sha256 FROM entries)"
+            ).fetchall()
+            for sha256, path in orphans:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+            self._conn.executemany("DELETE FROM objects WHERE sha256=?", [(sha256,) for sha256, _ in orphans])
+        return len(orphans)
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+            objects, size, stored_size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(stored_size), 0) FROM objects"
+            ).fetchone()
+        return {"hits": self.hits, "misses": self.misses, "entries": entries, "objects": objects,
+                "bytes": size, "stored_bytes": stored_size}
+
+
+def get_registry_store() -> RegistryStore | None:
+    global _store
+    if not REGISTRY_STORE_ENABLED or REGISTRY_STORE_TTL <= 0:
+        return None
+    if _store is None:
+        _store = RegistryStore(REGISTRY_STORE_DIR, ttl=REGISTRY_STORE_TTL, compress=REGISTRY_STORE_COMPRESS)
+        _store.prune()
+    return _store
@@ -0,0 +1,145 @@
+'''
+登記情報取得サイトの受付時間に合わせてダウンロードを進めるスケジューラー。
+
+受付時間（日本時間）:
+  平日           8:30〜23:00
+  土日・祝日     8:30〜18:00
+  12/29〜1/3     終日休み
+
+受付時間外の住所を飛ばすのではなく、時間外や締め切り間際（残りが SERVICE_CUTOFF_MARGIN_MINUTES と
+住所1件分の所要時間より短いとき）は次の受付開始まで待ってから再開する。
+住所1件あたりの所要時間は実際の完了件数から測り（最初は DOWNLOAD_SECONDS_PER_ADDRESS を使う）、
+受付時間の枠に残りの件数を割り振って完了見込み時刻を出す。
+
+サーバーのタイムゾーンに関係なく、日本時間で判定する。
+'''
+
+import os
+import threading
+import time
+from datetime import date, datetime, time as dtime, timedelta
+from zoneinfo import ZoneInfo
+import holidays
+
+JST = ZoneInfo("Asia/Tokyo")
+JP_HOLIDAYS = holidays.Japan()
+
+SERVICE_OPEN = dtime(8, 30)
+WEEKDAY_CLOSE = dtime(23, 0)
+HOLIDAY_CLOSE = dtime(18, 0)
+
+# 締め切りのこの分数前からは新しい住所の取得を始めない
+SERVICE_CUTOFF_MARGIN = timedelta(minutes=float(os.getenv("SERVICE_CUTOFF_MARGIN_MINUTES", "5")))
+# 実測が無いうちに使う、住所1件あたりの所要時間（秒）
+DOWNLOAD_SECONDS_PER_ADDRESS = float(os.getenv("DOWNLOAD_SECONDS_PER_ADDRESS", "30"))
+
+
+def now_jst() -> datetime:
+    return datetime.now(JST).replace(tzinfo=None)
+
+
+def is_year_end_closed(day: date) -> bool:
+    return (day.month == 12 and day.day >= 29) or (day.month == 1 and day.day <= 3)
+
+
+def service_window(day: date) -> tuple[datetime, datetime] | None:
+    """
+    その日の受付時間 (開始, 終了) を返す。終日休みなら None
+    """
+    if is_year_end_closed(day):
+        return None
+    is_holiday_or_weekend = day.weekday() >= 5 or day in JP_HOLIDAYS
+    close = HOLIDAY_CLOSE if is_holiday_or_weekend else WEEKDAY_CLOSE
+    return datetime.combine(day, SERVICE_OPEN), datetime.combine(day, close)
+
+
+def is_within_service_hours(now: datetime) -> bool:
+    window = service_window(now.date())
+    return window is not None and window[0] <= now < window[1]
+
+
+def next_window(now: datetime, needed: timedelta = timedelta(0)) -> tuple[datetime, datetime]:
+    """
+    now 以降で、締め切りまでに needed 以上の時間が残っている最初の受付時間 (開始, 終了) を返す。
+    今が受付時間中で間に合うなら、今日の受付時間を返す
+    """
+    day = now.date()
+    for _ in range(30):
+        window = service_window(day)
+        if window is not None:
+            start = max(now, window[0])
+            if start + needed <= window[1]:
+                return window
+        day += timedelta(days=1)
+    raise RuntimeError("30日以内に受付時間が見つかりません")
+
+
+def estimate_completion(now: datetime, work_seconds: float,
+                        margin: timedelta = SERVICE_CUTOFF_MARGIN) -> datetime:
+    """
+    残りの作業時間 work_seconds を受付時間（締め切りの margin 前まで）に割り振ったときの完了時刻
+    """
+    t = now
+    remaining = work_seconds
+    while True:
+        window = next_window(t, margin + timedelta(seconds=1))
+        t = max(t, window[0])
+        usable = (window[1] - margin - t).total_seconds()
+        if remaining <= usable:
+            return t + timedelta(seconds=remaining)
+        remaining -= usable
+        t = window[1]
+
+
+class ServiceScheduler:
+    """
+    ワーカー間で共有し、住所を取得する前に wait_for_window() で受付時間を待つ。
+    完了した件数から住所1件あたりの所要時間（待機時間を除いた実時間 ÷ 件数）を測る
+    """
+
+    def __init__(self, total: int, margin: timedelta = SERVICE_CUTOFF_MARGIN,
+                 seconds_per_address: float = DOWNLOAD_SECONDS_PER_ADDRESS,
+                 clock=now_jst, sleep=time.sleep):
+        self.total = total
+        self.margin = margin
+        self.initial_seconds_per_address = seconds_per_address
+        self.completed = 0
+        self.paused_seconds = 0.0
+        self._clock = clock
+        self._sleep = sleep
+        self._started_at = clock()
+        self._paused_until = self._started_at
+        self._lock = threading.Lock()
+
+    def seconds_per_address(self) -> float:
+        with self._lock:
+            if self.completed == 0:
+                return self.initial_seconds_per_address
+            active = (self._clock() - self._started_at).total_seconds() - self.paused_seconds
+            return max(active, 0.0) / self.completed
+
+    def wait_for_window(self) -> bool:
+        """
+        受付時間外、または締め切りまでに1件終わらない見込みなら、次の受付開始まで待つ。待ったら True
+        """
+        now = self._clock()
+        needed = self.margin + timedelta(seconds=self.seconds_per_address())
+        start, _ = next_window(now, needed)
+        if start <= now:
+            return False
+        with self._lock:
+            # 複数のワーカーが同じ時間帯を待つので、待機時間は重ならない分だけ数える
+            self.paused_seconds += max(0.0, (start - max(now, self._paused_until)).total_seconds())
+            self._paused_until = max(self._paused_until, start)
+        print(f"⏸️ 登記情報の受付時間外（または締め切り間際）のため、{start:%m/%d %H:%M} まで待機します")
+        while self._clock() < start:
+            self._sleep(min(60.0, max((start - self._clock()).total_seconds(), 0.1)))
+        print("▶️ 受付時間になったため再開します")
+        return True
+
+    def record_done(self) -> None:
+        with self._lock:
+            self.completed += 1
+
+    def estimate(self, remaining: int) -> datetime:
+        return estimate_completion(self._clock(), remaining * self.seconds_per_address(), self.margin)
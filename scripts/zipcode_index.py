@@ -0,0 +1,533 @@
+'''
+KEN_ALL（日本郵便の郵便番号データ）から郵便番号を引くための索引。
+
+get_zipcode が住所ごとに全行（約12万行）へブールマスクを作っていた処理を置き換える。
+
+【索引の構成】
+- (都道府県, 市区町村) ごとに町域の一覧を保持する（KEN_ALL.CSV の行順を維持）
+- 市区町村ごとに 町域 → 郵便番号 のハッシュ索引（完全一致用、最初に出現した行を採用）
+- 完全一致しない場合は、その市区町村の町域だけを先頭から部分一致で走査する
+  （従来の df["町域"].str.contains(town) と同じく正規表現として評価し、結果はメモ化する）
+
+【コンパイル済みキャッシュ】
+KEN_ALL.CSV（Shift-JIS）を毎回パースしないよう、必要な列だけを辞書符号化して
+バイナリ形式で保存する。読み込みは numpy の memmap で行い、市区町村ごとの索引は
+最初に引かれたときに作る。
+
+  <キャッシュディレクトリ>/
+    meta.json        形式バージョン・元CSVの指紋（サイズ, mtime, SHA-256）・都道府県/市区町村の辞書・グループ範囲
+    town_ids.npy     行ごとの町域ID（int32、(都道府県, 市区町村) 順に並べ替え済み）
+    zipcodes.npy     行ごとの郵便番号（int32）
+    town_offsets.npy 町域辞書の各文字列の開始位置（int64）
+    towns.bin        町域辞書（UTF-8 を連結したもの）
+
+元CSVのサイズか mtime が変わった場合は SHA-256 を計算し直し、内容が変わっていれば再コンパイルする。
+
+【差分更新】
+日本郵便が毎月公開する ADD_YYMM.CSV / DEL_YYMM.CSV を、KEN_ALL.CSV を読み直さずに
+コンパイル済みキャッシュへ直接反映する。変更のあった市区町村の行だけを組み替え、
+適用済みの差分ファイルは meta.json の applied_deltas に記録する（ファイル名と SHA-256 が同じ差分は二度適用しない）。
+更新のたびに meta.json の generation が増えるので、常駐プロセスはそれを見て索引を読み直せる。
+※ KEN_ALL.CSV 自体が差し替えられた場合は、再コンパイル時に差分の記録もリセットされる。
+
+使い方:
+  python -m scripts.zipcode_index compile [--csv KEN_ALL.CSV] [--cache-dir DIR]
+  python -m scripts.zipcode_index update ADD_2405.CSV DEL_2405.CSV [--csv KEN_ALL.CSV] [--cache-dir DIR]
+'''
+
+import argparse
+import json
+import mmap
+import os
+import re
+import shutil
+import tempfile
+from datetime import datetime
+import numpy as np
+from scripts.file_utils import file_sha256
+
+CACHE_FORMAT_VERSION = 1
+
+KEN_ALL_COLUMNS = [
+    "地域コード", "変更フラグ", "郵便番号",
+    "都道府県カナ", "市区町村カナ", "町域カナ",
+    "都道府県", "市区町村", "町域",
+    "フラグ1", "フラグ2", "フラグ3",
+    "フラグ4", "フラグ5", "フラグ6"
+]
+
+# 町域が欠損している行の町域ID
+MISSING_TOWN = -1
+
+
+def format_zipcode(code) -> str:
+    """
+    KEN_ALL の郵便番号（数値 or 文字列）を「123-4567」形式に整形する
+    """
+    zip7 = str(code).zfill(7)
+    return f"{zip7[:3]}-{zip7[3:]}"
+
+
+def read_ken_all_csv(csv_path: str):
+    """
+    KEN_ALL 形式の CSV（Shift-JIS, ヘッダーなし）を読み込み、列名を付けて返す
+    """
+    import pandas as pd
+
+    df = pd.read_csv(csv_path, encoding="shift_jis", header=None)
+    df.columns = KEN_ALL_COLUMNS
+    return df
+
+
+def default_cache_dir(csv_path: str) -> str:
+    return os.getenv("KEN_ALL_CACHE_DIR") or f"{csv_path}.cache"
+
+
+class CityIndex:
+    """
+    1つの (都道府県, 市区町村) に属する町域の索引
+    """
+
+    def __init__(self, towns: list, zipcodes: list[str]):
+        self.towns = towns
+        self.zipcodes = zipcodes
+        self._exact: dict[str, str] = {}
+        for town, zipcode in zip(towns, zipcodes):
+            if isinstance(town, str):
+                self._exact.setdefault(town, zipcode)
+        self._partial: dict[str, str | None] = {}
+
+    def lookup(self, town: str) -> str | None:
+        zipcode = self._exact.get(town)
+        if zipcode is not None:
+            return zipcode
+        if town not in self._partial:
+            self._partial[town] = self._search(town)
+        return self._partial[town]
+
+    def _search(self, town: str) -> str | None:
+        # str.contains の既定（regex=True）と同じ判定にする
+        pattern = re.compile(town)
+        for candidate, zipcode in zip(self.towns, self.zipcodes):
+            if isinstance(candidate, str) and pattern.search(candidate):
+                return zipcode
+        return None
+
+
+class TownTable:
+    """
+    辞書符号化した町域名の表。UTF-8 を連結したバイト列と開始位置の配列から文字列を取り出す
+    """
+
+    def __init__(self, blob, offsets):
+        self.blob = blob
+        self.offsets = offsets
+
+    @classmethod
+    def from_strings(cls, names: list[str]) -> "TownTable":
+        encoded = [name.encode("utf-8") for name in names]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum(np.asarray([len(b) for b in encoded], dtype=np.int64), out=offsets[1:])
+        return cls(b"".join(encoded), offsets)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, town_id: int):
+        if town_id == MISSING_TOWN:
+            return None
+        start, end = int(self.offsets[town_id]), int(self.offsets[town_id + 1])
+        return bytes(self.blob[start:end]).decode("utf-8")
+
+    def names(self) -> list[str]:
+        return [self[i] for i in range(len(self))]
+
+
+class ZipcodeIndex:
+    """
+    KEN_ALL 全体の索引。
+
+    行は (都道府県, 市区町村) ごとにまとめて並べ、groups に各グループの行範囲を持つ。
+    CityIndex はそのグループが最初に引かれたときに作る
+    """
+
+    def __init__(self, groups: dict[tuple[str, str], tuple[int, int]],
+                 town_ids, zipcodes, towns: TownTable):
+        self.groups = groups
+        self.town_ids = town_ids
+        self.zipcodes = zipcodes
+        self.towns = towns
+        self.cities: dict[tuple[str, str], CityIndex] = {}
+        self.meta: dict = {}
+
+    @classmethod
+    def from_rows(cls, prefs, cities, towns, zipcodes) -> "ZipcodeIndex":
+        grouped: dict[tuple[str, str], list[int]] = {}
+        town_lookup: dict[str, int] = {}
+        row_towns = []
+        row_zips = []
+        for row, (pref, city, town, code) in enumerate(zip(prefs, cities, towns, zipcodes)):
+            grouped.setdefault((pref, city), []).append(row)
+            if isinstance(town, str):
+                row_towns.append(town_lookup.setdefault(town, len(town_lookup)))
+            else:
+                row_towns.append(MISSING_TOWN)
+            row_zips.append(int(code))
+
+        # 行を (都道府県, 市区町村) ごとに並べ替える（グループ内は元の行順を維持）
+        order = []
+        groups = {}
+        for key, rows in grouped.items():
+            groups[key] = (len(order), len(order) + len(rows))
+            order.extend(rows)
+        order = np.asarray(order, dtype=np.int64)
+        return cls(
+            groups,
+            np.asarray(row_towns, dtype=np.int32)[order],
+            np.asarray(row_zips, dtype=np.int32)[order],
+            TownTable.from_strings(list(town_lookup)),
+        )
+
+    @classmethod
+    def from_dataframe(cls, df) -> "ZipcodeIndex":
+        return cls.from_rows(
+            df["都道府県"].tolist(),
+            df["市区町村"].tolist(),
+            df["町域"].tolist(),
+            df["郵便番号"].tolist(),
+        )
+
+    def city_index(self, pref: str, city: str) -> CityIndex | None:
+        key = (pref, city)
+        city_index = self.cities.get(key)
+        if city_index is None:
+            span = self.groups.get(key)
+            if span is None:
+                return None
+            start, end = span
+            city_index = CityIndex(
+                [self.towns[int(t)] for t in self.town_ids[start:end]],
+                [format_zipcode(int(z)) for z in self.zipcodes[start:end]],
+            )
+            self.cities[key] = city_index
+        return city_index
+
+    def lookup(self, pref: str, city: str, town: str) -> str | None:
+        city_index = self.city_index(pref, city)
+        if city_index is None:
+            return None
+        return city_index.lookup(town)
+
+    def save(self, cache_dir: str, meta: dict) -> None:
+        """
+        索引をキャッシュディレクトリに書き出す。
+        一時ディレクトリに書いてから置き換えるので、読み込み中のプロセスが壊れたファイルを見ることはない
+        """
+        prefs: dict[str, int] = {}
+        cities: dict[str, int] = {}
+        groups = []
+        for (pref, city), (start, end) in self.groups.items():
+            groups.append([
+                prefs.setdefault(pref, len(prefs)),
+                cities.setdefault(city, len(cities)),
+                start, end,
+            ])
+        meta = dict(meta)
+        meta.update({
+            "format": CACHE_FORMAT_VERSION,
+            "rows": int(len(self.town_ids)),
+            "prefs": list(prefs),
+            "cities": list(cities),
+            "groups": groups,
+        })
+
+        parent = os.path.dirname(os.path.abspath(cache_dir))
+        os.makedirs(parent, exist_ok=True)
+        tmp_dir = tempfile.mkdtemp(prefix=".ken_all_", dir=parent)
+        np.save(os.path.join(tmp_dir, "town_ids.npy"), np.asarray(self.town_ids, dtype=np.int32))
+        np.save(os.path.join(tmp_dir, "zipcodes.npy"), np.asarray(self.zipcodes, dtype=np.int32))
+        np.save(os.path.join(tmp_dir, "town_offsets.npy"), np.asarray(self.towns.offsets, dtype=np.int64))
+        with open(os.path.join(tmp_dir, "towns.bin"), "wb") as f:
+            f.write(bytes(self.towns.blob))
+        write_cache_meta(tmp_dir, meta)
+
+        if os.path.exists(cache_dir):
+            old_dir = tempfile.mkdtemp(prefix=".ken_all_old_", dir=parent)
+            os.rename(cache_dir, os.path.join(old_dir, "cache"))
+            os.rename(tmp_dir, cache_dir)
+            shutil.rmtree(old_dir, ignore_errors=True)
+        else:
+            os.rename(tmp_dir, cache_dir)
+
+    @classmethod
+    def load(cls, cache_dir: str) -> "ZipcodeIndex":
+        """
+        キャッシュディレクトリから索引を読み込む（配列は memmap で開く）
+        """
+        meta = read_cache_meta(cache_dir)
+        if meta is None:
+            raise FileNotFoundError(f"KEN_ALLキャッシュがありません: {cache_dir}")
+        prefs, cities = meta["prefs"], meta["cities"]
+        groups = {
+            (prefs[p], cities[c]): (start, end)
+            for p, c, start, end in meta["groups"]
+        }
+        towns_path = os.path.join(cache_dir, "towns.bin")
+        if os.path.getsize(towns_path) > 0:
+            with open(towns_path, "rb") as f:
+                blob = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            blob = b""
+        index = cls(
+            groups,
+            np.load(os.path.join(cache_dir, "town_ids.npy"), mmap_mode="r"),
+            np.load(os.path.join(cache_dir, "zipcodes.npy"), mmap_mode="r"),
+            TownTable(blob, np.load(os.path.join(cache_dir, "town_offsets.npy"), mmap_mode="r")),
+        )
+        index.meta = meta
+        if cache_generation(cache_dir) != meta.get("generation", 0):
+            # 読み込み中に差分更新で置き換えられた場合は読み直す
+            return cls.load(cache_dir)
+        return index
+
+
+def read_cache_meta(cache_dir: str) -> dict | None:
+    meta_path = os.path.join(cache_dir, "meta.json")
+    if not os.path.exists(meta_path):
+        return None
+    with open(meta_path, encoding="utf-8") as f:
+        meta = json.load(f)
+    if meta.get("format") != CACHE_FORMAT_VERSION:
+        return None
+    return meta
+
+
+def write_cache_meta(cache_dir: str, meta: dict) -> None:
+    tmp_path = os.path.join(cache_dir, "meta.json.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False)
+    os.replace(tmp_path, os.path.join(cache_dir, "meta.json"))
+
+
+def cache_generation(cache_dir: str) -> int | None:
+    """
+    キャッシュの世代番号を返す（差分更新・再コンパイルのたびに増える）
+    """
+    meta = read_cache_meta(cache_dir)
+    return None if meta is None else meta.get("generation", 0)
+
+
+def source_fingerprint(csv_path: str, sha256: str | None = None) -> dict:
+    stat = os.stat(csv_path)
+    return {
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "sha256": sha256 or file_sha256(csv_path),
+    }
+
+
+def compile_ken_all(csv_path: str, cache_dir: str | None = None) -> ZipcodeIndex:
+    """
+    KEN_ALL.CSV を読み込んで索引を作り、キャッシュディレクトリに保存する
+    """
+    cache_dir = cache_dir or default_cache_dir(csv_path)
+    print(f"▶️ KEN_ALLをコンパイル中: {csv_path}")
+    index = ZipcodeIndex.from_dataframe(read_ken_all_csv(csv_path))
+    previous = cache_generation(cache_dir) if os.path.exists(cache_dir) else None
+    index.save(cache_dir, {
+        "source": source_fingerprint(csv_path),
+        "generation": 0 if previous is None else previous + 1,
+        "applied_deltas": [],
+    })
+    print(f"✅ KEN_ALLキャッシュ出力: {cache_dir}")
+    return ZipcodeIndex.load(cache_dir)
+
+
+def is_cache_fresh(csv_path: str, cache_dir: str) -> bool:
+    """
+    キャッシュが元CSVと一致しているかを確認する。
+    サイズと mtime が一致すればそのまま採用し、どちらかが違えば SHA-256 で内容を比較する
+    """
+    meta = read_cache_meta(cache_dir)
+    if meta is None:
+        return False
+    source = meta.get("source", {})
+    stat = os.stat(csv_path)
+    if source.get("size") == stat.st_size and source.get("mtime_ns") == stat.st_mtime_ns:
+        return True
+    if source.get("sha256") != file_sha256(csv_path):
+        return False
+    # 内容は同じ（コピーし直した等）なので、次回から高速に判定できるよう指紋を更新する
+    meta["source"] = source_fingerprint(csv_path, source["sha256"])
+    write_cache_meta(cache_dir, meta)
+    return True
+
+
+def load_zipcode_index(csv_path: str, cache_dir: str | None = None) -> ZipcodeIndex:
+    """
+    コンパイル済みキャッシュから索引を読み込む。キャッシュが無いか古い場合はコンパイルし直す
+    """
+    cache_dir = cache_dir or default_cache_dir(csv_path)
+    if is_cache_fresh(csv_path, cache_dir):
+        return ZipcodeIndex.load(cache_dir)
+    return compile_ken_all(csv_path, cache_dir)
+
+
+DELTA_FILE_PATTERN = re.compile(r"(ADD|DEL)_(\d{4})", re.IGNORECASE)
+
+
+def delta_sort_key(path: str) -> tuple[str, int]:
+    """
+    差分ファイルを年月順に並べるためのキー。同じ年月では DEL を ADD より先に適用する
+    """
+    m = DELTA_FILE_PATTERN.search(os.path.basename(path))
+    if not m:
+        raise ValueError("差分ファイル名が ADD_YYMM.CSV / DEL_YYMM.CSV の形式ではありません: " + path)
+    kind, yymm = m.group(1).upper(), m.group(2)
+    return yymm, 0 if kind == "DEL" else 1
+
+
+def apply_deltas(delta_paths: list[str], cache_dir: str) -> dict:
+    """
+    ADD/DEL 差分ファイルをコンパイル済みキャッシュに反映する。
+    適用済みのファイル（ファイル名と SHA-256 が一致するもの）はスキップする。
+    ファイル名だけが一致して内容が違う場合（差し替えられた差分）は、警告を出してから適用する。
+    戻り値は {"applied": [...], "skipped": [...], "added": 件数, "deleted": 件数}
+    """
+    meta = read_cache_meta(cache_dir)
+    if meta is None:
+        raise FileNotFoundError(f"KEN_ALLキャッシュがありません。先に compile を実行してください: {cache_dir}")
+    index = ZipcodeIndex.load(cache_dir)
+    applied_hashes: dict[str, set[str]] = {}
+    for d in meta.get("applied_deltas", []):
+        applied_hashes.setdefault(d["name"], set()).add(d.get("sha256"))
+
+    town_ids = {name: i for i, name in enumerate(index.towns.names())}
+    new_towns: list[str] = []
+    # 変更のある (都道府県, 市区町村) ごとの行リスト [(町域ID, 郵便番号), ...]
+    edited: dict[tuple[str, str], list[tuple[int, int]]] = {}
+
+    def group_rows(key):
+        if key not in edited:
+            start, end = index.groups.get(key, (0, 0))
+            edited[key] = list(zip(
+                (int(t) for t in index.town_ids[start:end]),
+                (int(z) for z in index.zipcodes[start:end]),
+            ))
+        return edited[key]
+
+    def town_id(town):
+        if not isinstance(town, str):
+            return MISSING_TOWN
+        if town not in town_ids:
+            town_ids[town] = len(town_ids)
+            new_towns.append(town)
+        return town_ids[town]
+
+    result = {"applied": [], "skipped": [], "added": 0, "deleted": 0}
+    records = []
+    for path in sorted(delta_paths, key=delta_sort_key):
+        name = os.path.basename(path)
+        sha256 = file_sha256(path)
+        if sha256 in applied_hashes.get(name, ()):
+            result["skipped"].append(name)
+            continue
+        if name in applied_hashes:
+            print(f"⚠️ {name} は適用済みですが内容が変わっています。差し替えられた差分として適用します")
+        is_delete = delta_sort_key(path)[1] == 0
+        df = read_ken_all_csv(path)
+        count = 0
+        for pref, city, town, code in zip(df["都道府県"], df["市区町村"], df["町域"], df["郵便番号"]):
+            rows = group_rows((pref, city))
+            if is_delete:
+                if isinstance(town, str) and town not in town_ids:
+                    # 辞書に無い町域は索引に無いので、町域が欠損した行（MISSING_TOWN）と取り違えない
+                    print(f"⚠️ 削除対象が見つかりません: {format_zipcode(code)} {pref}{city}{town}")
+                    continue
+                row = (town_ids[town] if isinstance(town, str) else MISSING_TOWN, int(code))
+                if row in rows:
+                    rows.remove(row)
+                    count += 1
+                else:
+                    print(f"⚠️ 削除対象が見つかりません: {format_zipcode(code)} {pref}{city}{town}")
+            else:
+                rows.append((town_id(town), int(code)))
+                count += 1
+        result["deleted" if is_delete else "added"] += count
+        result["applied"].append(name)
+        applied_hashes.setdefault(name, set()).add(sha256)
+        records.append({
+            "name": name,
+            "sha256": sha256,
+            "rows": count,
+            "applied_at": datetime.now().isoformat(timespec="seconds"),
+        })
+
+    if not records:
+        return result
+
+    # 変更の無い市区町村は配列をそのまま切り出し、変更のあった市区町村だけ組み替える
+    town_parts, zip_parts, groups = [], [], {}
+    position = 0
+    for key in list(index.groups) + [k for k in edited if k not in index.groups]:
+        if key in edited:
+            rows = edited[key]
+            if not rows:
+                continue
+            town_parts.append(np.asarray([t for t, _ in rows], dtype=np.int32))
+            zip_parts.append(np.asarray([z for _, z in rows], dtype=np.int32))
+        else:
+            start, end = index.groups[key]
+            town_parts.append(index.town_ids[start:end])
+            zip_parts.append(index.zipcodes[start:end])
+        groups[key] = (position, position + len(town_parts[-1]))
+        position += len(town_parts[-1])
+
+    added_table = TownTable.from_strings(new_towns)
+    towns = TownTable(
+        bytes(index.towns.blob) + added_table.blob,
+        np.concatenate([index.towns.offsets, added_table.offsets[1:] + index.towns.offsets[-1]]),
+    )
+    updated = ZipcodeIndex(
+        groups,
+        np.concatenate(town_parts) if town_parts else np.zeros(0, dtype=np.int32),
+        np.concatenate(zip_parts) if zip_parts else np.zeros(0, dtype=np.int32),
+        towns,
+    )
+    meta["generation"] = meta.get("generation", 0) + 1
+    meta["applied_deltas"] = meta.get("applied_deltas", []) + records
+    updated.save(cache_dir, meta)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='KEN_ALL郵便番号データの管理')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p_compile = sub.add_parser('compile', help='KEN_ALL.CSVをコンパイルしてキャッシュを作成')
+    p_compile.add_argument('--csv',       default=os.getenv("KEN_ALL_CSV_PATH"), help='KEN_ALL.CSVのパス')
+    p_compile.add_argument('--cache-dir', default=None,                          help='キャッシュディレクトリ')
+
+    p_update = sub.add_parser('update', help='ADD/DEL差分ファイルをキャッシュに反映')
+    p_update.add_argument('deltas',      nargs='+',                             help='ADD_YYMM.CSV / DEL_YYMM.CSV')
+    p_update.add_argument('--csv',       default=os.getenv("KEN_ALL_CSV_PATH"), help='KEN_ALL.CSVのパス')
+    p_update.add_argument('--cache-dir', default=None,                          help='キャッシュディレクトリ')
+
+    args = parser.parse_args()
+    if not args.csv and not args.cache_dir:
+        parser.error("--csv か環境変数 KEN_ALL_CSV_PATH を指定してください")
+    cache_dir = args.cache_dir or default_cache_dir(args.csv)
+
+    if args.command == 'compile':
+        compile_ken_all(args.csv, cache_dir)
+    elif args.command == 'update':
+        if args.csv and not is_cache_fresh(args.csv, cache_dir):
+            compile_ken_all(args.csv, cache_dir)
+        result = apply_deltas(args.deltas, cache_dir)
+        for name in result["skipped"]:
+            print(f"⏭️ 適用済みのためスキップ: {name}")
+        print(f"✅ 差分反映完了: {len(result['applied'])} ファイル（追加 {result['added']} 件 / 削除 {result['deleted']} 件）")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,36 @@
+import pytest
+
+from scripts.registry_office import OFFICE_OMITTED_MESSAGE, resolve_registry_office
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("大津地方法務局 東近江支局\n受付帳（不動産）", "大津地方法務局東近江支局"),
+    # OCRの誤読
+    ("大津地方法務局 東近江支馬", "大津地方法務局東近江支局"),
+    ("大律地方法務局 彦根支局", "大津地方法務局彦根支局"),
+    # 同じ名前の支局・出張所は法務局名で区別する
+    ("東京法務局 府中支局", "東京法務局府中支局"),
+    ("広島法務局府中支局", "広島法務局府中支局"),
+    ("大阪法務局 北出張所", "大阪法務局北出張所"),
+    ("札幌法務局 北出張所", "札幌法務局北出張所"),
+    # 法務局名が無くても、支局名だけで法務局が1つに決まる場合
+    ("東近江支局", "大津地方法務局東近江支局"),
+    ("東京法務局", "東京法務局"),
+    ("大津地方法務局 登記部門", OFFICE_OMITTED_MESSAGE),
+])
+def test_resolves_office_with_bureau(header, expected):
+    assert resolve_registry_office(header) == expected
+
+
+@pytest.mark.parametrize("header", [
+    # 一覧にない出張所を、別の法務局の似た名前（木津出張所）や本局と取り違えない
+    "大阪法務局 茨木出張所",
+    # 東大阪支局と北大阪支局のどちらとも取れる
+    "束大阪支局",
+    "大阪法務局 束大阪支局",
+    # 北出張所は東京・大阪・札幌にある
+    "北出張所",
+    "",
+])
+def test_unclear_header_falls_back_to_llm(header):
+    assert resolve_registry_office(header) is None
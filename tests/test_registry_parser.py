@@ -0,0 +1,53 @@
+from scripts.registry_parser import parse_registry
+
+REGISTRY = "\n".join([
+    "滋賀県東近江市五個荘竜田町430-4 全部事項証明書 (土地)",
+    "表題部 (土地の表示) 調製 余白 不動産番号 1234567890123",
+    "所在 東近江市五個荘竜田町 余白",
+    "地番 430番4 宅地 198 45 〔昭和50年3月1日〕",
+    "権利部 (甲区) (所有権に関する事項)",
+    "順位番号 登記の目的 受付年月日・受付番号 原因 権利者その他の事項",
+    "1 所有権保存 昭和50年4月1日 第1234号 所有者 滋賀県東近江市五個荘竜田町430番地 山田一郎",
+    "2 所有権移転 令和6年1月5日 第49号 令和5年10月1日相続 {owner}",
+    "権利部 (乙区) (所有権以外の権利に関する事項)",
+])
+
+
+def parse(owner: str):
+    return parse_registry(REGISTRY.format(owner=owner))
+
+
+def test_owner():
+    result = parse("所有者 大阪府大阪市北区梅田1丁目2番3号 山田太郎")
+    assert result.record == {
+        "氏名": "山田太郎",
+        "所有者住所": "大阪府大阪市北区梅田1丁目2番3号",
+        "不動産所在地": "滋賀県東近江市五個荘竜田町430番4",
+    }
+    assert result.confidence == 1.0
+
+
+def test_spaced_name_is_joined():
+    # 氏と名の間の空白で氏名が「山田」だけになっていた
+    result = parse("所有者 大阪府大阪市北区梅田1丁目2番3号 山田 太郎")
+    assert result.record["氏名"] == "山田太郎"
+    assert result.confidence == 1.0
+
+
+def test_spaced_address_is_joined():
+    result = parse("所有者 大阪府大阪市北区梅田1丁目 2番3号 山田 太郎")
+    assert result.record["所有者住所"] == "大阪府大阪市北区梅田1丁目2番3号"
+    assert result.record["氏名"] == "山田太郎"
+
+
+def test_trailing_words_lower_confidence():
+    result = parse("所有者 大阪府大阪市北区梅田1丁目2番3号 山田 太郎 順位1番の登記を移記")
+    assert result.record["氏名"] == "山田太郎"
+    assert result.confidence < 0.8
+
+
+def test_co_owners_with_share():
+    result = parse("共有者 大阪府大阪市北区梅田1丁目2番3号 持分2分の1 山田 太郎 "
+                   "大阪府堺市堺区1番 持分2分の1 山田 花子")
+    assert result.record["氏名"] == "山田太郎"
+    assert result.confidence < 0.8